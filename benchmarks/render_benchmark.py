@@ -0,0 +1,502 @@
+"""Rendering benchmark for every pattern and display mode on a simulated strip.
+
+Runs every pattern in the setPattern endpoint's pattern map, every LightString mode
+ and every DynamicDisplay visualizer at a range of LED counts, and reports frames per
+ second, CPU time per frame, p50/p99 frame latency and peak bytes allocated per frame.
+ Frames sent to the PixelReceiver over E1.31 and DDP on the loopback interface are
+ measured the same way. Results are written as JSON so runs from different releases
+ can be compared.
+
+Run from the root of the repository:
+    python -m benchmarks.render_benchmark --output bench.json
+    python -m benchmarks.render_benchmark --compare bench.json
+"""
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import pickle
+import platform
+import resource
+import socket
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from classes.DynamicDisplay import DynamicDisplay
+from classes.FrameScheduler import FrameScheduler, StripTiming
+from classes.LedColor import LedColor
+from classes.LightString import LightString
+from classes.PixelReceiver import PixelReceiver, ddp_packets, e131_packets
+from classes.SharedFrameBuffer import SharedFrameBuffer
+from classes.SimulatedStrip import SimulatedStrip
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+import helpers
+
+LED_COUNTS = [50, 100, 300, 1000, 3000, 10000]
+# Single frame modes are repeated until at least this many frames were shown
+MIN_FRAMES = 200
+TRACK_FILE = Path("tests") / "stairwayToHeavenAnalysis.dict"
+TRACK_PROGRESS_MS = 60000
+# Frames per second, CPU and latency can move this much before it is a regression
+DEFAULT_TOLERANCE = 0.2
+# Seconds to wait for a frame sent to the receiver before counting it as lost
+RECEIVER_TIMEOUT_S = 1
+# Packet encoder of each protocol, how many sequence numbers it has and whether each
+# packet takes the next one rather than each frame
+RECEIVER_PROTOCOLS = {
+    "e131": (e131_packets, 256, False),
+    "ddp": (ddp_packets, 15, True),
+}
+
+
+class FrameProbe:
+    """Stands in for LightString.show_frame and times every frame shown"""
+
+    def __init__(self, light_string: LightString, track_allocations: bool) -> None:
+        self.show_frame = light_string.show_frame
+        self.track_allocations = track_allocations
+        self.frame_count = 0
+        self.frame_ns = []
+        self.alloc_peaks = []
+        self.last_ns = None
+        light_string.show_frame = self
+
+    def __call__(self, frame: np.ndarray):
+        self.show_frame(frame)
+        self.frame_count += 1
+        now = time.perf_counter_ns()
+        if self.last_ns is not None:
+            self.frame_ns.append(now - self.last_ns)
+        self.last_ns = now
+
+        if self.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_peaks.append(peak - current)
+            tracemalloc.reset_peak()
+
+    def new_run(self):
+        """Starts timing the first frame of a run from now, so time spent between runs
+        isn't counted as frame latency
+        """
+        self.last_ns = time.perf_counter_ns()
+
+
+def light_string_modes(light_string: LightString) -> Dict[str, Callable[[], None]]:
+    """Every LightString mode with the arguments used to benchmark it
+
+    Args:
+        light_string (LightString): Light string to run the modes on
+
+    Returns:
+        Dict[str, Callable[[], None]]: Mode name to a function that runs it once
+    """
+    modes = {
+        "set_solid": lambda: light_string.set_solid(LedColor.teal),
+        "set_solid_from_rgb_list": lambda: light_string.set_solid_from_rgb_list(
+            [[100, 255, 0], [0, 0, 255]]
+        ),
+        "set_color_for_pixels": lambda: light_string.set_color_for_pixels(
+            list(range(0, light_string.led_count, 2)), LedColor.red
+        ),
+        "color_wipe": lambda: light_string.color_wipe(LedColor.blue),
+        "color_wipe_reversed": lambda: light_string.color_wipe(
+            LedColor.green, reverse=True
+        ),
+        "color_wipe_inside_out": lambda: light_string.color_wipe_inside_out(
+            LedColor.pink
+        ),
+        "color_wipe_inside_out_reversed": (
+            lambda: light_string.color_wipe_inside_out_reversed(LedColor.yellow)
+        ),
+        "random_colors": lambda: light_string.random_colors(),
+        "theater_chase": lambda: light_string.theater_chase(LedColor.white),
+        "rainbow": lambda: light_string.rainbow(),
+        "rainbow_cycle": lambda: light_string.rainbow_cycle(iterations=1),
+        "theater_chase_rainbow": lambda: light_string.theater_chase_rainbow(),
+        "transition_colors": lambda: light_string.transition_colors(
+            LedColor.red, LedColor.blue
+        ),
+        "transition_to_random_color": (
+            lambda: light_string.transition_to_random_color()
+        ),
+    }
+
+    for name, pattern in helpers.PATTERN_MAP.items():
+        modes[f"pattern:{name}"] = (
+            lambda fn=getattr(light_string, pattern["method"]),
+            kwargs=pattern.get("kwargs", {}): fn(**kwargs)
+        )
+
+    return modes
+
+
+def summarize(
+    name: str,
+    led_count: int,
+    frame_count: int,
+    wall_s: float,
+    cpu_s: float,
+    frame_ns: List[int],
+    alloc_peaks: Optional[List[int]],
+    wire_max_fps: float,
+) -> dict:
+    latencies_ms = np.asarray(frame_ns, dtype=np.float64) / 1e6
+    has_latency = len(latencies_ms) > 0
+    return {
+        "name": name,
+        "led_count": led_count,
+        "frames": frame_count,
+        "fps": frame_count / wall_s if wall_s else None,
+        "cpu_ms_per_frame": cpu_s * 1000 / frame_count if frame_count else None,
+        "p50_frame_ms": float(np.percentile(latencies_ms, 50)) if has_latency else None,
+        "p99_frame_ms": float(np.percentile(latencies_ms, 99)) if has_latency else None,
+        "alloc_peak_bytes_per_frame": (
+            float(np.mean(alloc_peaks)) if alloc_peaks else None
+        ),
+        "wire_max_fps": wire_max_fps,
+    }
+
+
+def benchmark_light_string_mode(
+    name: str, led_count: int, track_allocations: bool, emulate_wire_time: bool
+) -> dict:
+    """Runs one LightString mode as fast as it can go and measures every frame
+
+    Args:
+        name (str): Mode name from light_string_modes
+        led_count (int): Number of LEDs to simulate
+        track_allocations (bool): Also measure bytes allocated per frame. Runs the
+            mode a second time so tracing doesn't skew the timings.
+        emulate_wire_time (bool): Limit frames to what a real strip could take
+
+    Returns:
+        dict: Measurements for the mode
+    """
+    light_string = LightString(
+        led_count=led_count,
+        strip=SimulatedStrip(
+            led_count, max_frames=8, emulate_wire_time=emulate_wire_time
+        ),
+    )
+    # Let patterns run flat out instead of waiting for their frame deadlines
+    light_string.scheduler = FrameScheduler(light_string.timing, sleep=lambda _: None)
+    run = light_string_modes(light_string)[name]
+
+    probe = FrameProbe(light_string, track_allocations=False)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while probe.frame_count < MIN_FRAMES:
+        probe.new_run()
+        frames_before = probe.frame_count
+        run()
+        if probe.frame_count == frames_before:
+            break
+    cpu_s = time.process_time() - cpu_start
+    wall_s = time.perf_counter() - wall_start
+
+    alloc_peaks = None
+    if track_allocations:
+        light_string.show_frame = probe.show_frame
+        alloc_probe = FrameProbe(light_string, track_allocations=True)
+        tracemalloc.start()
+        try:
+            while alloc_probe.frame_count < min(probe.frame_count, MIN_FRAMES):
+                alloc_probe.new_run()
+                run()
+        finally:
+            tracemalloc.stop()
+        alloc_peaks = alloc_probe.alloc_peaks
+
+    return summarize(
+        name,
+        led_count,
+        probe.frame_count,
+        wall_s,
+        cpu_s,
+        probe.frame_ns,
+        alloc_peaks,
+        light_string.timing.max_fps,
+    )
+
+
+def load_audio_analysis(track_file: Path = TRACK_FILE) -> SpotifyAudioAnalysis:
+    with open(track_file, "rb") as file:
+        track_data = pickle.load(file)
+
+    return SpotifyAudioAnalysis(track_progress=TRACK_PROGRESS_MS, **track_data)
+
+
+def benchmark_dynamic_display_mode(
+    name: str, led_count: int, seconds: float, emulate_wire_time: bool
+) -> dict:
+    """Runs a DynamicDisplay visualizer for a while and measures the frames its refresh
+        loop showed. CPU time covers every process the visualizer started.
+
+    Args:
+        name (str): Name of the DynamicDisplay visualizer method
+        led_count (int): Number of LEDs to simulate
+        seconds (float): How long to let the visualizer run
+        emulate_wire_time (bool): Limit frames to what a real strip could take
+
+    Returns:
+        dict: Measurements for the visualizer
+    """
+    strip = SimulatedStrip(
+        led_count, max_frames=256, emulate_wire_time=emulate_wire_time
+    )
+    light_string = LightString(led_count=led_count, strip=strip)
+    dynamic_display = DynamicDisplay(light_string=light_string)
+    audio_analysis = load_audio_analysis()
+
+    cpu_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    dynamic_display.reinitialize()
+    getattr(dynamic_display, name)(audio_analysis)
+    time.sleep(seconds)
+    dynamic_display.terminate_all_running_process()
+
+    processes = [dynamic_display.light_refresh_loop] + list(
+        dynamic_display.group_threads.values()
+    )
+    for process in processes:
+        process.join()
+    cpu_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_s = (cpu_end.ru_utime - cpu_start.ru_utime) + (
+        cpu_end.ru_stime - cpu_start.ru_stime
+    )
+
+    timestamps = strip.recorded_timestamps_ns()
+    return summarize(
+        f"dynamic_display:{name}",
+        led_count,
+        strip.frames_shown,
+        seconds,
+        cpu_s,
+        np.diff(timestamps).tolist(),
+        None,
+        light_string.timing.max_fps,
+    )
+
+
+def benchmark_pixel_receiver(protocol: str, led_count: int) -> dict:
+    """Sends frames to a PixelReceiver over loopback one at a time and measures how
+        long each took to be published. Only frames published exactly as they were
+        sent count, the rest are reported as lost. CPU time covers the sender as
+        well.
+
+    Args:
+        protocol (str): "e131" or "ddp"
+        led_count (int): Number of LEDs in each frame
+
+    Returns:
+        dict: Measurements for the protocol
+    """
+    frame_buffer = SharedFrameBuffer(led_count)
+    frame_buffer.read()
+    receiver = PixelReceiver(
+        frame_buffer, host="127.0.0.1", e131_port=0, ddp_port=0, multicast=False
+    )
+    address = receiver.e131_address if protocol == "e131" else receiver.ddp_address
+    serving = threading.Thread(target=receiver.serve_forever)
+    serving.start()
+
+    # Packets are encoded up front so only sending and receiving them is timed.
+    # Sequence numbers carry on from the last packet sent, like a sequencer's do.
+    rng = np.random.default_rng(0)
+    encode, sequences, per_packet = RECEIVER_PROTOCOLS[protocol]
+    frames = []
+    sequence = 1
+    for _ in range(MIN_FRAMES):
+        frame = rng.integers(0, 1 << 24, led_count, dtype=np.uint32)
+        packets = encode(frame, sequence)
+        frames.append((frame, packets))
+        sequence = (sequence - 1 + (len(packets) if per_packet else 1)) % sequences + 1
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frame_ns = []
+    try:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        for frame, packets in frames:
+            sent_ns = time.perf_counter_ns()
+            for packet in packets:
+                sock.sendto(packet, address)
+            if not frame_buffer.wait_for_change(timeout=RECEIVER_TIMEOUT_S):
+                break
+            published_ns = time.perf_counter_ns()
+            # A frame missing packets is still published when its last one arrives
+            if np.array_equal(frame_buffer.read(), frame):
+                frame_ns.append(published_ns - sent_ns)
+        cpu_s = time.process_time() - cpu_start
+        wall_s = time.perf_counter() - wall_start
+    finally:
+        sock.close()
+        receiver.close()
+        serving.join()
+
+    result = summarize(
+        f"receiver:{protocol}",
+        led_count,
+        len(frame_ns),
+        wall_s,
+        cpu_s,
+        frame_ns,
+        None,
+        StripTiming(led_count).max_fps,
+    )
+    result["frames_lost"] = len(frames) - len(frame_ns)
+    return result
+
+
+def run_benchmark(
+    led_counts: List[int] = LED_COUNTS,
+    names: Optional[List[str]] = None,
+    visualizer_seconds: float = 3,
+    track_allocations: bool = True,
+    emulate_wire_time: bool = False,
+) -> dict:
+    """Runs the whole benchmark
+
+    Args:
+        led_counts (List[int], optional): LED counts to run at. Defaults to
+            LED_COUNTS.
+        names (Optional[List[str]]): Only run modes with these names. Runs everything
+            if not given.
+        visualizer_seconds (float, optional): How long each DynamicDisplay visualizer
+            runs. Defaults to 3.
+        track_allocations (bool, optional): Measure bytes allocated per frame.
+            Defaults to True.
+        emulate_wire_time (bool, optional): Limit frames to what a real strip could
+            take. Defaults to False.
+
+    Returns:
+        dict: Machine readable results
+    """
+    mode_names = list(
+        light_string_modes(
+            LightString(led_count=1, strip=SimulatedStrip(1, max_frames=1))
+        )
+    )
+    visualizers = ["dual_beats", "dual_beats_with_tatums"]
+    results = []
+
+    for led_count in led_counts:
+        for name in mode_names:
+            if names and name not in names:
+                continue
+            results.append(
+                benchmark_light_string_mode(
+                    name, led_count, track_allocations, emulate_wire_time
+                )
+            )
+        for name in visualizers:
+            if names and name not in names:
+                continue
+            results.append(
+                benchmark_dynamic_display_mode(
+                    name, led_count, visualizer_seconds, emulate_wire_time
+                )
+            )
+        for protocol in RECEIVER_PROTOCOLS:
+            if names and f"receiver:{protocol}" not in names:
+                continue
+            results.append(benchmark_pixel_receiver(protocol, led_count))
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "emulate_wire_time": emulate_wire_time,
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Finds results that got worse than the baseline by more than tolerance
+
+    Args:
+        results (dict): Results from run_benchmark
+        baseline (dict): Earlier results from run_benchmark
+        tolerance (float, optional): Fraction a measurement can get worse by before
+            it counts. Defaults to DEFAULT_TOLERANCE.
+
+    Returns:
+        List[str]: A line describing every regression found
+    """
+    # Higher is better for fps, lower is better for everything else
+    measurements = {
+        "fps": 1,
+        "cpu_ms_per_frame": -1,
+        "p50_frame_ms": -1,
+        "p99_frame_ms": -1,
+        "alloc_peak_bytes_per_frame": -1,
+    }
+    earlier = {(r["name"], r["led_count"]): r for r in baseline["results"]}
+    regressions = []
+
+    for result in results["results"]:
+        before = earlier.get((result["name"], result["led_count"]))
+        if not before:
+            continue
+        for key, direction in measurements.items():
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            if change < -tolerance:
+                regressions.append(
+                    f"{result['name']} @ {result['led_count']} LEDs: {key}"
+                    f" {old:.4g} -> {new:.4g}"
+                )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--led-counts", type=int, nargs="+", default=LED_COUNTS)
+    parser.add_argument("--only", nargs="+", help="Only run modes with these names")
+    parser.add_argument("--visualizer-seconds", type=float, default=3)
+    parser.add_argument("--no-allocations", action="store_true")
+    parser.add_argument("--emulate-wire-time", action="store_true")
+    parser.add_argument("--output", type=Path, help="File to write JSON results to")
+    parser.add_argument("--compare", type=Path, help="Earlier results to compare to")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        led_counts=args.led_counts,
+        names=args.only,
+        visualizer_seconds=args.visualizer_seconds,
+        track_allocations=not args.no_allocations,
+        emulate_wire_time=args.emulate_wire_time,
+    )
+
+    for result in results["results"]:
+        print(
+            f"{result['name']:<40} {result['led_count']:>6} LEDs"
+            f" {result['fps'] or 0:>9.1f} fps"
+            f" {result['cpu_ms_per_frame'] or 0:>8.3f} cpu ms/frame"
+            f" p50 {result['p50_frame_ms'] or 0:>7.3f} ms"
+            f" p99 {result['p99_frame_ms'] or 0:>7.3f} ms"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=4))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
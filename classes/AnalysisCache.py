@@ -0,0 +1,134 @@
+"""Audio analyses kept on the SD card so a track only has to be uploaded once.
+
+Each track gets a directory named after its Spotify track id holding one .npy file
+ per analysis column and a meta.json describing them. Columns are memory mapped when
+ loaded, so loading a cached track reads almost nothing up front and every process
+ forked afterwards shares the same pages. The cache is bounded in size: whenever a
+ track is added the least recently used tracks are removed until it fits again.
+"""
+from pathlib import Path
+from typing import Optional
+import json
+import os
+import re
+import shutil
+
+from classes.AnalysisColumns import AnalysisColumns
+from config import log
+
+META_FILE = "meta.json"
+
+# Spotify track ids are base 62, anything else could escape the cache directory
+TRACK_ID_PATTERN = re.compile(r"^[0-9A-Za-z]+$")
+
+
+class AnalysisCache:
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        """Cache of audio analyses on disk
+
+        Args:
+            directory (Path): Directory to keep the analyses in, made if missing
+            max_bytes (int): Most bytes of analyses to keep
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __track_directory(self, track_id: str) -> Path:
+        if not TRACK_ID_PATTERN.match(track_id or ""):
+            raise ValueError(f"Invalid Spotify track id {track_id!r}")
+        return self.directory / track_id
+
+    def __contains__(self, track_id: str) -> bool:
+        return (self.__track_directory(track_id) / META_FILE).exists()
+
+    def put(self, track_id: str, audio_analysis) -> None:
+        """Adds the analysis of a track, replacing any cached one
+
+        Args:
+            track_id (str): Spotify track id
+            audio_analysis (SpotifyAudioAnalysis): Parsed analysis of the track
+        """
+        track_directory = self.__track_directory(track_id)
+        # Written next to the cache then renamed in, so a power cut never leaves a
+        # half written track behind
+        staging = self.directory / f".{track_id}.{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+
+        meta = {
+            "track": {"duration": audio_analysis.track_duration},
+            "categories": {
+                category: columns.save(staging, category)
+                for category, columns in audio_analysis.columns.items()
+            },
+        }
+        with open(staging / META_FILE, "w") as meta_file:
+            json.dump(meta, meta_file)
+
+        shutil.rmtree(track_directory, ignore_errors=True)
+        os.replace(staging, track_directory)
+        self.evict(keep=track_id)
+
+    def get(self, track_id: str) -> Optional[dict]:
+        """Loads the analysis of a track and marks it as recently used
+
+        Args:
+            track_id (str): Spotify track id
+
+        Returns:
+            Optional[dict]: Keyword arguments for SpotifyAudioAnalysis apart from the
+                track progress, None if the track is not cached
+        """
+        track_directory = self.__track_directory(track_id)
+        try:
+            with open(track_directory / META_FILE) as meta_file:
+                meta = json.load(meta_file)
+            analysis = {
+                category: AnalysisColumns.load(track_directory, category, layout)
+                for category, layout in meta["categories"].items()
+            }
+        except (OSError, ValueError, KeyError) as error:
+            if track_directory.exists():
+                log.warning(f"Dropping unreadable cached analysis {track_id}: {error}")
+                shutil.rmtree(track_directory, ignore_errors=True)
+            return None
+
+        os.utime(track_directory)
+        return {"track": meta["track"], **analysis}
+
+    def size_bytes(self) -> int:
+        """Bytes used by every cached track"""
+        return sum(self.__directory_size(path) for path in self.__track_directories())
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Removes the least recently used tracks until the cache fits in max_bytes
+
+        Args:
+            keep (Optional[str]): Track id to keep even if it is the oldest
+        """
+        tracks = sorted(
+            self.__track_directories(), key=lambda path: path.stat().st_mtime
+        )
+        sizes = {path: self.__directory_size(path) for path in tracks}
+        total = sum(sizes.values())
+
+        for path in tracks:
+            if total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            log.info(f"Evicting cached analysis {path.name}")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+    def __track_directories(self):
+        return [
+            path
+            for path in self.directory.iterdir()
+            if path.is_dir() and TRACK_ID_PATTERN.match(path.name)
+        ]
+
+    @staticmethod
+    def __directory_size(path: Path) -> int:
+        return sum(file.stat().st_size for file in path.iterdir())
@@ -0,0 +1,239 @@
+"""Column store for one category of a Spotify audio analysis.
+
+Spotify sends bars, beats, sections, segments and tatums as lists of dicts. Kept
+ like that every item costs a dict plus a boxed float per field, and finding the
+ active item means reading start and duration out of dicts on every step of the
+ search. Here each field becomes one numpy column instead, times in float64 so they
+ match the original values exactly and the 12 wide pitch and timbre vectors of
+ segments as float32 matrices. Items are sorted and do not overlap, so the column of
+ end times is sorted too and np.searchsorted finds the active item at any number of
+ times at once.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Columns every category has
+TIME_COLUMNS = ("start", "duration")
+
+# No item is active at the time asked for
+NO_ITEM = -1
+
+
+class AnalysisColumns:
+    def __init__(
+        self,
+        start: np.ndarray,
+        duration: np.ndarray,
+        row_blocks: List[Tuple[Tuple[str, ...], np.ndarray]],
+        matrices: Dict[str, np.ndarray],
+    ) -> None:
+        """Items of one analysis category stored as columns, use from_columns or
+            from_items to make one
+
+        Args:
+            start (np.ndarray): Start time of each item in seconds
+            duration (np.ndarray): Duration of each item in seconds
+            row_blocks (List[Tuple[Tuple[str, ...], np.ndarray]]): Scalar fields and
+                the block holding them, one column per field and one row per item
+            matrices (Dict[str, np.ndarray]): Vector fields, one row per item
+        """
+        self.start = np.asarray(start, dtype=np.float64)
+        self.duration = np.asarray(duration, dtype=np.float64)
+        self.end = self.start + self.duration
+        self._row_blocks = row_blocks
+        self._matrices = matrices
+
+        self.columns = {}
+        for fields, block in row_blocks:
+            for position, field in enumerate(fields):
+                self.columns[field] = block[:, position]
+        self.columns.update(matrices)
+
+    @classmethod
+    def from_columns(
+        cls, start: np.ndarray, duration: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> "AnalysisColumns":
+        """Stores separate columns
+
+        Args:
+            start (np.ndarray): Start time of each item in seconds
+            duration (np.ndarray): Duration of each item in seconds
+            columns (Dict[str, np.ndarray]): Every other field, one row per item, in
+                the order they appeared in the items
+
+        Returns:
+            AnalysisColumns: The columns
+        """
+        # Scalar columns of the same type share one row major block so building an
+        # item reads a single row for all of them
+        row_blocks = []
+        for dtype in (np.float64, np.int64):
+            fields = [
+                field
+                for field, column in columns.items()
+                if column.ndim == 1 and column.dtype == dtype
+            ]
+            block = np.stack(
+                [columns[field] for field in fields], axis=1
+            ) if fields else np.empty((len(start), 0), dtype=dtype)
+            row_blocks.append((tuple(fields), block))
+
+        matrices = {
+            field: column for field, column in columns.items() if column.ndim > 1
+        }
+        return cls(start, duration, row_blocks, matrices)
+
+    @classmethod
+    def from_items(cls, items: List[dict]) -> "AnalysisColumns":
+        """Converts the list of dicts Spotify sends into columns
+
+        Args:
+            items (List[dict]): Items of one category, sorted by start time
+
+        Returns:
+            AnalysisColumns: The same items as columns
+        """
+        fields = [field for field in (items[0] if items else {}) if field not in TIME_COLUMNS]
+        columns = {}
+        for field in fields:
+            values = [item[field] for item in items]
+            if isinstance(values[0], list):
+                columns[field] = np.array(values, dtype=np.float32)
+            elif all(isinstance(value, int) for value in values):
+                columns[field] = np.array(values, dtype=np.int64)
+            else:
+                columns[field] = np.array(values, dtype=np.float64)
+
+        return cls.from_columns(
+            np.array([item["start"] for item in items], dtype=np.float64),
+            np.array([item["duration"] for item in items], dtype=np.float64),
+            columns,
+        )
+
+    def save(self, directory: Path, name: str) -> dict:
+        """Writes every column to its own .npy file
+
+        Args:
+            directory (Path): Directory to write to
+            name (str): Prefix of the file names, usually the category
+
+        Returns:
+            dict: Layout of the files to pass to load
+        """
+        np.save(directory / f"{name}.start.npy", self.start)
+        np.save(directory / f"{name}.duration.npy", self.duration)
+        for position, (_, block) in enumerate(self._row_blocks):
+            np.save(directory / f"{name}.block{position}.npy", block)
+        for field, matrix in self._matrices.items():
+            np.save(directory / f"{name}.{field}.npy", matrix)
+
+        return {
+            "blocks": [list(fields) for fields, _ in self._row_blocks],
+            "matrices": list(self._matrices),
+        }
+
+    @classmethod
+    def load(
+        cls, directory: Path, name: str, layout: dict, mmap_mode: Optional[str] = "r"
+    ) -> "AnalysisColumns":
+        """Reads columns written by save, memory mapping them by default so they are
+            only paged in from disk as they are used
+
+        Args:
+            directory (Path): Directory the columns were saved in
+            name (str): Prefix the columns were saved with
+            layout (dict): Layout returned by save
+            mmap_mode (Optional[str]): Passed on to np.load. Defaults to "r".
+
+        Returns:
+            AnalysisColumns: The saved columns
+        """
+        def load_array(suffix):
+            return np.load(directory / f"{name}.{suffix}.npy", mmap_mode=mmap_mode)
+
+        return cls(
+            load_array("start"),
+            load_array("duration"),
+            [
+                (tuple(fields), load_array(f"block{position}"))
+                for position, fields in enumerate(layout["blocks"])
+            ],
+            {field: load_array(field) for field in layout["matrices"]},
+        )
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def confidence(self) -> np.ndarray:
+        return self.columns["confidence"]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by every column"""
+        return (
+            self.start.nbytes
+            + self.duration.nbytes
+            + self.end.nbytes
+            + sum(block.nbytes for _, block in self._row_blocks)
+            + sum(matrix.nbytes for matrix in self._matrices.values())
+        )
+
+    def active_index(self, track_time_seconds: float) -> int:
+        """Finds the item playing at a point in the track
+
+        Args:
+            track_time_seconds (float): Point in track to check
+
+        Returns:
+            int: Index of the first item that started at or before and ends at or
+                after that time, NO_ITEM if there is none
+        """
+        index = int(self.end.searchsorted(track_time_seconds))
+        if index < len(self) and self.start[index] <= track_time_seconds:
+            return index
+
+        return NO_ITEM
+
+    def active_indices(self, track_times_seconds: np.ndarray) -> np.ndarray:
+        """Finds the item playing at every one of many points in the track
+
+        Args:
+            track_times_seconds (np.ndarray): Points in track to check, in any order
+
+        Returns:
+            np.ndarray: Index of the active item for every time, NO_ITEM where there
+                is none
+        """
+        times = np.asarray(track_times_seconds, dtype=np.float64)
+        indices = np.searchsorted(self.end, times, "left")
+        found = indices < len(self)
+        found[found] = self.start[indices[found]] <= times[found]
+
+        return np.where(found, indices, NO_ITEM)
+
+    def item(self, index: int) -> Optional[dict]:
+        """Builds the dict for one item the way Spotify sent it
+
+        Args:
+            index (int): Index of the item, NO_ITEM gives None
+
+        Returns:
+            Optional[dict]: The item with its index added
+        """
+        if index == NO_ITEM:
+            return None
+
+        item = {
+            "index": index,
+            "start": float(self.start[index]),
+            "duration": float(self.duration[index]),
+        }
+        for fields, block in self._row_blocks:
+            item.update(zip(fields, block[index].tolist()))
+        for field, matrix in self._matrices.items():
+            item[field] = matrix[index].tolist()
+
+        return item
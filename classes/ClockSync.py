@@ -0,0 +1,370 @@
+"""Keeps the playback clocks of several devices in step over UDP.
+
+One device is the time leader and the others follow it. Every POLL_INTERVAL_S a
+ follower sends the leader a request stamped with its clock. The leader answers with
+ when the request arrived and when the reply left, by its own clock, plus a beacon:
+ the track position of its running visualizer and whether it is paused. That gives
+ the follower the four timestamps NTP uses to work out how far apart the two clocks
+ are and how long the round trip took. The leader also sends an unprompted beacon to
+ every follower as soon as it seeks or pauses.
+
+A single round trip over Wi-Fi can be held up by tens of milliseconds, so the
+ follower keeps its last FILTER_SAMPLES measurements and trusts the one with the
+ shortest round trip, which had the least time to be delayed. With the offset known
+ the follower works out where the leader's track is right now and moves its own
+ playback clock there if they are further apart than the offset can be trusted to:
+ half that round trip, the jitter between measurements or SYNC_TOLERANCE_S, whichever
+ is largest. Smaller gaps could be measurement error, and jumping the clock for them
+ would make the lights stutter on a noisy network. Visualizers count frames from the
+ track position, so followers then render the same frame index as the leader at the
+ same time. The gap measured before each correction is reported as the skew between
+ the devices.
+"""
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+import socket
+import struct
+import threading
+import time
+
+from classes.PlaybackClock import PlaybackClock
+
+from config import log
+
+ROLE_LEADER = "leader"
+ROLE_FOLLOWER = "follower"
+
+SYNC_PORT = 5005
+# How often followers measure the offset to the leader
+POLL_INTERVAL_S = 0.5
+# Measurements the offset is picked from
+FILTER_SAMPLES = 8
+# Followers that haven't been heard from for this long don't get beacons
+FOLLOWER_TIMEOUT_S = 5
+# Track positions closer than this to the leader's are left alone, even when the
+# offset is measured more precisely
+SYNC_TOLERANCE_S = 0.002
+
+MAGIC = b"XSYN"
+KIND_REQUEST = 1
+KIND_REPLY = 2
+KIND_BEACON = 3
+# Magic, kind, sequence, follower send time and the skew the follower last measured
+REQUEST = struct.Struct("!4sBIqq")
+# Magic, kind, playing, paused, sequence, follower send time, leader receive time,
+# leader send time and track position, times in nanoseconds
+REPLY = struct.Struct("!4sBBBIqqqq")
+
+# Source of the playback clock to keep in step, None when nothing is playing
+ClockSource = Callable[[], Optional[PlaybackClock]]
+
+
+def to_ns(seconds: float) -> int:
+    return int(round(seconds * 1e9))
+
+
+class OffsetFilter:
+    def __init__(self, size: int = FILTER_SAMPLES) -> None:
+        """Picks the offset to another clock out of the latest round trips
+
+        Args:
+            size (int, optional): Number of round trips kept. Defaults to
+                FILTER_SAMPLES.
+        """
+        self.samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, sent_s: float, received_s: float, replied_s: float, back_s: float):
+        """Adds one round trip
+
+        Args:
+            sent_s (float): Local time the request was sent
+            received_s (float): Remote time the request arrived
+            replied_s (float): Remote time the reply was sent
+            back_s (float): Local time the reply arrived
+        """
+        offset_s = ((received_s - sent_s) + (replied_s - back_s)) / 2
+        delay_s = (back_s - sent_s) - (replied_s - received_s)
+        self.samples.append((delay_s, offset_s))
+
+    @property
+    def best(self) -> Tuple[float, float]:
+        """Round trip time and offset of the quickest round trip"""
+        return min(self.samples)
+
+    @property
+    def offset_s(self) -> float:
+        """Seconds to add to local time to get remote time"""
+        return self.best[1]
+
+    @property
+    def delay_s(self) -> float:
+        """Round trip time of the sample the offset was taken from"""
+        return self.best[0]
+
+    @property
+    def jitter_s(self) -> float:
+        """Root mean square distance of every offset from the one picked"""
+        offset_s = self.offset_s
+        squares = [(sample - offset_s) ** 2 for _, sample in self.samples]
+        return (sum(squares) / len(squares)) ** 0.5
+
+
+class ClockLeader:
+    def __init__(
+        self,
+        clock_source: ClockSource,
+        host: str = "",
+        port: int = SYNC_PORT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Answers followers with its clock and the position of the track playing
+
+        Args:
+            clock_source (ClockSource): Gets the playback clock of the running
+                visualizer
+            host (str, optional): Address to listen on. Defaults to every address.
+            port (int, optional): UDP port to listen on, 0 to pick a free one.
+                Defaults to SYNC_PORT.
+            clock (Callable[[], float], optional): Monotonic time in seconds, the
+                same one the playback clocks use. Defaults to time.monotonic.
+        """
+        self.clock_source = clock_source
+        self.clock = clock
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        # Wakes up now and then to see if it has been closed
+        self.sock.settimeout(POLL_INTERVAL_S)
+        self.address = self.sock.getsockname()
+        # Follower address to when it was last heard from and the skew it measured
+        self.followers: Dict[Tuple[str, int], Tuple[float, float]] = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def beacon(self):
+        """Sends the track position to every follower straight away, for seeks and
+        pauses
+        """
+        now = self.clock()
+        with self.lock:
+            followers = [
+                address
+                for address, (seen_s, _) in self.followers.items()
+                if now - seen_s < FOLLOWER_TIMEOUT_S
+            ]
+        for address in followers:
+            self.__send(KIND_BEACON, address)
+
+    def stats(self) -> dict:
+        """Followers heard from lately and the skew each last measured
+
+        Returns:
+            dict: Role, address and followers
+        """
+        now = self.clock()
+        with self.lock:
+            followers = {
+                f"{host}:{port}": {
+                    "skew_ms": skew_s * 1000,
+                    "last_seen_s": now - seen_s,
+                }
+                for (host, port), (seen_s, skew_s) in self.followers.items()
+                if now - seen_s < FOLLOWER_TIMEOUT_S
+            }
+        return {"role": ROLE_LEADER, "port": self.address[1], "followers": followers}
+
+    def close(self):
+        self.closed = True
+        self.thread.join()
+        self.sock.close()
+
+    def __run(self):
+        while not self.closed:
+            try:
+                message, address = self.sock.recvfrom(REQUEST.size)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            received_s = self.clock()
+
+            try:
+                magic, kind, sequence, sent_ns, skew_ns = REQUEST.unpack(message)
+            except struct.error:
+                continue
+            if magic != MAGIC or kind != KIND_REQUEST:
+                continue
+
+            with self.lock:
+                self.followers[address] = (received_s, skew_ns / 1e9)
+            self.__send(KIND_REPLY, address, sequence, sent_ns, to_ns(received_s))
+
+    def __send(
+        self,
+        kind: int,
+        address: Tuple[str, int],
+        sequence: int = 0,
+        sent_ns: int = 0,
+        received_ns: int = 0,
+    ):
+        playback = self.clock_source()
+        if playback:
+            now, progress_s, paused = playback.position()
+        else:
+            now, progress_s, paused = self.clock(), 0.0, False
+
+        message = REPLY.pack(
+            MAGIC,
+            kind,
+            playback is not None,
+            paused,
+            sequence,
+            sent_ns,
+            received_ns,
+            to_ns(now),
+            to_ns(progress_s),
+        )
+        try:
+            self.sock.sendto(message, address)
+        except OSError as error:
+            log.warning(f"Couldn't send clock sync to {address} : {error}")
+
+
+class ClockFollower:
+    def __init__(
+        self,
+        clock_source: ClockSource,
+        leader: Tuple[str, int],
+        poll_interval_s: float = POLL_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Keeps the playback clock of the running visualizer in step with a leader
+
+        Args:
+            clock_source (ClockSource): Gets the playback clock of the running
+                visualizer
+            leader (Tuple[str, int]): Host and port of the leader
+            poll_interval_s (float, optional): Seconds between measurements.
+                Defaults to POLL_INTERVAL_S.
+            clock (Callable[[], float], optional): Monotonic time in seconds, the
+                same one the playback clocks use. Defaults to time.monotonic.
+        """
+        self.clock_source = clock_source
+        self.leader = leader
+        self.poll_interval_s = poll_interval_s
+        self.clock = clock
+        self.filter = OffsetFilter()
+        self.sequence = 0
+        self.skew_s = 0.0
+        self.corrections = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(poll_interval_s)
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stats(self) -> dict:
+        """How far the clocks are apart and how well that is known
+
+        Returns:
+            dict: Role, leader, offset, round trip time, jitter, the skew measured
+                before the last correction and how many corrections were made
+        """
+        stats = {
+            "role": ROLE_FOLLOWER,
+            "leader": f"{self.leader[0]}:{self.leader[1]}",
+            "samples": len(self.filter),
+            "skew_ms": self.skew_s * 1000,
+            "corrections": self.corrections,
+        }
+        if len(self.filter):
+            stats["offset_ms"] = self.filter.offset_s * 1000
+            stats["delay_ms"] = self.filter.delay_s * 1000
+            stats["jitter_ms"] = self.filter.jitter_s * 1000
+        return stats
+
+    def close(self):
+        self.closed.set()
+        self.thread.join()
+        self.sock.close()
+
+    def __run(self):
+        while not self.closed.is_set():
+            self.sequence = (self.sequence + 1) % 2**32
+            poll_at = self.clock()
+            try:
+                self.sock.sendto(
+                    REQUEST.pack(
+                        MAGIC,
+                        KIND_REQUEST,
+                        self.sequence,
+                        to_ns(poll_at),
+                        to_ns(self.skew_s),
+                    ),
+                    self.leader,
+                )
+            except OSError as error:
+                log.warning(f"Couldn't reach clock sync leader {self.leader} : {error}")
+
+            # Handles replies and beacons until the next measurement is due
+            while not self.closed.is_set():
+                remaining_s = poll_at + self.poll_interval_s - self.clock()
+                if remaining_s <= 0:
+                    break
+                self.sock.settimeout(remaining_s)
+                try:
+                    message = self.sock.recv(REPLY.size)
+                except socket.timeout:
+                    break
+                except OSError:
+                    self.closed.wait(remaining_s)
+                    break
+                self.__receive(message, self.clock())
+
+    def __receive(self, message: bytes, back_s: float):
+        try:
+            fields = REPLY.unpack(message)
+        except struct.error:
+            return
+        magic, kind, playing, paused, sequence, sent_ns, received_ns, replied_ns = (
+            fields[:8]
+        )
+        progress_s = fields[8] / 1e9
+        if magic != MAGIC:
+            return
+
+        if kind == KIND_REPLY:
+            # Replies to earlier requests took longer than a poll, they would only
+            # drag the estimate off
+            if sequence != self.sequence:
+                return
+            self.filter.add(sent_ns / 1e9, received_ns / 1e9, replied_ns / 1e9, back_s)
+        elif kind != KIND_BEACON or not len(self.filter):
+            return
+
+        if playing:
+            self.__follow(replied_ns / 1e9, progress_s, bool(paused))
+
+    def __follow(self, replied_s: float, leader_progress_s: float, paused: bool):
+        playback = self.clock_source()
+        if playback is None:
+            return
+
+        now, progress_s, own_paused = playback.position()
+        if not paused:
+            # Where the leader's track is by now, in leader time
+            leader_progress_s += now + self.filter.offset_s - replied_s
+        self.skew_s = progress_s - leader_progress_s
+
+        # The offset can be off by up to half the round trip it was measured over
+        tolerance_s = max(
+            SYNC_TOLERANCE_S, self.filter.jitter_s, self.filter.delay_s / 2
+        )
+        if abs(self.skew_s) > tolerance_s or paused != own_paused:
+            playback.sync(progress_ms=leader_progress_s * 1000, paused=paused)
+            self.corrections += 1
@@ -0,0 +1,113 @@
+"""Lookup tables for colors so the rendering hot loops index arrays instead of doing
+    arithmetic per pixel.
+
+The rainbow wheel is built once at import. Gamma and global brightness tables are
+ folded together into one lookup per color channel, so correcting a whole frame is
+ three table reads and two ORs no matter how the correction was configured.
+"""
+from typing import Sequence, Union
+
+import numpy as np
+
+TABLE_SIZE = 256
+
+
+def build_wheel_table() -> np.ndarray:
+    """Builds the packed color for every one of the 256 rainbow wheel positions. Gives
+        the same colors as LightString.wheel
+
+    Returns:
+        np.ndarray: 256 packed uint32 colors
+    """
+    pos = np.arange(TABLE_SIZE, dtype=np.uint32)
+    rising = np.where(pos < 85, pos, np.where(pos < 170, pos - 85, pos - 170))
+    up = rising * 3
+    down = 255 - rising * 3
+    zero = np.zeros_like(pos)
+
+    red = np.where(pos < 85, up, np.where(pos < 170, down, zero))
+    green = np.where(pos < 85, down, np.where(pos < 170, zero, up))
+    blue = np.where(pos < 85, zero, np.where(pos < 170, up, down))
+
+    return ((red << 16) | (green << 8) | blue).astype(np.uint32)
+
+
+WHEEL_TABLE = build_wheel_table()
+WHEEL_TABLE.flags.writeable = False
+
+
+class ColorTable:
+    def __init__(
+        self,
+        brightness: int = 255,
+        gamma: Union[float, Sequence[float]] = 1.0,
+    ) -> None:
+        """Color correction applied to whole frames before they go to the strip
+
+        Args:
+            brightness (int, optional): Global brightness from 0-255. Scales the same
+                way the ws281x driver does. Defaults to 255.
+            gamma (Union[float, Sequence[float]], optional): Gamma for every channel,
+                or one gamma each for red, green and blue. Defaults to 1.0.
+        """
+        if isinstance(gamma, (int, float)):
+            gamma = (gamma, gamma, gamma)
+
+        self.brightness = brightness
+        self.gamma = tuple(gamma)
+
+        scale = self.build_brightness_table(brightness)
+        channel_tables = [self.build_gamma_table(g)[scale] for g in self.gamma]
+        self.is_identity = all(
+            np.array_equal(table, np.arange(TABLE_SIZE)) for table in channel_tables
+        )
+
+        # Each channel table already shifted into place so lookups can just be ORed
+        self.red, self.green, self.blue = [
+            table.astype(np.uint32) << shift
+            for table, shift in zip(channel_tables, (16, 8, 0))
+        ]
+
+    @staticmethod
+    def build_gamma_table(gamma: float) -> np.ndarray:
+        """Builds a 256 entry gamma correction table
+
+        Args:
+            gamma (float): Gamma exponent, 1.0 leaves values unchanged
+
+        Returns:
+            np.ndarray: Corrected uint8 value for every input value
+        """
+        values = np.arange(TABLE_SIZE) / (TABLE_SIZE - 1)
+        return np.round(np.power(values, gamma) * (TABLE_SIZE - 1)).astype(np.uint8)
+
+    @staticmethod
+    def build_brightness_table(brightness: int) -> np.ndarray:
+        """Builds a 256 entry brightness scaling table
+
+        Args:
+            brightness (int): Brightness from 0-255
+
+        Returns:
+            np.ndarray: Scaled uint8 value for every input value
+        """
+        values = np.arange(TABLE_SIZE, dtype=np.uint32)
+        return ((values * (brightness + 1)) >> 8).astype(np.uint8)
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Runs every pixel of a frame through the folded color tables
+
+        Args:
+            frame (np.ndarray): Packed uint32 colors
+
+        Returns:
+            np.ndarray: Corrected frame, or the same frame if there is nothing to do
+        """
+        if self.is_identity:
+            return frame
+
+        return (
+            self.red[(frame >> 16) & 0xFF]
+            | self.green[(frame >> 8) & 0xFF]
+            | self.blue[frame & 0xFF]
+        )
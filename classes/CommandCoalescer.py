@@ -0,0 +1,73 @@
+"""Latest wins holding area for commands that arrive faster than they can be shown.
+
+Dragging a color picker sends a burst of commands where only the newest one matters
+ by the time the strip is free to show anything. Commands are held per target, and a
+ new command for a target replaces the one waiting for it instead of queueing behind
+ it. Targets are handed out oldest first by when their newest command came in.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Most targets to hold before the oldest one is dropped
+DEFAULT_MAX_PENDING = 64
+
+
+class CommandCoalescer:
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING) -> None:
+        """Holds the newest command for each target until it is taken
+
+        Args:
+            max_pending (int, optional): Most targets to hold commands for. Defaults
+                to DEFAULT_MAX_PENDING.
+        """
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.submitted = 0
+        self.merged = 0
+        self.dropped = 0
+        self.taken = 0
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def submit(self, target: Hashable, command: Any):
+        """Holds command for target, replacing any command already waiting for it
+
+        Args:
+            target (Hashable): What the command acts on
+            command (Any): The command
+        """
+        self.submitted += 1
+        if target in self.pending:
+            self.merged += 1
+            del self.pending[target]
+        elif len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            self.pending.popitem(last=False)
+
+        self.pending[target] = command
+
+    def take(self) -> Optional[Tuple[Hashable, Any]]:
+        """Hands out the target that has waited longest with its newest command
+
+        Returns:
+            Optional[Tuple[Hashable, Any]]: The target and command, None if nothing is
+                waiting
+        """
+        if not self.pending:
+            return None
+
+        self.taken += 1
+        return self.pending.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Counts of commands submitted, merged into a newer one for the same target,
+            dropped because too many targets were waiting and taken
+        """
+        return {
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "taken": self.taken,
+            "pending": len(self.pending),
+        }
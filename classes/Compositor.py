@@ -0,0 +1,233 @@
+"""Layered compositor that renders every DynamicDisplay group effect in one loop.
+
+Each layer draws into its own group of pixels. On every tick the compositor starts
+ from a black frame and lets the layers draw over it from the lowest priority to the
+ highest, blending each one into whatever the layers below it left. Layers keep
+ their own state between ticks and work out what to draw from the track time they
+ are given, so nothing has to block or sleep between updates. Beat layers react to
+ the analysis through envelopes timed from each item's start, see Envelope.py.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from rpi_ws281x import Color
+
+from classes.AnalysisColumns import NO_ITEM
+from classes.Envelope import MAX_ENVELOPES, EnvelopeBank
+from classes.FrameRenderer import FrameRenderer
+from classes.LedColor import LedColor
+from classes.PixelGroup import PixelGroup
+from classes.Transition import EASING_LINEAR
+
+# How a layer is combined with the layers below it
+BLEND_REPLACE = "replace"
+BLEND_ADD = "add"
+BLEND_MAX = "max"
+BLEND_MODES = (BLEND_REPLACE, BLEND_ADD, BLEND_MAX)
+
+# Share of the time until the next flash a beat takes to fade to black
+DECAY_FRACTION = 0.5
+
+
+class Layer(ABC):
+    def __init__(
+        self,
+        pixels: Union[List[int], PixelGroup],
+        priority: int = 0,
+        blend: str = BLEND_REPLACE,
+    ) -> None:
+        """A group of pixels the compositor draws one effect into
+
+        Args:
+            pixels (Union[List[int], PixelGroup]): Pixel numbers the layer draws on
+            priority (int, optional): Layers with a higher priority are drawn on top.
+                Defaults to 0.
+            blend (str, optional): One of BLEND_MODES. Defaults to BLEND_REPLACE.
+        """
+        if blend not in BLEND_MODES:
+            raise ValueError(f"Unknown blend mode {blend}, expected one of {BLEND_MODES}")
+
+        # Pixels are anything a frame can be indexed with, a slice for even groups
+        if isinstance(pixels, PixelGroup):
+            self.pixels = pixels.selector
+            self.size = len(pixels)
+        else:
+            self.pixels = np.asarray(pixels, dtype=np.intp)
+            self.size = len(self.pixels)
+        self.priority = priority
+        self.blend = blend
+
+    @abstractmethod
+    def render(
+        self, track_time_s: float, active: Dict[str, int]
+    ) -> Optional[Union[int, np.ndarray]]:
+        """Works out what the layer shows at a point in the track
+
+        Args:
+            track_time_s (float): Track progress in seconds
+            active (Dict[str, int]): Index of the active audio analysis item in every
+                category at that time
+
+        Returns:
+            Optional[Union[int, np.ndarray]]: One color for every pixel in the layer,
+                an array with a color for each of them, or None to draw nothing
+        """
+        raise NotImplementedError
+
+
+class BeatLayer(Layer):
+    def __init__(
+        self,
+        pixels: Union[List[int], PixelGroup],
+        audio_analysis,
+        nth_item: int,
+        item: str = "beats",
+        colors: List[Color] = None,
+        color_change_on: str = "bars",
+        confidence_threshold: float = 0,
+        priority: int = 0,
+        blend: str = BLEND_REPLACE,
+        attack_s: float = 0,
+        attack_easing: str = EASING_LINEAR,
+        decay_easing: str = EASING_LINEAR,
+    ) -> None:
+        """Flashes its pixels on every nth item in the audio analysis and fades them to
+            black over half of the time until the next flash. Each flash is an
+            envelope starting when the item starts in the analysis, however late
+            the frame that notices it is.
+
+        Args:
+            pixels (Union[List[int], PixelGroup]): Pixel numbers the layer draws on
+            audio_analysis (SpotifyAudioAnalysis): Analysis to read items from
+            nth_item (int): Flash on every nTh item
+            item (str): Which specific key in the audio analysis to flash on
+            colors (List[Color]): Colors to flash. Uses a random color if no list is
+                provided
+            color_change_on (str): Key in the audio analysis to change colors on
+            confidence_threshold (float): Items with a lower confidence are ignored
+            priority (int, optional): Layers with a higher priority are drawn on top.
+                Defaults to 0.
+            blend (str, optional): One of BLEND_MODES. Defaults to BLEND_REPLACE.
+            attack_s (float, optional): Seconds each flash takes to reach its full
+                color. Defaults to 0.
+            attack_easing (str, optional): One of Transition.EASINGS for the attack.
+                Defaults to EASING_LINEAR.
+            decay_easing (str, optional): One of Transition.EASINGS for the fade.
+                Defaults to EASING_LINEAR.
+        """
+        super().__init__(pixels, priority, blend)
+        self.nth_item = nth_item
+        self.item = item
+        self.items = getattr(audio_analysis, item)
+        self.colors = colors
+        self.color_change_on = color_change_on
+        self.confidence_threshold = confidence_threshold
+
+        self.attack_s = attack_s
+        self.envelopes = EnvelopeBank(
+            attack_easing=attack_easing, decay_easing=decay_easing
+        )
+
+        self.color = LedColor.black
+        self.color_index = None
+        self.item_index = None
+
+    def render(self, track_time_s: float, active: Dict[str, int]) -> int:
+        color_index = active.get(self.color_change_on, NO_ITEM)
+        if color_index != NO_ITEM and color_index != self.color_index:
+            self.color_index = color_index
+            self.color = (
+                LedColor.get_random()
+                if not self.colors
+                else self.colors[color_index % len(self.colors)]
+            )
+
+        item_index = active.get(self.item, NO_ITEM)
+        if item_index != NO_ITEM and item_index != self.item_index:
+            self.__start_envelopes(item_index)
+
+        return self.envelopes.color_at(track_time_s)
+
+    def __start_envelopes(self, item_index: int):
+        # Items passed over since the last frame still flash, unless playback jumped
+        first = item_index
+        if self.item_index is not None and self.item_index < item_index:
+            first = max(self.item_index + 1, item_index - MAX_ENVELOPES + 1)
+        elif self.item_index is not None:
+            self.envelopes.clear()
+        self.item_index = item_index
+
+        for index in range(first, item_index + 1):
+            if (
+                index % self.nth_item != 0
+                or self.items.confidence[index] < self.confidence_threshold
+            ):
+                continue
+
+            self.envelopes.add(
+                onset_s=float(self.items.start[index]),
+                attack_s=self.attack_s,
+                decay_s=float(self.items.duration[index])
+                * self.nth_item
+                * DECAY_FRACTION,
+                color=self.color,
+            )
+
+
+class Compositor:
+    def __init__(self, led_count: int) -> None:
+        """Blends layers into one frame
+
+        Args:
+            led_count (int): Number of pixels in a frame
+        """
+        self.led_count = led_count
+        self.layers: List[Layer] = []
+        self.frame = FrameRenderer.blank(led_count)
+
+    def add_layer(self, layer: Layer) -> Layer:
+        """Adds a layer, keeping layers with the same priority in the order added
+
+        Args:
+            layer (Layer): Layer to draw on every tick
+
+        Returns:
+            Layer: The layer added
+        """
+        self.layers.append(layer)
+        self.layers.sort(key=lambda added: added.priority)
+        return layer
+
+    def render(self, track_time_s: float, active: Dict[str, int]) -> np.ndarray:
+        """Draws every layer into the frame
+
+        Args:
+            track_time_s (float): Track progress in seconds
+            active (Dict[str, int]): Index of the active audio analysis item in every
+                category at that time
+
+        Returns:
+            np.ndarray: The composited frame, reused between calls
+        """
+        self.frame[:] = 0
+        for layer in self.layers:
+            colors = layer.render(track_time_s, active)
+            if colors is None:
+                continue
+
+            if layer.blend == BLEND_REPLACE:
+                self.frame[layer.pixels] = colors
+                continue
+
+            below = FrameRenderer.unpack_rgb(self.frame[layer.pixels])
+            above = FrameRenderer.unpack_rgb(
+                np.broadcast_to(np.asarray(colors, dtype=np.uint32), layer.size)
+            )
+            if layer.blend == BLEND_ADD:
+                rgb = np.minimum(below.astype(np.uint16) + above, 255)
+            else:
+                rgb = np.maximum(below, above)
+            self.frame[layer.pixels] = FrameRenderer.pack_rgb(rgb)
+
+        return self.frame
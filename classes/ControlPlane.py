@@ -0,0 +1,168 @@
+"""Runs the server's slow control work off the request handlers.
+
+The server runs under eventlet, so a handler that blocks on stopping a process,
+ rebuilding the light string or writing the config file holds up every other HTTP
+ and socket.io client until it's done. Handlers validate the request, submit the
+ work here and return straight away. One thread runs the jobs in the order they were
+ submitted, so commands still take effect in the order they arrived.
+
+Jobs sent for a target replace any job for that target that hasn't started yet, so a
+ burst of color changes only runs the newest one. Two latencies are kept: how long
+ handlers took to answer, and how long each kind of job took from being submitted to
+ being done, which is when its command has reached the strip or worker.
+"""
+from itertools import count
+from typing import Callable, Dict, Hashable, Optional
+import threading
+import time
+
+from classes.CommandCoalescer import CommandCoalescer
+from config import log
+
+# Target for everything that changes what the lights show
+LIGHTS_TARGET = "lights"
+
+
+class LatencyStats:
+    def __init__(self) -> None:
+        """Running count, total and worst of a latency"""
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def as_dict(self) -> dict:
+        """Count, average and worst latency in milliseconds"""
+        return {
+            "count": self.count,
+            "avg_ms": self.total_s / max(self.count, 1) * 1000,
+            "max_ms": self.max_s * 1000,
+        }
+
+
+class ControlPlane:
+    def __init__(self) -> None:
+        """Starts the thread that runs submitted jobs"""
+        self.pending = CommandCoalescer()
+        self.condition = threading.Condition()
+        self.job_ids = count(1)
+        self.submitted = 0
+        self.finished = 0
+        self.errors = 0
+        self.closed = False
+        self.request_latency: Dict[str, LatencyStats] = {}
+        self.effect_latency: Dict[str, LatencyStats] = {}
+
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def submit(
+        self, name: str, job: Callable, *args, target: Hashable = None, **kwargs
+    ) -> int:
+        """Queues a job to run on the control thread
+
+        Args:
+            name (str): Kind of job, used for its latency stats
+            job (Callable): Function to call
+            args: Arguments for the function
+            target (Hashable, optional): What the job changes. A newer job for the same
+                target replaces this one if it hasn't started. Jobs without a target
+                are never replaced.
+            kwargs: Keyword arguments for the function
+
+        Returns:
+            int: Id of the job
+        """
+        with self.condition:
+            job_id = next(self.job_ids)
+            self.submitted = job_id
+            self.pending.submit(
+                job_id if target is None else target,
+                (job_id, name, job, args, kwargs, time.perf_counter()),
+            )
+            self.condition.notify_all()
+        return job_id
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> bool:
+        """Waits until a job is done or was replaced by a newer one
+
+        Args:
+            job_id (int): Id returned when the job was submitted
+            timeout (Optional[float]): Most seconds to wait, waits forever if not given
+
+        Returns:
+            bool: True if the job was done in time
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.finished >= job_id, timeout)
+
+    def record_request(self, name: str, seconds: float):
+        """Adds how long a handler took to answer to the request latency stats
+
+        Args:
+            name (str): Endpoint or event the request was for
+            seconds (float): Time from receiving the request to answering it
+        """
+        with self.condition:
+            self.request_latency.setdefault(name, LatencyStats()).add(seconds)
+
+    def stats(self) -> dict:
+        """Counts of jobs, and request and submit to done latency by name
+
+        Returns:
+            dict: The stats
+        """
+        with self.condition:
+            return {
+                "submitted": self.submitted,
+                "finished": self.finished,
+                "pending": len(self.pending),
+                "merged": self.pending.merged,
+                "errors": self.errors,
+                "requests": {
+                    name: latency.as_dict()
+                    for name, latency in self.request_latency.items()
+                },
+                "effects": {
+                    name: latency.as_dict()
+                    for name, latency in self.effect_latency.items()
+                },
+            }
+
+    def close(self, timeout: Optional[float] = 1.0):
+        """Stops the control thread once the jobs already submitted are done
+
+        Args:
+            timeout (Optional[float]): Most seconds to wait. Defaults to 1.0.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+    def __run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                _, (job_id, name, job, args, kwargs, submitted) = self.pending.take()
+
+            try:
+                job(*args, **kwargs)
+            except Exception:
+                log.exception(f"Control job {name} failed")
+                with self.condition:
+                    self.errors += 1
+
+            with self.condition:
+                self.effect_latency.setdefault(name, LatencyStats()).add(
+                    time.perf_counter() - submitted
+                )
+                # Jobs replaced before they started have lower ids, so count as done
+                self.finished = max(self.finished, job_id)
+                self.condition.notify_all()
@@ -1,281 +1,493 @@
-"""This module handles displaying lights on the device for complex visualizations
-
-It runs the light_string in a second thread constantly refreshing it based on what
- exists in the DynamicDisplay class pixel_array like a primitive display driver. This
- array is shared with the main thread and is thread safe, so it can be updated while
- ignoring the display refresh cycles and will update the display device on the
- next cycle.
-"""
-from multiprocessing import Process, Array
-from typing import Callable, List
-import time
-from rpi_ws281x import Color
-from config import log
-
-from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
-from classes.LedColor import LedColor
-
-
-class DynamicDisplay:
-    def __init__(self, light_string):
-        self.light_string = light_string
-        self.groups = {}
-        self.group_threads = {}
-        self.light_refresh_loop = None
-        self.pixel_array = Array("l", light_string.led_count)
-
-    def reinitialize(self):
-        self.terminate_all_running_process()
-        self.pixel_array = None
-        self.pixel_array = Array("l", self.light_string.led_count)
-        self.__start_refresh_thread()
-        log.info(
-            "All threads stopped, pixel_array reinitialized and display thread"
-            " restarted."
-        )
-
-    def __terminate_string_refresh_loop(self):
-        if self.light_refresh_loop:
-            self.light_refresh_loop.terminate()
-
-    def terminate_all_running_process(self):
-        """End all processes associated with the class. Meant to be run in the finally
-        block anytime the class is instantiated.
-        """
-        if not self.light_refresh_loop:
-            return
-
-        self.light_refresh_loop.terminate()
-
-        # Terminate all open animation threads
-        for key in self.group_threads.keys():
-            self.group_threads[key].terminate()
-
-    def __start_refresh_thread(self):
-        self.light_refresh_loop = Process(
-            target=self.__refresh_loop, args=[self.pixel_array]
-        )
-        self.light_refresh_loop.start()
-
-    def __refresh_loop(self, pixel_array):
-        while True:
-            for pixel_n, color in enumerate(pixel_array):
-                self.light_string.strip.setPixelColor(pixel_n, color)
-
-            self.light_string.strip.show()
-            time.sleep(0.005)
-
-    def __start_thread_for_group(
-        self,
-        group_name: str,
-        target: Callable,
-        args: list = [],
-        kwargs: dict = {},
-    ):
-        log.info(f"Starting thread for group {group_name}")
-        self.group_threads[group_name] = Process(
-            target=target, args=args, kwargs=kwargs
-        )
-        self.group_threads[group_name].start()
-
-    def update_group(self, group_name: str, color: Color):
-        """Updates every pixel in the group to the provided color
-
-        Args:
-            group_name (str): Key in groups dict to get pixel numbers from
-            color (Color): Color to update those pixels too
-        """
-        for pixel_n in self.groups[group_name]:
-            self.pixel_array[pixel_n] = color
-
-    def create_group_of_every_nth(self, n: int, offset: int, group_name: str):
-        group_pixels = []
-
-        for i in range(self.light_string.led_count):
-            if i % n == offset:
-                group_pixels.append(i)
-
-        self.groups[group_name] = group_pixels
-
-    def run_group_on_item(
-        self,
-        audio_analysis: SpotifyAudioAnalysis,
-        group_name: str,
-        nth_item: int,
-        item: str = "beats",
-        colors: List[Color] = None,
-        color_change_on: str = "bars",
-    ):
-        """Sets up a lighting pattern using item for the key grabbed in Audio Analysis
-
-        Args:
-            audio_analysis (SpotifyAudioAnalysis) : Audio analysis controller
-            group_name (str): Key in groups dict to get pixel numbers from
-            nth_item (int): Activate pixel on every nTh item
-            item (str): Which specific key in the audio analysis to use
-            colors (List[Color]): Colors to use for lighting pattern. Uses a random
-                color if no list is provided
-            color_change_on (str): Key to watch for from Audio Analysis to make color
-                changes on
-        """
-        last_active = {}
-        rgb_black = [0, 0, 0]
-        color = LedColor.black
-
-        while (
-            audio_analysis.get_track_progress_seconds()
-            < audio_analysis.track_duration * 1000
-        ):
-            now_active = audio_analysis.get_active_binary_search()
-
-            if not now_active:
-                self.__terminate_string_refresh_loop()
-                self.light_string.set_solid(LedColor.black)
-                return
-
-            if now_active.get(color_change_on) and (
-                not last_active.get(color_change_on)
-                == now_active.get(color_change_on)
-            ):
-                color = (
-                    LedColor.get_random()
-                    if not colors
-                    else colors[
-                        now_active.get(color_change_on)["index"] % len(colors)
-                    ]
-                )
-
-            active_item = now_active.get(item)
-
-            if (
-                not active_item
-                or active_item["confidence"]
-                < audio_analysis.confidence_average[item] * 0.5
-            ):
-                time.sleep(0.01)
-                continue
-
-            if active_item and (not last_active.get(item) == active_item):
-                if active_item["index"] % nth_item == 0:
-                    self.update_group(group_name, color)
-                    start_color_list = LedColor.get_rgb_value(color)
-                    for i in range(100):
-                        time.sleep(
-                            ((active_item["duration"] / 100) * nth_item) * 0.5
-                        )
-                        mid_color = LedColor.interpolate_rgb(
-                            start_color_list, rgb_black, i / 100
-                        )
-                        self.update_group(group_name, Color(*mid_color))
-
-            last_active = now_active
-
-    def dual_beats(self, audio_analysis: SpotifyAudioAnalysis):
-        self.groups = {}
-
-        log.info("Starting dual beats.")
-
-        self.create_group_of_every_nth(n=2, offset=0, group_name="all_beat")
-        self.create_group_of_every_nth(
-            n=2, offset=1, group_name="every_2nd_beat"
-        )
-
-        all_beat = {
-            "target": self.run_group_on_item,
-            "args": [audio_analysis, "all_beat", 1],
-            "kwargs": {
-                "color_change_on": "beats",
-                "item": "beats",
-                "colors": [
-                    Color(
-                        255,
-                        0,
-                        0,
-                    ),
-                    Color(
-                        255,
-                        255,
-                        255,
-                    ),
-                ],
-            },
-        }
-        every_2nd_beat = {
-            "target": self.run_group_on_item,
-            "args": [audio_analysis, "every_2nd_beat", 2],
-            "kwargs": {
-                "item": "beats",
-                "colors": [
-                    LedColor.green,
-                    LedColor.autumnOrange,
-                    LedColor.brightViolet,
-                    LedColor.fallYellow,
-                ],
-            },
-        }
-
-        self.__start_thread_for_group("all_beat", **all_beat)
-        self.__start_thread_for_group("every_2nd_beat", **every_2nd_beat)
-
-    def dual_beats_with_tatums(self, audio_analysis: SpotifyAudioAnalysis):
-        self.groups = {}
-
-        log.info("Starting dual beats.")
-
-        self.create_group_of_every_nth(n=3, offset=0, group_name="all_beat")
-        self.create_group_of_every_nth(
-            n=3, offset=1, group_name="every_2nd_beat"
-        )
-        self.create_group_of_every_nth(n=3, offset=2, group_name="tatum")
-
-        # Run on every beat
-        all_beat = {
-            "target": self.run_group_on_item,
-            "args": [audio_analysis, "all_beat", 1],
-            "kwargs": {
-                "color_change_on": "beats",
-                "item": "beats",
-                "colors": [
-                    Color(
-                        255,
-                        0,
-                        0,
-                    ),
-                    Color(
-                        255,
-                        255,
-                        255,
-                    ),
-                ],
-            },
-        }
-        # Run on every second beat
-        every_2nd_beat = {
-            "target": self.run_group_on_item,
-            "args": [audio_analysis, "every_2nd_beat", 2],
-            "kwargs": {
-                "item": "beats",
-                "colors": [
-                    LedColor.green,
-                    LedColor.autumnOrange,
-                    LedColor.brightViolet,
-                    LedColor.fallYellow,
-                ],
-            },
-        }
-
-        # Run on every Tatum
-        tatum = {
-            "target": self.run_group_on_item,
-            "args": [audio_analysis, "tatum", 1],
-            "kwargs": {
-                "item": "tatums",
-                "colors": [
-                    LedColor.brightViolet,
-                ],
-            },
-        }
-
-        self.__start_thread_for_group("all_beat", **all_beat)
-        self.__start_thread_for_group("every_2nd_beat", **every_2nd_beat)
-        self.__start_thread_for_group("tatum", **tatum)
+"""This module handles displaying lights on the device for complex visualizations
+
+It runs the light_string in a second process constantly refreshing it based on what
+ exists in the DynamicDisplay class frame_buffer like a primitive display driver. The
+ frame buffer lives in shared memory, so a visualization process can draw into its back
+ buffer and publish whole frames while ignoring the display refresh cycles, and the
+ display device shows the latest published frame on the next cycle. Every group effect
+ of a visualization is a layer in one compositor, so they all render in that single
+ process.
+"""
+from multiprocessing import Process
+from typing import Callable, List, Union
+import time
+
+import numpy as np
+from rpi_ws281x import Color
+from config import log
+
+from classes.Compositor import BeatLayer, Compositor, Layer
+from classes.AnalysisColumns import NO_ITEM
+from classes.LightShowTimeline import LightShowTimeline
+from classes.PixelGroup import PixelGroup
+from classes.PixelReceiver import PixelReceiver
+from classes.Metrics import (
+    ANALYSIS_LOOKUP_SECONDS,
+    BEAT_OFFSET_SECONDS,
+    LOOP_VISUALIZER,
+)
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+from classes.LedColor import LedColor
+from classes.SharedFrameBuffer import SharedFrameBuffer
+from classes.Tracer import (
+    RING_DISPLAY,
+    RING_VISUALIZER,
+    SPAN_ANALYSIS_LOOKUP,
+    SPAN_COMPOSITE,
+    SPAN_FRAME_BUFFER_PUBLISH,
+    SPAN_FRAME_BUFFER_READ,
+    TRACER,
+)
+
+# How often the display loop checks for a new frame to show
+REFRESH_INTERVAL_S = 0.005
+# How often an idle display loop wakes up to report the refreshes it skipped
+IDLE_REPORT_INTERVAL_S = 0.1
+# How often the layers are rendered while a visualization runs
+RENDER_INTERVAL_S = 0.005
+
+
+class DynamicDisplay:
+    def __init__(self, light_string):
+        self.light_string = light_string
+        self.groups = {}
+        self.group_threads = {}
+        self.light_refresh_loop = None
+        self.frame_buffer = SharedFrameBuffer(light_string.led_count)
+        # Whether frames are being pushed straight into the frame buffer by a client
+        self.streaming = False
+
+    def reinitialize(self):
+        self.terminate_all_running_process()
+        self.frame_buffer.clear()
+        self.__start_refresh_thread()
+        log.info(
+            "All threads stopped, frame_buffer cleared and display thread restarted."
+        )
+
+    def start_streaming(self):
+        """Clears the display and leaves it showing only frames published to the frame
+        buffer from outside, like a client streaming frames
+        """
+        self.reinitialize()
+        self.streaming = True
+
+    def start_receiving(self, **receiver_args):
+        """Clears the display and leaves it showing frames sent by sequencers over
+        E1.31 or DDP until something else is started
+
+        Args:
+            receiver_args: Keyword arguments for PixelReceiver
+        """
+        self.reinitialize()
+        self.__start_thread_for_group(
+            "receiver", self.receive_pixels, kwargs=receiver_args
+        )
+
+    def receive_pixels(self, **receiver_args):
+        """Publishes every frame received over E1.31 or DDP. Opens the sockets in the
+        process it runs in, so they are closed when it is terminated.
+
+        Args:
+            receiver_args: Keyword arguments for PixelReceiver
+        """
+        PixelReceiver(self.frame_buffer, **receiver_args).serve_forever()
+
+    def __terminate_string_refresh_loop(self):
+        if self.light_refresh_loop:
+            self.light_refresh_loop.terminate()
+
+    def terminate_all_running_process(self):
+        """End all processes associated with the class. Meant to be run in the finally
+        block anytime the class is instantiated.
+        """
+        self.streaming = False
+        if not self.light_refresh_loop:
+            return
+
+        self.light_refresh_loop.terminate()
+
+        # Terminate all open animation threads
+        for key in self.group_threads.keys():
+            self.group_threads[key].terminate()
+
+    def __start_refresh_thread(self):
+        self.light_refresh_loop = Process(
+            target=TRACER.in_ring(RING_DISPLAY, self.__refresh_loop),
+            args=[self.frame_buffer],
+        )
+        self.light_refresh_loop.start()
+
+    def __refresh_loop(self, frame_buffer: SharedFrameBuffer):
+        """Shows every newly published frame. While nothing changes the loop sleeps
+        on the frame buffer instead of resending the same frame, and counts every
+        refresh it skipped.
+        """
+        frame = np.zeros(frame_buffer.led_count, dtype=np.uint32)
+        for _ in self.light_string.scheduler.run(None, REFRESH_INTERVAL_S, loop=None):
+            changed = frame_buffer.has_changed()
+            while not changed:
+                idle_start = time.monotonic()
+                changed = frame_buffer.wait_for_change(IDLE_REPORT_INTERVAL_S)
+                idle_s = time.monotonic() - idle_start
+                frame_buffer.count_refreshes(skipped=round(idle_s / REFRESH_INTERVAL_S))
+
+            trace_start = TRACER.begin()
+            frame_buffer.read(frame)
+            TRACER.end(SPAN_FRAME_BUFFER_READ, trace_start)
+            self.light_string.show_frame(frame)
+            frame_buffer.count_refreshes(shown=1)
+
+    def refresh_stats(self) -> dict:
+        """How many refreshes the display loop did and skipped since it was created
+
+        Returns:
+            dict: Counts of "refreshes" shown and "skipped_refreshes"
+        """
+        return {
+            "refreshes": self.frame_buffer.refreshes,
+            "skipped_refreshes": self.frame_buffer.skipped_refreshes,
+        }
+
+    def __start_thread_for_group(
+        self,
+        group_name: str,
+        target: Callable,
+        args: list = [],
+        kwargs: dict = {},
+    ):
+        log.info(f"Starting thread for group {group_name}")
+        self.group_threads[group_name] = Process(
+            target=TRACER.in_ring(RING_VISUALIZER, target), args=args, kwargs=kwargs
+        )
+        self.group_threads[group_name].start()
+
+    def update_group(self, group_name: str, color: Union[Color, np.ndarray]):
+        """Updates every pixel in the group to the provided color in one write
+
+        Args:
+            group_name (str): Key in groups dict to get the PixelGroup from
+            color (Union[Color, np.ndarray]): Color to update those pixels to, or a
+                color for each pixel in the group
+        """
+        self.groups[group_name].paint(self.frame_buffer.back, color)
+        self.frame_buffer.publish()
+
+    def add_group(self, group_name: str, group: PixelGroup) -> PixelGroup:
+        """Stores a group of pixels to update and draw layers on by name
+
+        Args:
+            group_name (str): Key to store the group under
+            group (PixelGroup): The group, built for this light string
+
+        Raises:
+            ValueError: If the group was built for a different number of pixels
+
+        Returns:
+            PixelGroup: The group
+        """
+        if group.led_count != self.light_string.led_count:
+            raise ValueError(
+                f"Group {group_name} has {group.led_count} pixels but the string "
+                f"has {self.light_string.led_count}"
+            )
+        self.groups[group_name] = group
+        return group
+
+    def create_group_of_every_nth(self, n: int, offset: int, group_name: str):
+        self.add_group(
+            group_name, PixelGroup.every_nth(self.light_string.led_count, n, offset)
+        )
+
+    def create_beat_layer(
+        self,
+        audio_analysis: SpotifyAudioAnalysis,
+        group_name: str,
+        nth_item: int,
+        item: str = "beats",
+        colors: List[Color] = None,
+        color_change_on: str = "bars",
+        priority: int = 0,
+    ) -> BeatLayer:
+        """Makes a layer that flashes a group on every nth item in the audio analysis
+
+        Args:
+            audio_analysis (SpotifyAudioAnalysis) : Audio analysis controller
+            group_name (str): Key in groups dict to get pixel numbers from
+            nth_item (int): Activate pixel on every nTh item
+            item (str): Which specific key in the audio analysis to use
+            colors (List[Color]): Colors to use for lighting pattern. Uses a random
+                color if no list is provided
+            color_change_on (str): Key to watch for from Audio Analysis to make color
+                changes on
+            priority (int, optional): Layers with a higher priority are drawn on top.
+                Defaults to 0.
+
+        Returns:
+            BeatLayer: Layer to pass to run_layers
+        """
+        return BeatLayer(
+            self.groups[group_name],
+            audio_analysis,
+            nth_item,
+            item=item,
+            colors=colors,
+            color_change_on=color_change_on,
+            confidence_threshold=audio_analysis.confidence_average[item] * 0.5,
+            priority=priority,
+        )
+
+    def run_layers(self, audio_analysis: SpotifyAudioAnalysis, layers: List[Layer]):
+        """Renders every layer into one frame on each tick until the track ends
+
+        Args:
+            audio_analysis (SpotifyAudioAnalysis) : Audio analysis controller
+            layers (List[Layer]): Layers to composite
+        """
+        compositor = Compositor(self.light_string.led_count)
+        for layer in layers:
+            compositor.add_layer(layer)
+
+        cursor = audio_analysis.playback_cursor()
+        beat_starts = audio_analysis.beats.start
+        last_beat = NO_ITEM
+        scheduler = self.light_string.scheduler
+        for tick in scheduler.run(
+            None,
+            RENDER_INTERVAL_S,
+            loop=LOOP_VISUALIZER,
+            position=audio_analysis.get_track_progress_seconds,
+        ):
+            # Every device synced to the same track position renders the same tick
+            track_time_s = tick * RENDER_INTERVAL_S
+            trace_start = TRACER.begin()
+            lookup_start = time.perf_counter()
+            now_active = cursor.active_indices(track_time_s)
+            ANALYSIS_LOOKUP_SECONDS.observe(time.perf_counter() - lookup_start)
+            TRACER.end(SPAN_ANALYSIS_LOOKUP, trace_start)
+
+            if now_active is None:
+                self.frame_buffer.clear()
+                return
+
+            beat = now_active.get("beats", NO_ITEM)
+            if beat != last_beat and beat != NO_ITEM:
+                BEAT_OFFSET_SECONDS.observe(track_time_s - beat_starts[beat])
+            last_beat = beat
+
+            trace_start = TRACER.begin()
+            frame = compositor.render(track_time_s, now_active)
+            TRACER.end(SPAN_COMPOSITE, trace_start)
+            if not np.array_equal(frame, self.frame_buffer.back):
+                trace_start = TRACER.begin()
+                self.frame_buffer.publish_frame(frame)
+                TRACER.end(SPAN_FRAME_BUFFER_PUBLISH, trace_start)
+
+    def play_timeline(
+        self, audio_analysis: SpotifyAudioAnalysis, timeline: LightShowTimeline
+    ):
+        """Shows the frame of a compiled light show for the track time on each tick
+            until the track ends
+
+        Args:
+            audio_analysis (SpotifyAudioAnalysis) : Audio analysis controller
+            timeline (LightShowTimeline): Light show compiled for the track
+        """
+        last_run = None
+        scheduler = self.light_string.scheduler
+        for tick in scheduler.run(
+            None,
+            RENDER_INTERVAL_S,
+            loop=LOOP_VISUALIZER,
+            position=audio_analysis.get_track_progress_seconds,
+        ):
+            # Every device synced to the same track position renders the same tick
+            track_time_s = tick * RENDER_INTERVAL_S
+            trace_start = TRACER.begin()
+            lookup_start = time.perf_counter()
+            run = timeline.run_at(track_time_s)
+            ANALYSIS_LOOKUP_SECONDS.observe(time.perf_counter() - lookup_start)
+            TRACER.end(SPAN_ANALYSIS_LOOKUP, trace_start)
+
+            if run is None:
+                self.frame_buffer.clear()
+                return
+
+            if run != last_run:
+                BEAT_OFFSET_SECONDS.observe(
+                    track_time_s - timeline.run_starts[run] / timeline.fps
+                )
+                trace_start = TRACER.begin()
+                self.frame_buffer.publish_frame(timeline.frames[timeline.run_frames[run]])
+                TRACER.end(SPAN_FRAME_BUFFER_PUBLISH, trace_start)
+                last_run = run
+
+    def compile_and_play(self, audio_analysis: SpotifyAudioAnalysis, layers: List[Layer]):
+        """Compiles the layers into a light show for the whole track then plays it
+
+        Args:
+            audio_analysis (SpotifyAudioAnalysis) : Audio analysis controller
+            layers (List[Layer]): Layers to composite
+        """
+        timeline = LightShowTimeline.compile(
+            audio_analysis, layers, self.light_string.led_count
+        )
+        log.info(
+            f"Compiled {timeline.duration_s:.0f}s light show into "
+            f"{len(timeline.frames)} frames and {len(timeline.run_starts)} runs"
+        )
+        self.play_timeline(audio_analysis, timeline)
+
+    def __start_visualizer(
+        self,
+        audio_analysis: SpotifyAudioAnalysis,
+        layers: List[Layer],
+        precompile: bool,
+    ):
+        self.__start_thread_for_group(
+            "layers",
+            self.compile_and_play if precompile else self.run_layers,
+            args=[audio_analysis, layers],
+        )
+
+    def run_group_on_item(
+        self,
+        audio_analysis: SpotifyAudioAnalysis,
+        group_name: str,
+        nth_item: int,
+        item: str = "beats",
+        colors: List[Color] = None,
+        color_change_on: str = "bars",
+    ):
+        """Sets up a lighting pattern using item for the key grabbed in Audio Analysis
+
+        Args:
+            audio_analysis (SpotifyAudioAnalysis) : Audio analysis controller
+            group_name (str): Key in groups dict to get pixel numbers from
+            nth_item (int): Activate pixel on every nTh item
+            item (str): Which specific key in the audio analysis to use
+            colors (List[Color]): Colors to use for lighting pattern. Uses a random
+                color if no list is provided
+            color_change_on (str): Key to watch for from Audio Analysis to make color
+                changes on
+        """
+        layer = self.create_beat_layer(
+            audio_analysis, group_name, nth_item, item, colors, color_change_on
+        )
+        self.run_layers(audio_analysis, [layer])
+
+    def dual_beats(self, audio_analysis: SpotifyAudioAnalysis, precompile: bool = False):
+        log.info("Starting dual beats.")
+        self.__start_visualizer(
+            audio_analysis, self.dual_beats_layers(audio_analysis), precompile
+        )
+
+    def dual_beats_layers(self, audio_analysis: SpotifyAudioAnalysis) -> List[Layer]:
+        self.groups = {}
+
+        self.create_group_of_every_nth(n=2, offset=0, group_name="all_beat")
+        self.create_group_of_every_nth(
+            n=2, offset=1, group_name="every_2nd_beat"
+        )
+
+        all_beat = self.create_beat_layer(
+            audio_analysis,
+            "all_beat",
+            1,
+            color_change_on="beats",
+            item="beats",
+            colors=[
+                Color(
+                    255,
+                    0,
+                    0,
+                ),
+                Color(
+                    255,
+                    255,
+                    255,
+                ),
+            ],
+        )
+        every_2nd_beat = self.create_beat_layer(
+            audio_analysis,
+            "every_2nd_beat",
+            2,
+            item="beats",
+            colors=[
+                LedColor.green,
+                LedColor.autumnOrange,
+                LedColor.brightViolet,
+                LedColor.fallYellow,
+            ],
+        )
+
+        return [all_beat, every_2nd_beat]
+
+    def dual_beats_with_tatums(
+        self, audio_analysis: SpotifyAudioAnalysis, precompile: bool = False
+    ):
+        log.info("Starting dual beats.")
+        self.__start_visualizer(
+            audio_analysis,
+            self.dual_beats_with_tatums_layers(audio_analysis),
+            precompile,
+        )
+
+    def dual_beats_with_tatums_layers(
+        self, audio_analysis: SpotifyAudioAnalysis
+    ) -> List[Layer]:
+        self.groups = {}
+
+        self.create_group_of_every_nth(n=3, offset=0, group_name="all_beat")
+        self.create_group_of_every_nth(
+            n=3, offset=1, group_name="every_2nd_beat"
+        )
+        self.create_group_of_every_nth(n=3, offset=2, group_name="tatum")
+
+        # Run on every beat
+        all_beat = self.create_beat_layer(
+            audio_analysis,
+            "all_beat",
+            1,
+            color_change_on="beats",
+            item="beats",
+            colors=[
+                Color(
+                    255,
+                    0,
+                    0,
+                ),
+                Color(
+                    255,
+                    255,
+                    255,
+                ),
+            ],
+        )
+        # Run on every second beat
+        every_2nd_beat = self.create_beat_layer(
+            audio_analysis,
+            "every_2nd_beat",
+            2,
+            item="beats",
+            colors=[
+                LedColor.green,
+                LedColor.autumnOrange,
+                LedColor.brightViolet,
+                LedColor.fallYellow,
+            ],
+        )
+
+        # Run on every Tatum
+        tatum = self.create_beat_layer(
+            audio_analysis,
+            "tatum",
+            1,
+            item="tatums",
+            colors=[
+                LedColor.brightViolet,
+            ],
+        )
+
+        return [all_beat, every_2nd_beat, tatum]
@@ -0,0 +1,147 @@
+"""Attack and decay envelopes that work out a color straight from the track time.
+
+A beat reaction is an envelope: an onset time taken from the audio analysis, an
+ attack that ramps up to the full color and a decay that falls back to black, each
+ shaped by one of the Transition easing curves. Nothing is stepped or slept between
+ frames. Every frame asks for the color at the current track time, so a slow frame
+ just lands further along the same curve and the reaction stays locked to the
+ analysis. Envelopes that overlap add up, so a beat landing during the tail of the
+ last one brightens it instead of cutting it off.
+
+The bank only evaluates envelopes that haven't ended yet, which is rarely more than
+ two, so a frame between beats costs next to nothing. Levels are rounded down to
+ LEVEL_STEPS steps so a compiled light show can reuse frames.
+"""
+import math
+
+from classes.LedColor import LedColor
+from classes.Transition import EASING_LINEAR, EASINGS
+
+# Most envelopes a bank can hold, the one ending first is replaced when it is full
+MAX_ENVELOPES = 8
+# Number of brightness steps an envelope moves through
+LEVEL_STEPS = 100
+
+
+class Envelope:
+    def __init__(
+        self, onset_s: float, attack_s: float, decay_s: float, color: int
+    ) -> None:
+        """One reaction: ramps up to color from onset_s, then falls back to black
+
+        Args:
+            onset_s (float): Track time the attack starts at
+            attack_s (float): Seconds to ramp up to the full color
+            decay_s (float): Seconds to fall back to black after the attack
+            color (int): Packed color at the peak
+        """
+        self.onset_s = onset_s
+        self.attack_s = attack_s
+        self.decay_s = decay_s
+        self.end_s = onset_s + attack_s + decay_s
+        self.rgb = LedColor.get_rgb_value(color)
+
+
+class EnvelopeBank:
+    def __init__(
+        self,
+        capacity: int = MAX_ENVELOPES,
+        attack_easing: str = EASING_LINEAR,
+        decay_easing: str = EASING_LINEAR,
+        level_steps: int = LEVEL_STEPS,
+    ) -> None:
+        """Envelopes that are summed into one color
+
+        Args:
+            capacity (int, optional): Most envelopes held at once. Defaults to
+                MAX_ENVELOPES.
+            attack_easing (str, optional): One of Transition.EASINGS for the attack.
+                Defaults to EASING_LINEAR.
+            decay_easing (str, optional): One of Transition.EASINGS for the decay.
+                Defaults to EASING_LINEAR.
+            level_steps (int, optional): Steps levels are rounded down to. Defaults
+                to LEVEL_STEPS.
+
+        Raises:
+            ValueError: If an easing doesn't exist
+        """
+        for easing in (attack_easing, decay_easing):
+            if easing not in EASINGS:
+                raise ValueError(
+                    f"Unknown easing {easing}, expected one of {list(EASINGS)}"
+                )
+
+        self.capacity = capacity
+        self.attack_curve = EASINGS[attack_easing]
+        self.decay_curve = EASINGS[decay_easing]
+        self.level_steps = level_steps
+        self.envelopes = []
+
+    def __len__(self) -> int:
+        return len(self.envelopes)
+
+    def add(self, onset_s: float, attack_s: float, decay_s: float, color: int):
+        """Adds an envelope, replacing the one that ends first if the bank is full
+
+        Args:
+            onset_s (float): Track time the attack starts at
+            attack_s (float): Seconds to ramp up to the full color
+            decay_s (float): Seconds to fall back to black after the attack
+            color (int): Packed color at the peak
+        """
+        if len(self.envelopes) >= self.capacity:
+            self.envelopes.remove(min(self.envelopes, key=lambda env: env.end_s))
+        self.envelopes.append(Envelope(onset_s, attack_s, decay_s, color))
+
+    def clear(self):
+        """Drops every envelope"""
+        self.envelopes.clear()
+
+    def level(self, envelope: Envelope, track_time_s: float) -> float:
+        """Brightness of an envelope at a point in the track
+
+        Args:
+            envelope (Envelope): The envelope
+            track_time_s (float): Track progress in seconds
+
+        Returns:
+            float: Level from 0-1
+        """
+        elapsed = track_time_s - envelope.onset_s
+        if elapsed < 0 or track_time_s >= envelope.end_s:
+            return 0.0
+        if elapsed < envelope.attack_s:
+            progress = self.__progress(elapsed, envelope.attack_s)
+            return float(self.attack_curve(progress))
+
+        progress = self.__progress(elapsed - envelope.attack_s, envelope.decay_s)
+        return 1 - float(self.decay_curve(progress))
+
+    def color_at(self, track_time_s: float) -> int:
+        """Color of all the envelopes added together at a point in the track. Drops
+            envelopes that have ended.
+
+        Args:
+            track_time_s (float): Track progress in seconds
+
+        Returns:
+            int: Packed color
+        """
+        if not self.envelopes:
+            return 0
+
+        self.envelopes = [env for env in self.envelopes if env.end_s > track_time_s]
+        rgb = [0.0, 0.0, 0.0]
+        for envelope in self.envelopes:
+            level = self.level(envelope, track_time_s)
+            for channel in range(3):
+                rgb[channel] += envelope.rgb[channel] * level
+
+        red, green, blue = (min(round(value), 255) for value in rgb)
+        return (red << 16) | (green << 8) | blue
+
+    def __progress(self, elapsed: float, length: float) -> float:
+        if length <= 0:
+            return 1.0
+        steps = math.floor(min(elapsed / length, 1) * self.level_steps)
+        return steps / self.level_steps
@@ -0,0 +1,186 @@
+"""Vectorized frame builders for the LED light string.
+
+A frame is a one dimensional numpy array of packed ``uint32`` colors, one entry per
+ pixel, using the same ``0x00RRGGBB`` layout as ``rpi_ws281x.Color``. Every function
+ here builds a whole frame in one step so patterns never touch single pixels in
+ Python loops.
+"""
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+from classes.ColorTable import WHEEL_TABLE
+
+FRAME_DTYPE = np.uint32
+MAX_COLOR_VALUE = 256
+
+
+class FrameRenderer:
+    @staticmethod
+    def blank(led_count: int) -> np.ndarray:
+        """Creates an all black frame
+
+        Args:
+            led_count (int): Number of pixels in the frame
+
+        Returns:
+            np.ndarray: Frame with every pixel turned off
+        """
+        return np.zeros(led_count, dtype=FRAME_DTYPE)
+
+    @staticmethod
+    def solid(led_count: int, color: int) -> np.ndarray:
+        """Creates a frame with every pixel set to the same color
+
+        Args:
+            led_count (int): Number of pixels in the frame
+            color (int): Packed color to fill the frame with
+
+        Returns:
+            np.ndarray: Solid color frame
+        """
+        return np.full(led_count, color, dtype=FRAME_DTYPE)
+
+    @staticmethod
+    def pack_rgb(rgb: np.ndarray) -> np.ndarray:
+        """Packs an array of RGB triplets into packed colors
+
+        Args:
+            rgb (np.ndarray): Array shaped (..., 3) of values from 0-255
+
+        Returns:
+            np.ndarray: Packed colors shaped like rgb without the last axis
+        """
+        rgb = np.asarray(rgb, dtype=FRAME_DTYPE)
+        return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+    @staticmethod
+    def unpack_rgb(frame: np.ndarray) -> np.ndarray:
+        """Splits packed colors into their RGB channels
+
+        Args:
+            frame (np.ndarray): Packed colors
+
+        Returns:
+            np.ndarray: Array shaped (..., 3) of uint8 RGB values
+        """
+        frame = np.asarray(frame, dtype=FRAME_DTYPE)
+        return np.stack(
+            [(frame >> 16) & 0xFF, (frame >> 8) & 0xFF, frame & 0xFF], axis=-1
+        ).astype(np.uint8)
+
+    @staticmethod
+    def tile_rgb_list(led_count: int, rgb_list: List[List[int]]) -> np.ndarray:
+        """Repeats a list of RGB values over the whole frame
+
+        Args:
+            led_count (int): Number of pixels in the frame
+            rgb_list (List[List[int]]): List of RGB values to repeat
+
+        Returns:
+            np.ndarray: Frame with the colors repeated from pixel 0 onwards
+        """
+        palette = FrameRenderer.pack_rgb(rgb_list)
+        return np.resize(palette, led_count).astype(FRAME_DTYPE)
+
+    @staticmethod
+    def wheel(positions: np.ndarray) -> np.ndarray:
+        """Table lookup version of LightString.wheel. Positions wrap around at 256
+
+        Args:
+            positions (np.ndarray): Wheel positions to get colors for
+
+        Returns:
+            np.ndarray: Packed rainbow colors for every position
+        """
+        return WHEEL_TABLE[np.asarray(positions) & (MAX_COLOR_VALUE - 1)]
+
+    @staticmethod
+    def rainbow(led_count: int, step: int) -> np.ndarray:
+        """Frame for step of the rainbow pattern, every pixel one wheel position on
+
+        Args:
+            led_count (int): Number of pixels in the frame
+            step (int): Step of the animation
+
+        Returns:
+            np.ndarray: Rainbow frame
+        """
+        positions = (_pixel_numbers(led_count) + step) & (MAX_COLOR_VALUE - 1)
+        return WHEEL_TABLE[positions]
+
+    @staticmethod
+    def rainbow_cycle(led_count: int, step: int) -> np.ndarray:
+        """Frame for step of the rainbow cycle, the whole wheel spread over the string
+
+        Args:
+            led_count (int): Number of pixels in the frame
+            step (int): Step of the animation
+
+        Returns:
+            np.ndarray: Rainbow frame
+        """
+        positions = (_cycle_spread(led_count) + step) & (MAX_COLOR_VALUE - 1)
+        return WHEEL_TABLE[positions]
+
+    @staticmethod
+    def chase_mask(led_count: int, offset: int, spacing: int = 3) -> np.ndarray:
+        """Mask of every spacing'th pixel starting at offset
+
+        Args:
+            led_count (int): Number of pixels in the frame
+            offset (int): First pixel lit in the mask
+            spacing (int, optional): Distance between lit pixels. Defaults to 3.
+
+        Returns:
+            np.ndarray: Boolean mask of lit pixels
+        """
+        return np.arange(led_count) % spacing == offset
+
+    @staticmethod
+    def wipe_mask(led_count: int, start: int, stop: int) -> np.ndarray:
+        """Mask of the pixels from start up to but not including stop
+
+        Args:
+            led_count (int): Number of pixels in the frame
+            start (int): First pixel in the mask. Clipped to the frame.
+            stop (int): Pixel to end the mask on. Clipped to the frame.
+
+        Returns:
+            np.ndarray: Boolean mask of the selected pixels
+        """
+        pixels = np.arange(led_count)
+        return (pixels >= start) & (pixels < stop)
+
+    @staticmethod
+    def interpolate(c1: List[int], c2: List[int], amounts: np.ndarray) -> np.ndarray:
+        """Packed colors between c1 and c2 for every amount from 0-1. Rounds the same
+            way as LightString.transition_colors always has.
+
+        Args:
+            c1 (List[int]): RGB color transitioning from
+            c2 (List[int]): RGB color transitioning to
+            amounts (np.ndarray): How far along the transition each color is
+
+        Returns:
+            np.ndarray: Packed color for every amount
+        """
+        c1 = np.asarray(c1, dtype=np.float64)
+        dif = np.asarray(c2, dtype=np.float64) - c1
+        amounts = np.asarray(amounts, dtype=np.float64)[..., np.newaxis]
+        rgb = np.round(c1 + dif * amounts)
+        return FrameRenderer.pack_rgb(rgb.astype(np.int64))
+
+
+@lru_cache(maxsize=8)
+def _pixel_numbers(led_count: int) -> np.ndarray:
+    pixels = np.arange(led_count)
+    pixels.flags.writeable = False
+    return pixels
+
+
+@lru_cache(maxsize=8)
+def _cycle_spread(led_count: int) -> np.ndarray:
+    spread = _pixel_numbers(led_count) * MAX_COLOR_VALUE // led_count
+    spread.flags.writeable = False
+    return spread
@@ -0,0 +1,201 @@
+"""Paces animations against absolute frame deadlines on a monotonic clock.
+
+Sleeping a fixed time after every frame makes an animation last its sleep time plus
+ render time plus the time it takes to clock the data down the wire. Scheduling each
+ step against a deadline measured from the start of the animation, and skipping steps
+ when rendering falls behind, makes an animation last as long as it was asked to no
+ matter how many LEDs there are.
+"""
+from typing import Callable, Iterator, Optional
+import time
+
+from classes.Metrics import (
+    ACHIEVED_FPS,
+    FRAMES_DROPPED,
+    FRAMES_LATE,
+    FRAMES_SHOWN,
+    LOOP_PATTERN,
+    TARGET_FPS,
+)
+
+# WS281x timing, every bit takes 1.25us at 800khz and each LED needs 24 bits
+LED_FREQ_HZ = 800000
+BITS_PER_LED = 24
+# Time the data line has to be held low before the LEDs latch the new colors
+LED_RESET_US = 55
+# Fraction of a step a deadline may be missed by to floating point error
+STEP_ROUNDING = 1e-6
+
+
+class StripTiming:
+    def __init__(
+        self,
+        led_count: int,
+        freq_hz: int = LED_FREQ_HZ,
+        bits_per_led: int = BITS_PER_LED,
+        reset_us: int = LED_RESET_US,
+    ) -> None:
+        """Model of how long a WS281x strip takes to accept a frame
+
+        Args:
+            led_count (int): Number of LEDs on the strip
+            freq_hz (int, optional): Signal frequency. Defaults to 800khz.
+            bits_per_led (int, optional): Bits sent for every LED. Defaults to 24.
+            reset_us (int, optional): Latch time after each frame in microseconds.
+                Defaults to 55.
+        """
+        self.led_count = led_count
+        self.freq_hz = freq_hz
+        self.bits_per_led = bits_per_led
+        self.reset_us = reset_us
+
+    @property
+    def wire_time_s(self) -> float:
+        """Seconds it takes to send one whole frame down the wire and latch it"""
+        return self.led_count * self.bits_per_led / self.freq_hz + self.reset_us / 1e6
+
+    @property
+    def max_fps(self) -> float:
+        """Most frames per second the strip can physically accept"""
+        return 1 / self.wire_time_s
+
+    def clamp_interval(self, interval_s: float) -> float:
+        """Limits a requested time between frames to what the strip can accept
+
+        Args:
+            interval_s (float): Requested seconds between frames
+
+        Returns:
+            float: Seconds between frames the strip can actually keep up with
+        """
+        return max(interval_s, self.wire_time_s)
+
+
+class FrameScheduler:
+    def __init__(
+        self,
+        timing: StripTiming,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Hands out animation steps as their deadlines come up
+
+        Args:
+            timing (StripTiming): Timing model of the strip frames are shown on
+            clock (Callable[[], float], optional): Monotonic clock in seconds.
+                Defaults to time.monotonic.
+            sleep (Callable[[float], None], optional): Function used to wait for a
+                deadline. Defaults to time.sleep.
+        """
+        self.timing = timing
+        self.clock = clock
+        self.sleep = sleep
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+    def run(
+        self,
+        step_count: Optional[int],
+        interval_s: float,
+        loop: Optional[str] = LOOP_PATTERN,
+        position: Optional[Callable[[], float]] = None,
+    ) -> Iterator[int]:
+        """Yields the step that should be on screen each time a frame is due. Step n
+            is due interval_s * n after the first one. Steps whose time has passed by
+            the time the next frame can be shown are skipped, but the final step is always
+            shown, and frames are never asked for faster than the strip can take them.
+            Returns once the animation's full duration has passed.
+
+        Args:
+            step_count (Optional[int]): Number of steps in the animation, None to
+                keep going forever
+            interval_s (float): Seconds each step should stay on screen
+            loop (Optional[str]): Which of the Metrics.LOOPS to record frame rates
+                and dropped and late frames under, None to not record them. Defaults
+                to LOOP_PATTERN.
+            position (Optional[Callable[[], float]]): Seconds along the animation
+                right now, like a track position, that steps are counted from
+                instead of the time since the first one. Devices following the same
+                position land on the same steps at the same time. The position may
+                jump backwards. Defaults to None.
+
+        Yields:
+            Iterator[int]: The step to render and show next
+        """
+        min_frame_s = self.timing.clamp_interval(0)
+        frame_interval_s = self.timing.clamp_interval(interval_s)
+        if loop:
+            TARGET_FPS.set(1 / frame_interval_s, loop)
+        start = self.clock()
+        deadline = start
+        window_start = start
+        window_frames = 0
+        end = (
+            start + step_count * interval_s
+            if step_count is not None and interval_s > 0
+            else None
+        )
+        last_step = -1
+
+        while True:
+            frame_start = self.clock()
+            elapsed = position() if position else frame_start - start
+            step = self.__next_step(
+                elapsed, interval_s, step_count, last_step, position is None
+            )
+            if step is None:
+                break
+
+            # Nothing was skipped on the first frame or if the position jumped back
+            skipped = max(step - last_step - 1, 0) if last_step >= 0 else 0
+            self.frames_skipped += skipped
+            self.frames_shown += 1
+            if loop:
+                FRAMES_SHOWN.inc(1, loop)
+                FRAMES_DROPPED.inc(skipped, loop)
+                if frame_start - deadline > frame_interval_s:
+                    FRAMES_LATE.inc(1, loop)
+                window_frames += 1
+                window_s = frame_start - window_start
+                if window_s >= 1:
+                    ACHIEVED_FPS.set(window_frames / window_s, loop)
+                    window_start = frame_start
+                    window_frames = 0
+            last_step = step
+            yield step
+
+            next_deadline = max(
+                frame_start + (step + 1) * interval_s - elapsed,
+                frame_start + min_frame_s,
+            )
+            if end is not None:
+                next_deadline = min(next_deadline, end)
+            deadline = next_deadline
+            self.__sleep_until(next_deadline)
+
+            if end is not None and self.clock() >= end and step == step_count - 1:
+                break
+
+    @staticmethod
+    def __next_step(
+        elapsed: float,
+        interval_s: float,
+        step_count: Optional[int],
+        last_step: int,
+        always_advance: bool,
+    ) -> Optional[int]:
+        # Waking right on a deadline can read a hair short of it
+        step = int(elapsed / interval_s + STEP_ROUNDING) if interval_s > 0 else 0
+        if always_advance:
+            step = max(step, last_step + 1)
+        if step_count is not None and step >= step_count:
+            # Always land on the final step so the animation ends where it should
+            if last_step == step_count - 1:
+                return None
+            step = step_count - 1
+        return step
+
+    def __sleep_until(self, deadline: float):
+        remaining = deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
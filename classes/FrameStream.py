@@ -0,0 +1,223 @@
+"""Binary frame stream for pushing whole frames from a client in real time.
+
+Every message is one frame: a 16 byte little endian header followed by the pixels in
+ one of three encodings.
+
+ Header: encoding (u8), padding (u8), pixel count (u16), sequence (u32),
+  client time in ms (f64). The client time is sent back in the ack so clients can
+  measure round trip latency against their own clock.
+
+ ENCODING_RAW: R, G, B bytes for every pixel.
+ ENCODING_DELTA: index (u16), R, G, B for every pixel that changed since the
+  previous frame. Pixels not listed keep their color.
+ ENCODING_RLE: length (u16), R, G, B for every run of pixels with the same color.
+
+Each encoding is decoded with one numpy call, so a frame costs about the same to
+ decode no matter how many pixels it has.
+
+Gaps in the sequence numbers are counted as dropped frames. A sequence number that
+ goes backwards or jumps ahead by more than MAX_SEQUENCE_GAP is a client that
+ reconnected or started counting again, and is counted as a stream reset instead.
+"""
+from typing import Optional
+import struct
+import time
+
+import numpy as np
+
+from classes.FrameRenderer import FrameRenderer
+
+ENCODING_RAW = 0
+ENCODING_DELTA = 1
+ENCODING_RLE = 2
+
+HEADER = struct.Struct("<BxHId")
+# Most frames in a row that can go missing before the client is taken to have
+# started a new stream, 10 seconds at 60 frames per second
+MAX_SEQUENCE_GAP = 600
+DELTA_DTYPE = np.dtype([("index", "<u2"), ("rgb", "u1", 3)])
+RLE_DTYPE = np.dtype([("length", "<u2"), ("rgb", "u1", 3)])
+
+
+def encode_frame(
+    frame: np.ndarray,
+    sequence: int,
+    encoding: int = ENCODING_RAW,
+    previous: Optional[np.ndarray] = None,
+    client_time_ms: float = 0,
+) -> bytes:
+    """Encodes a frame of packed colors into a stream message, for clients and tests
+
+    Args:
+        frame (np.ndarray): Packed colors, one for every pixel
+        sequence (int): Number of the frame in the stream
+        encoding (int, optional): One of the ENCODING_ values. Defaults to
+            ENCODING_RAW.
+        previous (Optional[np.ndarray]): Frame sent before, needed for ENCODING_DELTA
+        client_time_ms (float, optional): Client clock when the frame was sent.
+            Defaults to 0.
+
+    Returns:
+        bytes: The message to send
+    """
+    frame = np.asarray(frame, dtype=np.uint32)
+    rgb = FrameRenderer.unpack_rgb(frame)
+
+    if encoding == ENCODING_RAW:
+        payload = rgb.tobytes()
+    elif encoding == ENCODING_DELTA:
+        changed = np.flatnonzero(frame != previous)
+        spans = np.empty(len(changed), dtype=DELTA_DTYPE)
+        spans["index"] = changed
+        spans["rgb"] = rgb[changed]
+        payload = spans.tobytes()
+    elif encoding == ENCODING_RLE:
+        starts = np.flatnonzero(np.diff(frame, prepend=~frame[:1]) != 0)
+        runs = np.empty(len(starts), dtype=RLE_DTYPE)
+        runs["length"] = np.diff(starts, append=len(frame))
+        runs["rgb"] = rgb[starts]
+        payload = runs.tobytes()
+    else:
+        raise ValueError(f"Unknown frame encoding {encoding}")
+
+    return HEADER.pack(encoding, len(frame), sequence, client_time_ms) + payload
+
+
+class FrameStreamStats:
+    def __init__(self, led_count: int) -> None:
+        """Running totals for a frame stream
+
+        Args:
+            led_count (int): Number of pixels in a frame
+        """
+        self.raw_frame_bytes = HEADER.size + led_count * 3
+        self.frames = 0
+        self.dropped = 0
+        self.resets = 0
+        self.bytes = 0
+        self.decode_ns = 0
+        self.max_decode_ns = 0
+        self.first_ns = None
+        self.last_ns = None
+
+    def add(self, message_bytes: int, received_ns: int, shown_ns: int):
+        self.frames += 1
+        self.bytes += message_bytes
+        self.decode_ns += shown_ns - received_ns
+        self.max_decode_ns = max(self.max_decode_ns, shown_ns - received_ns)
+        self.first_ns = self.first_ns or received_ns
+        self.last_ns = received_ns
+
+    def as_dict(self) -> dict:
+        """Stats of the stream so far
+
+        Returns:
+            dict: Frame, reset and byte counts, frames per second, average bytes per
+                frame and how that compares to sending raw frames, and the average
+                and worst time in microseconds from receiving a frame to publishing it
+        """
+        frames = max(self.frames, 1)
+        seconds = (self.last_ns - self.first_ns) / 1e9 if self.frames > 1 else 0
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "resets": self.resets,
+            "bytes": self.bytes,
+            "fps": (self.frames - 1) / seconds if seconds else 0.0,
+            "bytes_per_frame": self.bytes / frames,
+            "compression": self.bytes / (frames * self.raw_frame_bytes),
+            "latency_us": self.decode_ns / frames / 1000,
+            "max_latency_us": self.max_decode_ns / 1000,
+        }
+
+
+class FrameStreamDecoder:
+    def __init__(self, led_count: int) -> None:
+        """Decodes stream messages into frames, keeping the last frame for deltas
+
+        Args:
+            led_count (int): Number of pixels in a frame
+        """
+        self.led_count = led_count
+        self.frame = FrameRenderer.blank(led_count)
+        self.sequence = None
+        self.stats = FrameStreamStats(led_count)
+
+    def decode(self, message: bytes) -> np.ndarray:
+        """Applies a message to the current frame
+
+        Args:
+            message (bytes): One stream message
+
+        Raises:
+            ValueError: If the message is malformed or doesn't fit the strip
+
+        Returns:
+            np.ndarray: The current frame, reused between calls
+        """
+        if len(message) < HEADER.size:
+            raise ValueError("Frame message is shorter than its header")
+
+        encoding, pixel_count, sequence, _ = HEADER.unpack_from(message)
+        if pixel_count != self.led_count:
+            raise ValueError(
+                f"Frame has {pixel_count} pixels but the strip has {self.led_count}"
+            )
+        payload = memoryview(message)[HEADER.size:]
+
+        if encoding == ENCODING_RAW:
+            if len(payload) != pixel_count * 3:
+                raise ValueError("Raw frame payload doesn't match its pixel count")
+            rgb = np.frombuffer(payload, np.uint8).reshape(-1, 3)
+            self.frame[:] = FrameRenderer.pack_rgb(rgb)
+        elif encoding == ENCODING_DELTA:
+            spans = self.__records(payload, DELTA_DTYPE)
+            if len(spans) and spans["index"].max() >= pixel_count:
+                raise ValueError("Delta frame changes a pixel past the end of the strip")
+            self.frame[spans["index"]] = FrameRenderer.pack_rgb(spans["rgb"])
+        elif encoding == ENCODING_RLE:
+            runs = self.__records(payload, RLE_DTYPE)
+            if int(runs["length"].sum()) != pixel_count:
+                raise ValueError("Run lengths don't add up to the pixel count")
+            self.frame[:] = np.repeat(FrameRenderer.pack_rgb(runs["rgb"]), runs["length"])
+        else:
+            raise ValueError(f"Unknown frame encoding {encoding}")
+
+        self.__count_gap(sequence)
+        return self.frame
+
+    def ack(self, message: bytes, received_ns: int) -> dict:
+        """Records a shown frame in the stats and builds the ack for the client
+
+        Args:
+            message (bytes): The message that was shown
+            received_ns (int): time.monotonic_ns() when it arrived
+
+        Returns:
+            dict: Sequence and client time of the frame and how long the device took
+                to show it
+        """
+        shown_ns = time.monotonic_ns()
+        self.stats.add(len(message), received_ns, shown_ns)
+        _, _, sequence, client_time_ms = HEADER.unpack_from(message)
+
+        return {
+            "sequence": sequence,
+            "client_time_ms": client_time_ms,
+            "device_latency_us": (shown_ns - received_ns) / 1000,
+        }
+
+    def __count_gap(self, sequence: int):
+        if self.sequence is not None:
+            gap = (sequence - self.sequence - 1) & 0xFFFFFFFF
+            if gap <= MAX_SEQUENCE_GAP:
+                self.stats.dropped += gap
+            else:
+                self.stats.resets += 1
+        self.sequence = sequence
+
+    @staticmethod
+    def __records(payload: memoryview, dtype: np.dtype) -> np.ndarray:
+        if len(payload) % dtype.itemsize:
+            raise ValueError("Frame payload is not a whole number of records")
+        return np.frombuffer(payload, dtype)
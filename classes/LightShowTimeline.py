@@ -0,0 +1,134 @@
+"""Light show for a whole track rendered ahead of time.
+
+Compiling runs the layers of a visualizer through a compositor at a fixed frame rate
+ from the start of the track to the end. Most frames repeat, either because nothing
+ changed between ticks or because the same flash comes back later in the song, so
+ the timeline keeps every distinct frame once and a run length list of which frame
+ shows from which tick. Playing it back is a binary search over the runs, and the
+ show looks the same every time the track plays.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+from classes.Compositor import Compositor, Layer
+
+# Frames rendered for every second of the track
+DEFAULT_FPS = 100
+
+
+class LightShowTimeline:
+    def __init__(
+        self,
+        fps: int,
+        frames: np.ndarray,
+        run_starts: np.ndarray,
+        run_frames: np.ndarray,
+        tick_count: int,
+    ) -> None:
+        """Compiled light show, use compile to make one
+
+        Args:
+            fps (int): Frames per second of track time
+            frames (np.ndarray): Every distinct frame, shaped (frames, led_count)
+            run_starts (np.ndarray): Tick each run of the same frame starts on
+            run_frames (np.ndarray): Row in frames shown for each run
+            tick_count (int): Ticks in the whole track
+        """
+        self.fps = fps
+        self.frames = frames
+        self.run_starts = run_starts
+        self.run_frames = run_frames
+        self.tick_count = tick_count
+
+    @classmethod
+    def compile(
+        cls,
+        audio_analysis,
+        layers: List[Layer],
+        led_count: int,
+        fps: int = DEFAULT_FPS,
+    ) -> "LightShowTimeline":
+        """Renders a whole track. Layers keep state as they render, so use fresh ones.
+
+        Args:
+            audio_analysis (SpotifyAudioAnalysis): Analysis of the track
+            layers (List[Layer]): Layers of the visualizer
+            led_count (int): Number of pixels in a frame
+            fps (int, optional): Frames per second of track time. Defaults to
+                DEFAULT_FPS.
+
+        Returns:
+            LightShowTimeline: The compiled light show
+        """
+        compositor = Compositor(led_count)
+        for layer in layers:
+            compositor.add_layer(layer)
+
+        cursor = audio_analysis.playback_cursor()
+        tick_count = int(audio_analysis.track_duration * fps) + 1
+        frame_ids = {}
+        frames = []
+        run_starts = []
+        run_frames = []
+
+        for tick in range(tick_count):
+            track_time_s = tick / fps
+            frame = compositor.render(track_time_s, cursor.active_indices(track_time_s))
+            key = frame.tobytes()
+            if key not in frame_ids:
+                frame_ids[key] = len(frames)
+                frames.append(frame.copy())
+
+            frame_id = frame_ids[key]
+            if not run_frames or run_frames[-1] != frame_id:
+                run_starts.append(tick)
+                run_frames.append(frame_id)
+
+        return cls(
+            fps,
+            np.stack(frames),
+            np.array(run_starts, dtype=np.int32),
+            np.array(run_frames, dtype=np.uint32),
+            tick_count,
+        )
+
+    @property
+    def duration_s(self) -> float:
+        return self.tick_count / self.fps
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the frames and runs"""
+        return self.frames.nbytes + self.run_starts.nbytes + self.run_frames.nbytes
+
+    def run_at(self, track_time_s: float) -> Optional[int]:
+        """Finds the run of frames playing at a point in the track
+
+        Args:
+            track_time_s (float): Track progress in seconds
+
+        Returns:
+            Optional[int]: Index of the run, None once the track is over
+        """
+        tick = int(track_time_s * self.fps)
+        if tick >= self.tick_count:
+            return None
+
+        return max(int(self.run_starts.searchsorted(tick, "right")) - 1, 0)
+
+    def frame_at(self, track_time_s: float) -> Optional[np.ndarray]:
+        """Gets the frame for a point in the track
+
+        Args:
+            track_time_s (float): Track progress in seconds
+
+        Returns:
+            Optional[np.ndarray]: The frame, shared with the timeline so don't change
+                it. None once the track is over.
+        """
+        run = self.run_at(track_time_s)
+        if run is None:
+            return None
+
+        return self.frames[self.run_frames[run]]
@@ -1,11 +1,33 @@
-from typing import List, Optional
+from typing import Callable, List, Optional
 import time
 
-from rpi_ws281x import Color, PixelStrip, ws
+import numpy as np
+from rpi_ws281x import Color, ws
+from classes.ColorTable import ColorTable
+from classes.FrameRenderer import FrameRenderer
+from classes.FrameScheduler import FrameScheduler, StripTiming
 from classes.LedColor import LedColor
+from classes.Metrics import STRIP_SHOW_SECONDS
+from classes.MultiStrip import MultiStrip
+from classes.SimulatedStrip import SimulatedStrip
+from classes.Transition import EASING_LINEAR, FRAME_INTERVAL_S, Transition
+from classes.Tracer import (
+    SPAN_COLOR_CORRECT,
+    SPAN_RENDER_FRAME,
+    SPAN_STRIP_SHOW,
+    TRACER,
+)
+from classes.StripBackend import StripBackend, Ws281xStrip
 
 from config import log
 
+LED_PIN = 18  # GPIO pin connected to the pixels (must support PWM!).
+LED_FREQ_HZ = 800000  # LED signal frequency in hertz (usually 800khz)
+LED_DMA = 10  # DMA channel to use for generating signal (try 10)
+LED_BRIGHTNESS = 255  # Set to 0 for darkest and 255 for brightest
+LED_INVERT = False  # True to invert the signal (when using NPN transistor level shift)
+LED_CHANNEL = 0
+
 strip_mode = {
     "rgb": ws.WS2811_STRIP_RGB,
     "rbg": ws.WS2811_STRIP_RBG,
@@ -17,36 +39,159 @@ strip_mode = {
 
 
 class LightString:
-    def __init__(self, led_count: int = 100, color_mode="rgb") -> None:
+    def __init__(
+        self,
+        led_count: int = 100,
+        color_mode="rgb",
+        brightness: int = 255,
+        gamma: float = 1.0,
+        backend: str = "ws281x",
+        strip: Optional[StripBackend] = None,
+        outputs: Optional[List[dict]] = None,
+    ) -> None:
+        # Several outputs are laid end to end, so the string is as long as all of them
+        if outputs:
+            led_count = sum(output["led_count"] for output in outputs)
+
         # LED strip configuration:
         self.led_count = led_count  # Number of LED pixels.
         self.color_mode = color_mode
         self.strip_type = strip_mode.get(color_mode, None)
+        # Brightness and gamma correction applied to every frame shown
+        self.color_table = ColorTable(brightness=brightness, gamma=gamma)
 
-        LED_PIN = 18  # GPIO pin connected to the pixels (must support PWM!).
-        LED_FREQ_HZ = 800000  # LED signal frequency in hertz (usually 800khz)
-        LED_DMA = 10  # DMA channel to use for generating signal (try 10)
-        LED_BRIGHTNESS = 255  # Set to 0 for darkest and 255 for brightest
-        LED_INVERT = (
-            False  # True to invert the signal (when using NPN transistor
-        )
-        #  level shift)
-        LED_CHANNEL = 0
         self.ONE_SECOND_IN_MILLISECONDS = 1000
         self.MAX_COLOR_VALUE = 256
 
-        # Create PixelStrip object with appropriate configuration.
-        self.strip = PixelStrip(
-            self.led_count,
-            LED_PIN,
+        self.timing = StripTiming(self.led_count, freq_hz=LED_FREQ_HZ)
+
+        # Create the output backend with appropriate configuration.
+        if strip is not None:
+            self.strip = strip
+        elif outputs:
+            self.strip = MultiStrip(
+                [self.__create_output(backend, **output) for output in outputs],
+                [output.get("reverse", False) for output in outputs],
+            )
+        else:
+            self.strip = self.__create_output(backend, self.led_count)
+        # Outputs sent in parallel only take as long as the longest one
+        if isinstance(self.strip, MultiStrip):
+            self.timing = self.strip.timing
+        self.strip.begin()
+
+        # Animations are paced against deadlines the strip can physically keep up with
+        self.scheduler = FrameScheduler(self.timing)
+
+        # Mirror of what is currently in the strip buffer, every write goes through it
+        self.frame = FrameRenderer.blank(self.led_count)
+
+        # Event that cuts animations short at the next frame once it is set
+        self.interrupt = None
+
+    def __create_output(
+        self,
+        backend: str,
+        led_count: int,
+        color_mode: Optional[str] = None,
+        pin: int = LED_PIN,
+        dma: int = LED_DMA,
+        channel: int = LED_CHANNEL,
+        reverse: bool = False,
+    ) -> StripBackend:
+        """Creates one physical output
+
+        Args:
+            backend (str): "simulated" or "ws281x"
+            led_count (int): Number of LEDs on the output
+            color_mode (Optional[str]): Color order of the output. Defaults to the
+                color mode of the string.
+            pin (int, optional): GPIO pin. Defaults to LED_PIN.
+            dma (int, optional): DMA channel. Defaults to LED_DMA.
+            channel (int, optional): PWM channel. Defaults to LED_CHANNEL.
+            reverse (bool, optional): Whether the output is wired from the far end,
+                handled by MultiStrip. Defaults to False.
+
+        Returns:
+            StripBackend: The output
+        """
+        strip_type = strip_mode.get(color_mode, self.strip_type)
+        if backend == "simulated":
+            return SimulatedStrip(
+                led_count,
+                strip_type=strip_type,
+                timing=StripTiming(led_count, freq_hz=LED_FREQ_HZ),
+            )
+
+        return Ws281xStrip(
+            led_count,
+            pin,
             LED_FREQ_HZ,
-            LED_DMA,
+            dma,
             LED_INVERT,
             LED_BRIGHTNESS,
-            LED_CHANNEL,
-            self.strip_type,
+            channel,
+            strip_type,
         )
-        self.strip.begin()
+
+    def set_interrupt(self, interrupt):
+        """Lets animations be stopped at a frame boundary from another process. Once
+            interrupt is set, animations return before their next frame and waits
+            between frames wake up early.
+
+        Args:
+            interrupt (multiprocessing.Event): Event to watch
+        """
+        self.interrupt = interrupt
+        self.scheduler.sleep = interrupt.wait
+
+    def interrupted(self) -> bool:
+        """Whether the animation running should stop"""
+        return self.interrupt is not None and self.interrupt.is_set()
+
+    def show_frame(self, frame: np.ndarray):
+        """Pushes a whole frame of packed colors to the strip in bulk and shows it. The
+            frame is color corrected on the way out, self.frame keeps the colors as
+            they were asked for.
+
+        Args:
+            frame (np.ndarray): Packed uint32 colors, one for every pixel
+        """
+        trace_start = TRACER.begin()
+        self.frame[:] = frame
+        self.strip.write_frame(self.color_table.apply(self.frame))
+        TRACER.end(SPAN_COLOR_CORRECT, trace_start)
+
+        trace_start = TRACER.begin()
+        show_start = time.perf_counter()
+        self.strip.show()
+        STRIP_SHOW_SECONDS.observe(time.perf_counter() - show_start)
+        TRACER.end(SPAN_STRIP_SHOW, trace_start)
+
+    def play(
+        self,
+        step_count: int,
+        frame_at: Callable[[int], np.ndarray],
+        wait_ms: Optional[float] = 50,
+    ):
+        """Shows an animation that lasts step_count * wait_ms. Each step is shown when
+            its deadline comes up, steps are skipped if rendering falls behind or the
+            strip can't take frames that fast. Returns early if interrupted.
+
+        Args:
+            step_count (int): Number of frames in the animation
+            frame_at (Callable[[int], np.ndarray]): Builds the frame for a step
+            wait_ms (Optional[float]): Time in ms each step stays on screen.
+                Defaults to 50.
+        """
+        interval_s = wait_ms / self.ONE_SECOND_IN_MILLISECONDS
+        for step in self.scheduler.run(step_count, interval_s):
+            if self.interrupted():
+                return
+            trace_start = TRACER.begin()
+            frame = frame_at(step)
+            TRACER.end(SPAN_RENDER_FRAME, trace_start)
+            self.show_frame(frame)
 
     def set_solid_from_rgb_list(self, rgb_list: List[List[int]]):
         """Takes a list of RGB Values and repeats the list of values over the string of
@@ -55,11 +200,7 @@ class LightString:
         Args:
             rgb_list (List[List[int]]): List of list of integers representing RGB Values
         """
-        for pixel_n in range(self.led_count):
-            color = LedColor.rgb(rgb_list[pixel_n % len(rgb_list)])
-            self.strip.setPixelColor(pixel_n, color)
-
-        self.strip.show()
+        self.show_frame(FrameRenderer.tile_rgb_list(self.led_count, rgb_list))
 
     def set_color_for_pixels(self, pixel_list: List[int], color: Color):
         """Sets every pixel in the provided list to the given color
@@ -68,9 +209,10 @@ class LightString:
             pixel_list (List[int]): A list of pixels (lights) to change
             color (Color): The color to change to
         """
-        for pixel_n in pixel_list:
-            self.strip.setPixelColor(pixel_n, color)
-        self.strip.show()
+        pixels = np.asarray(pixel_list, dtype=np.int64)
+        frame = self.frame.copy()
+        frame[pixels[(pixels >= 0) & (pixels < self.led_count)]] = color
+        self.show_frame(frame)
 
     def color_wipe_inside_out_reversed(
         self, color: Color, wait_ms: Optional[int] = 50, *args, **kwargs
@@ -83,12 +225,16 @@ class LightString:
                 Defaults to 50.
         """
         log.info("color_wipe_inside_out_reversed")
-        half = int(self.strip.numPixels() / 2)
-        for i in range(half):
-            self.strip.setPixelColor(0 + i, color)
-            self.strip.setPixelColor(self.strip.numPixels() - i, color)
-            self.strip.show()
-            time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
+        base = self.frame.copy()
+        n = self.led_count
+
+        def frame_at(i):
+            wiped = FrameRenderer.wipe_mask(n, 0, i + 1) | FrameRenderer.wipe_mask(
+                n, n - i, n
+            )
+            return np.where(wiped, color, base)
+
+        self.play(int(n / 2), frame_at, wait_ms)
 
     def random_colors(self, time_ms: Optional[int] = 50, *args, **kwargs):
         """Move from outside in one pixel at a time changing to random colors
@@ -97,14 +243,24 @@ class LightString:
             time_ms (Optional[int]): Time in ms between pixel changes. Defaults to 50.
         """
         log.info("Setting string to random colors.")
-        half = int(self.strip.numPixels() / 2)
-        for i in range(half):
-            self.strip.setPixelColor(0 + i, LedColor.get_random())
-            self.strip.setPixelColor(
-                self.strip.numPixels() - i, LedColor.get_random()
+        base = self.frame.copy()
+        n = self.led_count
+        half = int(n / 2)
+
+        left = LedColor.get_random_batch(half)
+        right = LedColor.get_random_batch(half)
+
+        target = base.copy()
+        target[:half] = left
+        target[n - half + 1:] = right[1:][::-1]
+
+        def frame_at(i):
+            wiped = FrameRenderer.wipe_mask(n, 0, i + 1) | FrameRenderer.wipe_mask(
+                n, n - i, n
             )
-            self.strip.show()
-            time.sleep(time_ms / self.ONE_SECOND_IN_MILLISECONDS)
+            return np.where(wiped, target, base)
+
+        self.play(half, frame_at, time_ms)
 
     def color_wipe_inside_out(
         self, color: Color, wait_ms: Optional[int] = 50, *args, **kwargs
@@ -117,12 +273,15 @@ class LightString:
             wait_ms (int, optional): _description_. Defaults to 50.
         """
         log.info("color_wipe_inside_out")
-        half = int(self.strip.numPixels() / 2)
-        for i in range(half):
-            self.strip.setPixelColor(half - i, color)
-            self.strip.setPixelColor(half + i, color)
-            self.strip.show()
-            time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
+        base = self.frame.copy()
+        n = self.led_count
+        half = int(n / 2)
+
+        def frame_at(i):
+            wiped = FrameRenderer.wipe_mask(n, half - i, half + i + 1)
+            return np.where(wiped, color, base)
+
+        self.play(half, frame_at, wait_ms)
 
     # Define functions which animate LEDs in various ways.
     def color_wipe(
@@ -139,15 +298,19 @@ class LightString:
                 instead of vice versa. Defaults to False.
         """
         log.info(f"Colorwipe - Reversed:{reverse}")
-        wipe_direction = (
-            (self.strip.numPixels(), 0, -1)
-            if reverse
-            else (0, self.strip.numPixels())
-        )
-        for i in range(*wipe_direction):
-            self.strip.setPixelColor(i, color)
-            self.strip.show()
-            time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
+        base = self.frame.copy()
+        n = self.led_count
+
+        def frame_at(i):
+            # Reversed wipes start one past the end and never reach pixel 0
+            wiped = (
+                FrameRenderer.wipe_mask(n, n - i, n)
+                if reverse
+                else FrameRenderer.wipe_mask(n, 0, i + 1)
+            )
+            return np.where(wiped, color, base)
+
+        self.play(n, frame_at, wait_ms)
 
     def set_solid(self, color: Color):
         """Sets the whole light string to the new color all at once.
@@ -156,11 +319,7 @@ class LightString:
             color (Color): New color to change too
         """
         log.info("Setting to solid color")
-
-        for i in range(self.strip.numPixels()):
-            self.strip.setPixelColor(i, color)
-
-        self.strip.show()
+        self.show_frame(FrameRenderer.solid(self.led_count, color))
 
     def theater_chase(
         self,
@@ -178,14 +337,32 @@ class LightString:
                 Defaults to 10.
         """
         log.info("Running theater chase")
-        for _ in range(iterations):
-            for q in range(3):
-                for i in range(0, self.strip.numPixels(), 3):
-                    self.strip.setPixelColor(i + q, color)
-                self.strip.show()
-                time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
-                for i in range(0, self.strip.numPixels(), 3):
-                    self.strip.setPixelColor(i + q, 0)
+        base = self.frame.copy()
+        n = self.led_count
+
+        def frame_at(step):
+            lap, q = divmod(step, 3)
+            lit = FrameRenderer.chase_mask(n, q)
+            return np.where(lit, color, self._chase_background(base, lap, q))
+
+        self.play(iterations * 3, frame_at, wait_ms)
+
+    @staticmethod
+    def _chase_background(base: np.ndarray, lap: int, q: int) -> np.ndarray:
+        """Chases turn off every pixel they light after showing it, so once the first
+            lap is through the whole background is black
+
+        Args:
+            base (np.ndarray): Frame from before the chase started
+            lap (int): Which lap of the chase is running
+            q (int): Which offset of the lap is lit
+
+        Returns:
+            np.ndarray: Frame the lit pixels are drawn over
+        """
+        if lap:
+            return np.zeros_like(base)
+        return np.where(np.arange(len(base)) % 3 < q, 0, base).astype(base.dtype)
 
     @staticmethod
     def wheel(pos: int):
@@ -221,13 +398,11 @@ class LightString:
                 loop. Defaults to 1.
         """
         log.info(f"Rainbow\nwait_ms: {wait_ms}\niterations: {iterations}")
-        for j in range(self.MAX_COLOR_VALUE * iterations):
-            for i in range(self.strip.numPixels()):
-                self.strip.setPixelColor(
-                    i, self.wheel((i + j) & self.MAX_COLOR_VALUE - 1)
-                )
-            self.strip.show()
-            time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
+        self.play(
+            self.MAX_COLOR_VALUE * iterations,
+            lambda j: FrameRenderer.rainbow(self.led_count, j),
+            wait_ms,
+        )
 
     def rainbow_cycle(
         self, wait_ms: Optional[int] = 20, iterations: Optional[int] = 5
@@ -239,24 +414,11 @@ class LightString:
             iterations (Optional[int]): Amount of times to run the loop. Defaults to 5.
         """
         log.info(f"Rainbow Cycle\nwait_ms: {wait_ms}\niterations: {iterations}")
-        for j in range(self.MAX_COLOR_VALUE * iterations):
-            for i in range(self.strip.numPixels()):
-                self.strip.setPixelColor(
-                    i,
-                    self.wheel(
-                        (
-                            int(
-                                i
-                                * self.MAX_COLOR_VALUE
-                                / self.strip.numPixels()
-                            )
-                            + j
-                        )
-                        & self.MAX_COLOR_VALUE - 1
-                    ),
-                )
-            self.strip.show()
-            time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
+        self.play(
+            self.MAX_COLOR_VALUE * iterations,
+            lambda j: FrameRenderer.rainbow_cycle(self.led_count, j),
+            wait_ms,
+        )
 
     def theater_chase_rainbow(self, wait_ms: Optional[int] = 50):
         """Creates a rainbow theater chase pattern
@@ -264,23 +426,53 @@ class LightString:
         Args:
             wait_ms (Optional[int]): Time between refreshes. Defaults to 50.
         """
-        for j in range(self.MAX_COLOR_VALUE):
-            for q in range(3):
-                for i in range(0, self.strip.numPixels(), 3):
-                    print(self.wheel((i + j) % self.MAX_COLOR_VALUE - 1))
-                    self.strip.setPixelColor(
-                        i + q, self.wheel((i + j) % self.MAX_COLOR_VALUE - 1)
-                    )
-                self.strip.show()
-                time.sleep(wait_ms / self.ONE_SECOND_IN_MILLISECONDS)
-                for i in range(0, self.strip.numPixels(), 3):
-                    self.strip.setPixelColor(i + q, 0)
+        base = self.frame.copy()
+        pixels = np.arange(self.led_count)
+
+        def frame_at(step):
+            j, q = divmod(step, 3)
+            lit = FrameRenderer.chase_mask(self.led_count, q)
+            # Wheel position -1 wraps to 255 instead of building an invalid color
+            positions = ((pixels - q + j) % self.MAX_COLOR_VALUE - 1) & 0xFF
+            return np.where(
+                lit,
+                FrameRenderer.wheel(positions),
+                self._chase_background(base, j, q),
+            )
+
+        self.play(self.MAX_COLOR_VALUE * 3, frame_at, wait_ms)
+
+    def transition_to_frame(
+        self,
+        target: np.ndarray,
+        time_ms: int = 1000,
+        easing: str = EASING_LINEAR,
+        start: Optional[np.ndarray] = None,
+    ):
+        """Fades every pixel from its current color to its color in target. The fade
+            gets as many frames as the strip can show at up to 100 per second.
+
+        Args:
+            target (np.ndarray): Packed colors to end on
+            time_ms (int, optional): Time for the fade to take. Defaults to 1000.
+            easing (str, optional): One of Transition.EASINGS. Defaults to
+                EASING_LINEAR.
+            start (Optional[np.ndarray]): Packed colors to start from instead of what
+                the string is showing
+        """
+        interval_ms = self.timing.clamp_interval(FRAME_INTERVAL_S) * 1000
+        steps = max(int(round(time_ms / interval_ms)), 1)
+        transition = Transition(
+            self.frame if start is None else start, target, steps, easing
+        )
+        self.play(steps, transition.frame_at, wait_ms=time_ms / steps)
 
     def transition_colors(
         self,
         c1: Color,
         c2: Color,
         time_ms: int = 1000,
+        easing: str = EASING_LINEAR,
     ) -> None:
         """Transition the whole light string from one color to another in a slow fade
 
@@ -289,62 +481,62 @@ class LightString:
             c2 (Color): Color to transition to
             time_ms (int, optional): AMount of time for the fade to take.
                 Defaults to 1000.
+            easing (str, optional): One of Transition.EASINGS. Defaults to
+                EASING_LINEAR.
         """
-        c1 = self.get_rgb_value(c1)
-        c2 = self.get_rgb_value(c2)
-        # difference between colors
-        dif = [c2[0] - c1[0], c2[1] - c1[1], c2[2] - c1[2]]
-        for j in range(time_ms):
-            new_color = [
-                round(c1[0] + dif[0] * (j / time_ms)),
-                round(c1[1] + dif[1] * (j / time_ms)),
-                round(c1[2] + dif[2] * (j / time_ms)),
-            ]
-            for i in range(self.strip.numPixels()):
-                self.strip.setPixelColor(i, Color(*new_color))
-            self.strip.show()
-
-            time.sleep(0.001)
+        self.transition_to_frame(
+            FrameRenderer.solid(self.led_count, c2),
+            time_ms,
+            easing,
+            start=FrameRenderer.solid(self.led_count, c1),
+        )
 
     def transition_to_color(
-        self, new_color: Color, time_ms: Optional[int] = 1000
+        self,
+        new_color: Color,
+        time_ms: Optional[int] = 1000,
+        easing: str = EASING_LINEAR,
     ):
-        """Transition the whole light string from current color to another in
-            a slow fade. This acts on whatever the current color of pixel 0 is
-            rather than fading each color to the new color. So if its currently
-            multiple colors, it will turn every pixel to the first color before starting
-            the transition.
+        """Transition the whole light string from what it shows now to one color in
+            a slow fade. Every pixel fades from its own color, so a string showing
+            several colors fades each of them to the new color.
 
         Args:
-            new_color (Color): Time to transition to new color.
-            time_ms (Optional[int], optional): _description_. Defaults to 1000.
+            new_color (Color): Color to transition to
+            time_ms (Optional[int], optional): Time for the fade to take. Defaults
+                to 1000.
+            easing (str, optional): One of Transition.EASINGS. Defaults to
+                EASING_LINEAR.
         """
-        current_color = self.strip.getPixelColor(0)
-        self.transition_colors(current_color, new_color, time_ms)
+        self.transition_to_frame(
+            FrameRenderer.solid(self.led_count, new_color), time_ms, easing
+        )
 
     def transition_to_random_color(
         self,
         transition_time_ms: Optional[int] = 1000,
         wait_after_transition_sec: Optional[int] = 0,
+        easing: str = EASING_LINEAR,
         **kwargs,
     ):
-        """Transition the whole light string from current color to another in
-            a slow fade. This acts on whatever the current color of pixel 0 is
-            rather than fading each color to the new color. So if its currently
-            multiple colors, it will turn every pixel to the first color before starting
-            the transition.
+        """Transition the whole light string from what it shows now to a random color
+            in a slow fade. Every pixel fades from its own color.
 
         Args:
             transition_time_ms (Optional[int]): Time to fade to the new color in
                 milliseconds. Defaults to 1000.
             wait_after_transition_sec (Optional[int]): Time to wait after changing to
                 the new color. Defaults to 0.
+            easing (str, optional): One of Transition.EASINGS. Defaults to
+                EASING_LINEAR.
         """
-        current_color = self.strip.getPixelColor(0)
-        self.transition_colors(
-            current_color, LedColor.get_random(), transition_time_ms
+        self.transition_to_color(
+            LedColor.get_random(), transition_time_ms, easing
         )
-        time.sleep(wait_after_transition_sec)
+        if self.interrupt is not None:
+            self.interrupt.wait(wait_after_transition_sec)
+        else:
+            time.sleep(wait_after_transition_sec)
 
     @staticmethod
     def get_rgb_value(color_int: Color) -> List[int]:
@@ -0,0 +1,275 @@
+"""Render and visualizer metrics shared by every process, exported in Prometheus text
+format.
+
+Drawing happens in processes forked from the server, so every metric keeps its values
+ in a shared ctypes array allocated when this module is imported. Children forked
+ afterwards write straight into the same memory and the server reads it when it is
+ scraped. Recording a value is an index lookup and an add with no lock, which is
+ cheap enough to leave on during a show. Each metric is only written by one process
+ at a time (the render worker is stopped before a visualizer starts), so no updates
+ are lost.
+
+CPU time and resident memory of the processes are read from /proc when scraped, so
+ they cost nothing in between.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from multiprocessing import RawArray
+from typing import Dict, Iterator, List, Sequence, Tuple
+import os
+
+# Label values of the frame scheduler loops that render frames. The display loop only
+# shows what they publish and keeps its own counts in the frame buffer.
+LOOP_PATTERN = "pattern"
+LOOP_VISUALIZER = "visualizer"
+LOOPS = (LOOP_PATTERN, LOOP_VISUALIZER)
+
+# Label values of the protocols the pixel receiver takes frames over
+PROTOCOL_E131 = "e131"
+PROTOCOL_DDP = "ddp"
+PROTOCOLS = (PROTOCOL_E131, PROTOCOL_DDP)
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS_S = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+)
+
+CLOCK_TICKS_PER_S = os.sysconf("SC_CLK_TCK")
+PAGE_BYTES = os.sysconf("SC_PAGE_SIZE")
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label: str = None,
+        label_values: Sequence[str] = ("",),
+    ) -> None:
+        """A named value, or one value per label value, in shared memory
+
+        Args:
+            name (str): Prometheus metric name
+            description (str): Help text shown in the export
+            label (str, optional): Name of the label the values are split by
+            label_values (Sequence[str], optional): Every value the label can have.
+                They can't be added later since the memory is shared at fork.
+        """
+        self.name = name
+        self.description = description
+        self.label = label
+        self.label_values = tuple(label_values)
+        self.slots = {value: i for i, value in enumerate(self.label_values)}
+
+    def labels(self, label_value: str) -> str:
+        if not self.label:
+            return ""
+        return f'{self.label}="{label_value}"'
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Yields the name suffix, labels and value of every sample"""
+        raise NotImplementedError
+
+    def export(self) -> List[str]:
+        """Lines of the metric in Prometheus text format"""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self.samples():
+            labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix}{labels} {float(value)!r}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.values = RawArray("d", len(self.label_values))
+
+    def inc(self, amount: float = 1, label_value: str = ""):
+        self.values[self.slots[label_value]] += amount
+
+    def value(self, label_value: str = "") -> float:
+        return self.values[self.slots[label_value]]
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for value, slot in self.slots.items():
+            yield "", self.labels(value), self.values[slot]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, label_value: str = ""):
+        self.values[self.slots[label_value]] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, *args, buckets: Sequence[float] = LATENCY_BUCKETS_S, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # Per label value: a count for every bucket, one for +Inf, then the sum
+        self.width = len(self.buckets) + 2
+        self.values = RawArray("d", self.width * len(self.label_values))
+
+    def observe(self, value: float, label_value: str = ""):
+        offset = self.slots[label_value] * self.width
+        self.values[offset + bisect_left(self.buckets, value)] += 1
+        self.values[offset + self.width - 1] += value
+
+    def count(self, label_value: str = "") -> int:
+        offset = self.slots[label_value] * self.width
+        return int(sum(self.values[offset:offset + self.width - 1]))
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for value, slot in self.slots.items():
+            offset = slot * self.width
+            labels = self.labels(value)
+            separator = "," if labels else ""
+            total = 0
+            for bound, bucket in zip(
+                self.buckets + (float("inf"),), range(offset, offset + self.width - 1)
+            ):
+                total += self.values[bucket]
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                yield "_bucket", f'{labels}{separator}le="{le}"', total
+            yield "_sum", labels, self.values[offset + self.width - 1]
+            yield "_count", labels, total
+
+
+STRIP_SHOW_SECONDS = Histogram(
+    "xmas_strip_show_seconds", "Time strip.show() took to send a frame"
+)
+FRAMES_SHOWN = Counter(
+    "xmas_frames_shown_total", "Frames shown by each loop", "loop", LOOPS
+)
+FRAMES_DROPPED = Counter(
+    "xmas_frames_dropped_total",
+    "Animation steps skipped because rendering fell behind",
+    "loop",
+    LOOPS,
+)
+FRAMES_LATE = Counter(
+    "xmas_frames_late_total",
+    "Frames started more than a frame interval after their deadline",
+    "loop",
+    LOOPS,
+)
+TARGET_FPS = Gauge(
+    "xmas_target_fps", "Frame rate each loop is asked to run at", "loop", LOOPS
+)
+ACHIEVED_FPS = Gauge(
+    "xmas_achieved_fps",
+    "Frame rate each loop ran at over the last second",
+    "loop",
+    LOOPS,
+)
+PATTERN_SWITCH_SECONDS = Histogram(
+    "xmas_pattern_switch_seconds",
+    "Time from sending a command to the render worker until it starts drawing",
+)
+ANALYSIS_LOOKUP_SECONDS = Histogram(
+    "xmas_analysis_lookup_seconds",
+    "Time to find the active audio analysis items or light show run for a frame",
+)
+BEAT_OFFSET_SECONDS = Histogram(
+    "xmas_beat_offset_seconds",
+    "Track time between a beat or light show change and the frame showing it",
+)
+RECEIVER_PACKETS = Counter(
+    "xmas_receiver_packets_total",
+    "Pixel packets received from sequencers",
+    "protocol",
+    PROTOCOLS,
+)
+RECEIVER_PACKETS_DISCARDED = Counter(
+    "xmas_receiver_packets_discarded_total",
+    "Pixel packets dropped as duplicates or for arriving out of order",
+    "protocol",
+    PROTOCOLS,
+)
+RECEIVER_FRAMES = Counter(
+    "xmas_receiver_frames_total",
+    "Frames the pixel receiver published to the display",
+    "protocol",
+    PROTOCOLS,
+)
+
+METRICS = (
+    STRIP_SHOW_SECONDS,
+    FRAMES_SHOWN,
+    FRAMES_DROPPED,
+    FRAMES_LATE,
+    TARGET_FPS,
+    ACHIEVED_FPS,
+    PATTERN_SWITCH_SECONDS,
+    ANALYSIS_LOOKUP_SECONDS,
+    BEAT_OFFSET_SECONDS,
+    RECEIVER_PACKETS,
+    RECEIVER_PACKETS_DISCARDED,
+    RECEIVER_FRAMES,
+)
+
+
+def read_process_usage(pid: int) -> Tuple[float, int]:
+    """Reads how much CPU time and memory a process has used
+
+    Args:
+        pid (int): Id of the process
+
+    Returns:
+        Tuple[float, int]: Seconds of user and system CPU time, resident bytes
+    """
+    with open(f"/proc/{pid}/stat") as stat_file:
+        # The command name can hold spaces, so fields are counted from after it
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    cpu_ticks = int(fields[11]) + int(fields[12])
+    return cpu_ticks / CLOCK_TICKS_PER_S, int(fields[21]) * PAGE_BYTES
+
+
+def export(processes: Dict[str, int] = None, extra: Dict[str, float] = None) -> str:
+    """Builds the Prometheus text export of every metric
+
+    Args:
+        processes (Dict[str, int], optional): Process ids by role to report CPU and
+            memory of. Processes that have exited are left out.
+        extra (Dict[str, float], optional): Counters kept elsewhere, by metric name
+
+    Returns:
+        str: The export
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.export())
+
+    usage = {}
+    for role, pid in (processes or {}).items():
+        try:
+            usage[role] = read_process_usage(pid)
+        except (OSError, IndexError, ValueError):
+            continue
+
+    for name, description, kind, column in (
+        ("xmas_process_cpu_seconds_total", "CPU time used", "counter", 0),
+        ("xmas_process_resident_memory_bytes", "Resident memory", "gauge", 1),
+    ):
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += [
+            f'{name}{{process="{role}"}} {float(values[column])!r}'
+            for role, values in usage.items()
+        ]
+
+    for name, value in (extra or {}).items():
+        lines += [f"# TYPE {name} counter", f"{name} {float(value)!r}"]
+
+    return "\n".join(lines) + "\n"
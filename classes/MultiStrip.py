@@ -0,0 +1,120 @@
+"""One logical strip made of several physical outputs.
+
+Long strings on a single output are limited by wire time, every LED takes 30us to
+ clock out, so frame rate drops as the tree grows. Splitting the string over several
+ outputs, like a PWM channel plus SPI, each with its own LED count and color order,
+ divides that time by the number of outputs as long as they are sent in parallel.
+
+The outputs are laid end to end in one virtual pixel space, in the order given, so
+ everything above the backend keeps drawing one frame. write_frame hands each output
+ its slice of the frame, reversed for outputs wired from the far end, and show sends
+ every output at once from a thread per output. The simulated strip sleeps through
+ its wire time and the driver only waits on the DMA of the frame before, so the
+ outputs spend their wire time side by side instead of one after another.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+import os
+
+import numpy as np
+
+from classes.FrameScheduler import StripTiming
+from classes.StripBackend import StripBackend
+
+
+class MultiStrip(StripBackend):
+    def __init__(
+        self,
+        outputs: List[StripBackend],
+        reversed_outputs: Optional[Sequence[bool]] = None,
+    ) -> None:
+        """Lays outputs end to end into one strip
+
+        Args:
+            outputs (List[StripBackend]): Outputs in the order their pixels appear
+            reversed_outputs (Optional[Sequence[bool]]): Whether each output is wired
+                so its first LED is the last pixel of its part. Defaults to none.
+
+        Raises:
+            ValueError: If there are no outputs
+        """
+        if not outputs:
+            raise ValueError("A multi strip needs at least one output")
+
+        self.outputs = outputs
+        reversed_outputs = reversed_outputs or [False] * len(outputs)
+        counts = [output.numPixels() for output in outputs]
+        self.starts = np.cumsum([0] + counts)
+        self.led_count = int(self.starts[-1])
+        self.slices = [
+            slice(end - 1, start - 1 if start else None, -1)
+            if reverse
+            else slice(start, end)
+            for start, end, reverse in zip(
+                self.starts[:-1].tolist(), self.starts[1:].tolist(), reversed_outputs
+            )
+        ]
+        # Outputs send in parallel, so a frame takes as long as the longest one
+        self.timing = StripTiming(max(counts))
+        self._pool = None
+        self._pool_pid = None
+
+    def begin(self):
+        for output in self.outputs:
+            output.begin()
+
+    def write_frame(self, frame: np.ndarray):
+        for output, pixels in zip(self.outputs, self.slices):
+            output.write_frame(frame[pixels])
+
+    def show(self):
+        """Sends every output at once and waits for all of them"""
+        if len(self.outputs) == 1:
+            self.outputs[0].show()
+            return
+
+        # Threads don't survive a fork, so each process makes its own pool
+        if self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=len(self.outputs))
+            self._pool_pid = os.getpid()
+        for sent in [self._pool.submit(output.show) for output in self.outputs]:
+            sent.result()
+
+    def numPixels(self) -> int:
+        return self.led_count
+
+    def setPixelColor(self, n: int, color: int):
+        if 0 <= n < self.led_count:
+            output, pixel = self.__locate(n)
+            output.setPixelColor(pixel, color)
+
+    def getPixelColor(self, n: int) -> int:
+        output, pixel = self.__locate(n)
+        return output.getPixelColor(pixel)
+
+    @property
+    def frames_shown(self) -> int:
+        """Frames shown on the first output, for outputs that count them"""
+        return self.outputs[0].frames_shown
+
+    def recorded_frames(self) -> np.ndarray:
+        """Frames recorded by simulated outputs, joined back into the virtual pixel
+            space, oldest first
+
+        Returns:
+            np.ndarray: Array shaped (frames, led_count) of packed colors
+        """
+        recordings = [output.recorded_frames() for output in self.outputs]
+        frame_count = min(len(recording) for recording in recordings)
+        frames = np.zeros((frame_count, self.led_count), dtype=np.uint32)
+        for recording, pixels in zip(recordings, self.slices):
+            frames[:, pixels] = recording[len(recording) - frame_count:]
+        return frames
+
+    def __locate(self, n: int):
+        index = int(self.starts.searchsorted(n, "right")) - 1
+        pixels = self.slices[index]
+        offset = n - int(self.starts[index])
+        if pixels.step == -1:
+            offset = int(self.starts[index + 1]) - int(self.starts[index]) - 1 - offset
+        return self.outputs[index], offset
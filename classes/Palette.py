@@ -0,0 +1,73 @@
+"""Registry of named color palettes that can hand out random colors in batches."""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class Palette:
+    registry: Dict[str, "Palette"] = {}
+
+    def __init__(self, name: str, colors: List[int]) -> None:
+        """Fixed set of packed colors to choose from
+
+        Args:
+            name (str): Name the palette is registered under
+            colors (List[int]): Packed colors in the palette
+        """
+        if not len(colors):
+            raise ValueError(f"Palette {name} needs at least one color")
+
+        self.name = name
+        self.colors = np.asarray(colors, dtype=np.uint32)
+        self.colors.flags.writeable = False
+
+    @classmethod
+    def register(cls, name: str, colors: List[int]) -> "Palette":
+        """Creates a palette and stores it in the registry, replacing any palette
+            already registered under the same name
+
+        Args:
+            name (str): Name to register the palette under
+            colors (List[int]): Packed colors in the palette
+
+        Returns:
+            Palette: The registered palette
+        """
+        palette = cls(name, colors)
+        cls.registry[name] = palette
+        return palette
+
+    @classmethod
+    def get(cls, name: str) -> "Palette":
+        """Gets a registered palette
+
+        Args:
+            name (str): Name the palette was registered under
+
+        Raises:
+            KeyError: If no palette has that name
+
+        Returns:
+            Palette: The palette
+        """
+        return cls.registry[name]
+
+    def sample(
+        self, count: int, rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Picks count colors from the palette at random in one call
+
+        Args:
+            count (int): How many colors to pick
+            rng (Optional[np.random.Generator]): Random generator to use, mostly for
+                repeatable tests. Defaults to numpy's global generator.
+
+        Returns:
+            np.ndarray: Packed uint32 colors
+        """
+        indexes = (
+            rng.integers(len(self.colors), size=count)
+            if rng is not None
+            else np.random.randint(len(self.colors), size=count)
+        )
+        return self.colors[indexes]
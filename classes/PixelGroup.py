@@ -0,0 +1,163 @@
+"""Groups of pixels stored as precomputed index arrays.
+
+A group is built once from its geometry and kept as a sorted, read only numpy array of
+ pixel numbers, with a boolean mask made on demand for set operations. Painting a
+ group is a single vectorized write into a frame. Groups whose pixels are evenly
+ spaced, like every nth pixel or a range, are written through a slice so the write
+ doesn't even need a gather.
+"""
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+
+class PixelGroup:
+    def __init__(self, led_count: int, pixels: Iterable[int]) -> None:
+        """Group of pixel numbers on a string
+
+        Args:
+            led_count (int): Number of pixels on the string
+            pixels (Iterable[int]): Pixel numbers in the group, duplicates are dropped
+
+        Raises:
+            ValueError: If a pixel is off the string
+        """
+        indices = np.unique(np.fromiter(pixels, dtype=np.intp))
+        if len(indices) and (indices[0] < 0 or indices[-1] >= led_count):
+            raise ValueError(f"Pixel group has pixels outside 0-{led_count - 1}")
+
+        indices.flags.writeable = False
+        self.led_count = led_count
+        self.indices = indices
+        self.selector = self.__selector(indices)
+        self._mask = None
+
+    @classmethod
+    def every_nth(cls, led_count: int, n: int, offset: int = 0) -> "PixelGroup":
+        """Every nth pixel starting from offset
+
+        Args:
+            led_count (int): Number of pixels on the string
+            n (int): Spacing between pixels
+            offset (int, optional): First pixel. Defaults to 0.
+
+        Returns:
+            PixelGroup: The group
+        """
+        return cls(led_count, range(offset, led_count, n))
+
+    @classmethod
+    def span(cls, led_count: int, start: int, stop: int) -> "PixelGroup":
+        """Pixels from start up to but not including stop
+
+        Args:
+            led_count (int): Number of pixels on the string
+            start (int): First pixel
+            stop (int): Pixel after the last one
+
+        Returns:
+            PixelGroup: The group
+        """
+        return cls(led_count, range(start, stop))
+
+    @classmethod
+    def mirrored(cls, led_count: int, start: int, stop: int) -> "PixelGroup":
+        """A span and its reflection from the other end of the string, so effects on
+            it look the same from both ends
+
+        Args:
+            led_count (int): Number of pixels on the string
+            start (int): First pixel of the span
+            stop (int): Pixel after the last one of the span
+
+        Returns:
+            PixelGroup: The group
+        """
+        pixels = np.arange(start, stop)
+        return cls(led_count, np.concatenate([pixels, led_count - 1 - pixels]))
+
+    @classmethod
+    def scatter(
+        cls, led_count: int, count: int, seed: Optional[int] = None
+    ) -> "PixelGroup":
+        """Pixels picked at random from the whole string
+
+        Args:
+            led_count (int): Number of pixels on the string
+            count (int): Number of pixels to pick
+            seed (Optional[int]): Seed to pick the same pixels every time
+
+        Returns:
+            PixelGroup: The group
+        """
+        rng = np.random.default_rng(seed)
+        return cls(led_count, rng.choice(led_count, size=count, replace=False))
+
+    @property
+    def mask(self) -> np.ndarray:
+        """Read only boolean mask that is True for every pixel in the group"""
+        if self._mask is None:
+            mask = np.zeros(self.led_count, dtype=bool)
+            mask[self.indices] = True
+            mask.flags.writeable = False
+            self._mask = mask
+        return self._mask
+
+    def paint(self, frame: np.ndarray, colors: Union[int, np.ndarray]):
+        """Writes a color, or one color for each pixel in order, into the group
+
+        Args:
+            frame (np.ndarray): Frame of packed colors to write into
+            colors (Union[int, np.ndarray]): One color or a color for every pixel
+        """
+        frame[self.selector] = colors
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __iter__(self):
+        return iter(self.indices.tolist())
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.indices if dtype is None else self.indices.astype(dtype)
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, PixelGroup)
+            and self.led_count == other.led_count
+            and np.array_equal(self.indices, other.indices)
+        )
+
+    def __or__(self, other: "PixelGroup") -> "PixelGroup":
+        return self.__from_mask(self.mask | self.__other_mask(other))
+
+    def __and__(self, other: "PixelGroup") -> "PixelGroup":
+        return self.__from_mask(self.mask & self.__other_mask(other))
+
+    def __sub__(self, other: "PixelGroup") -> "PixelGroup":
+        return self.__from_mask(self.mask & ~self.__other_mask(other))
+
+    def __xor__(self, other: "PixelGroup") -> "PixelGroup":
+        return self.__from_mask(self.mask ^ self.__other_mask(other))
+
+    def __invert__(self) -> "PixelGroup":
+        return self.__from_mask(~self.mask)
+
+    def __other_mask(self, other: "PixelGroup") -> np.ndarray:
+        if other.led_count != self.led_count:
+            raise ValueError("Pixel groups are on strings of different lengths")
+        return other.mask
+
+    def __from_mask(self, mask: np.ndarray) -> "PixelGroup":
+        return PixelGroup(self.led_count, np.flatnonzero(mask))
+
+    @staticmethod
+    def __selector(indices: np.ndarray) -> Union[slice, np.ndarray]:
+        # Evenly spaced pixels are written through a slice, which numpy does in place
+        if len(indices) == 1:
+            return slice(int(indices[0]), int(indices[0]) + 1)
+        if len(indices) > 1:
+            steps = np.diff(indices)
+            if np.all(steps == steps[0]):
+                return slice(int(indices[0]), int(indices[-1]) + 1, int(steps[0]))
+        return indices
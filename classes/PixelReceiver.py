@@ -0,0 +1,486 @@
+"""Receives frames from lighting sequencers over E1.31 (sACN) and DDP.
+
+Sequencers like xLights and Falcon Player send pixels as UDP packets at the show's
+ frame rate. E1.31 packets carry one DMX universe each, 170 RGB pixels, starting from
+ start_universe. DDP packets carry a byte offset into the whole string and set a push
+ flag on the last packet of a frame. Packets are read with recv_into into one
+ preallocated buffer and their pixels copied straight into a preallocated RGB frame,
+ so nothing is allocated per packet. Finished frames are packed in place into the
+ frame buffer's back buffer and published, and the display loop shows them.
+
+An E1.31 frame is published once every universe of the string has arrived, when a
+ universe comes round again before the frame finished because a packet was lost, or
+ on the sequencer's sync packet if it uses universe synchronization. Packets that
+ arrive after a later one of the same universe, or a second time, are dropped using
+ the sequence numbers both protocols carry. Some DDP senders give every packet of a
+ frame the same sequence number, so a DDP packet with the last one's sequence number
+ is only dropped when it doesn't carry pixels further along the string. Only one
+ source is expected at a time, E1.31 priorities aren't merged.
+"""
+from typing import Callable, Dict, List
+import selectors
+import socket
+import struct
+
+import numpy as np
+
+from classes.FrameRenderer import FrameRenderer
+from classes.Metrics import (
+    PROTOCOL_DDP,
+    PROTOCOL_E131,
+    RECEIVER_FRAMES,
+    RECEIVER_PACKETS,
+    RECEIVER_PACKETS_DISCARDED,
+)
+from classes.SharedFrameBuffer import SharedFrameBuffer
+
+from config import log
+
+E131_PORT = 5568
+DDP_PORT = 4048
+# Largest UDP payload, so any packet fits the receive buffer
+MAX_PACKET_BYTES = 65507
+# Kernel buffer for the packets of a few frames arriving in one burst
+SOCKET_BUFFER_BYTES = 1024 * 1024
+# How often serve_forever checks whether it has been closed
+SELECT_TIMEOUT_S = 0.5
+
+PIXELS_PER_UNIVERSE = 170
+CHANNELS_PER_PIXEL = 3
+
+# E1.31 packet layout, see ANSI E1.31-2018
+ACN_PACKET_IDENTIFIER = b"ASC-E1.17\x00\x00\x00"
+VECTOR_ROOT_E131_DATA = 0x00000004
+VECTOR_ROOT_E131_EXTENDED = 0x00000008
+VECTOR_E131_DATA_PACKET = 0x00000002
+VECTOR_E131_EXTENDED_SYNCHRONIZATION = 0x00000001
+VECTOR_DMP_SET_PROPERTY = 0x02
+DMX_START_CODE = 0x00
+OPTION_PREVIEW_DATA = 0x80
+OPTION_STREAM_TERMINATED = 0x40
+# Root layer up to the root vector
+E131_ROOT = struct.Struct("!HH12sHI")
+# Sync address, sequence, options and universe of a data packet
+E131_FRAMING = struct.Struct("!HBBH")
+E131_FRAMING_OFFSET = 109
+E131_FRAMING_VECTOR_OFFSET = 40
+# DMP vector, address and data type, first address, increment, value count and
+# start code
+E131_DMP = struct.Struct("!BBHHHB")
+E131_DMP_OFFSET = 117
+E131_DATA_OFFSET = 126
+# Whole data packet header and whole sync packet
+E131_DATA_HEADER = struct.Struct("!HH12sHI16sHI64sBHBBHHBBHHHB")
+E131_SYNC_PACKET = struct.Struct("!HH12sHI16sHIBHH")
+E131_SYNC_OFFSET = 44
+E131_SYNC = struct.Struct("!BH")
+# A packet up to this many sequence numbers behind the last one is out of order
+E131_REORDER_WINDOW = 20
+E131_CID = bytes(range(16))
+
+# DDP packet layout, see http://www.3waylabs.com/ddp/
+DDP_HEADER = struct.Struct("!BBBBIH")
+DDP_TIMECODE_BYTES = 4
+DDP_VERSION_1 = 0x40
+DDP_VERSION_MASK = 0xC0
+DDP_FLAG_TIMECODE = 0x10
+DDP_FLAG_REPLY = 0x04
+DDP_FLAG_QUERY = 0x02
+DDP_FLAG_PUSH = 0x01
+DDP_TYPE_RGB8 = 0x0B
+DDP_ID_DISPLAY = 1
+DDP_ID_ALL = 255
+# Sequence numbers run from 1 to 15, 0 means the sender doesn't number packets
+DDP_SEQUENCES = 15
+# A packet this many sequence numbers or less behind the last one is out of order
+DDP_REORDER_WINDOW = 4
+# Most pixel bytes DDP senders put in one packet, a multiple of 3 that fits the MTU
+DDP_MAX_DATA_BYTES = 1440
+
+
+def e131_packets(
+    frame: np.ndarray,
+    sequence: int,
+    start_universe: int = 1,
+    sync_address: int = 0,
+    options: int = 0,
+) -> List[bytes]:
+    """Encodes a frame of packed colors into one E1.31 data packet per universe, for
+        sequencers and tests
+
+    Args:
+        frame (np.ndarray): Packed colors, one for every pixel
+        sequence (int): Sequence number of the packets, from 0-255
+        start_universe (int, optional): Universe of the first pixels. Defaults to 1.
+        sync_address (int, optional): Universe the sync packet for the frame will be
+            sent on, 0 if there isn't one. Defaults to 0.
+        options (int, optional): OPTION_ flags of the packets. Defaults to 0.
+
+    Returns:
+        List[bytes]: The packets to send, in universe order
+    """
+    rgb = FrameRenderer.unpack_rgb(frame).tobytes()
+    universe_bytes = PIXELS_PER_UNIVERSE * CHANNELS_PER_PIXEL
+    packets = []
+    for index, start in enumerate(range(0, len(rgb), universe_bytes)):
+        data = rgb[start:start + universe_bytes]
+        length = E131_DATA_HEADER.size + len(data)
+        header = E131_DATA_HEADER.pack(
+            0x0010,
+            0x0000,
+            ACN_PACKET_IDENTIFIER,
+            0x7000 | (length - 16),
+            VECTOR_ROOT_E131_DATA,
+            E131_CID,
+            0x7000 | (length - 38),
+            VECTOR_E131_DATA_PACKET,
+            b"raspberry-xmas-tree",
+            100,
+            sync_address,
+            sequence & 0xFF,
+            options,
+            start_universe + index,
+            0x7000 | (length - 115),
+            VECTOR_DMP_SET_PROPERTY,
+            0xA1,
+            0,
+            1,
+            len(data) + 1,
+            DMX_START_CODE,
+        )
+        packets.append(header + data)
+    return packets
+
+
+def e131_sync_packet(sequence: int, sync_address: int) -> bytes:
+    """Encodes an E1.31 universe synchronization packet
+
+    Args:
+        sequence (int): Sequence number of the packet, from 0-255
+        sync_address (int): Universe the sync is sent on
+
+    Returns:
+        bytes: The packet to send
+    """
+    return E131_SYNC_PACKET.pack(
+        0x0010,
+        0x0000,
+        ACN_PACKET_IDENTIFIER,
+        0x7000 | (E131_SYNC_PACKET.size - 16),
+        VECTOR_ROOT_E131_EXTENDED,
+        E131_CID,
+        0x7000 | (E131_SYNC_PACKET.size - 38),
+        VECTOR_E131_EXTENDED_SYNCHRONIZATION,
+        sequence & 0xFF,
+        sync_address,
+        0,
+    )
+
+
+def ddp_packets(
+    frame: np.ndarray,
+    sequence: int,
+    max_data_bytes: int = DDP_MAX_DATA_BYTES,
+    number_packets: bool = True,
+) -> List[bytes]:
+    """Encodes a frame of packed colors into DDP packets, the last one pushed, for
+        sequencers and tests
+
+    Args:
+        frame (np.ndarray): Packed colors, one for every pixel
+        sequence (int): Sequence number of the first packet, from 1-15. Each packet
+            after it takes the next one.
+        max_data_bytes (int, optional): Most pixel bytes in a packet. Defaults to
+            DDP_MAX_DATA_BYTES.
+        number_packets (bool, optional): Whether each packet takes the next sequence
+            number, otherwise they all get the frame's. Defaults to True.
+
+    Returns:
+        List[bytes]: The packets to send, in order
+    """
+    rgb = FrameRenderer.unpack_rgb(frame).tobytes()
+    starts = range(0, len(rgb), max_data_bytes)
+    packets = []
+    for number, start in enumerate(starts):
+        data = rgb[start:start + max_data_bytes]
+        flags = DDP_VERSION_1 | (DDP_FLAG_PUSH if number == len(starts) - 1 else 0)
+        step = number if number_packets else 0
+        packet_sequence = (sequence - 1 + step) % DDP_SEQUENCES + 1
+        header = DDP_HEADER.pack(
+            flags, packet_sequence, DDP_TYPE_RGB8, DDP_ID_DISPLAY, start, len(data)
+        )
+        packets.append(header + data)
+    return packets
+
+
+class PixelReceiver:
+    def __init__(
+        self,
+        frame_buffer: SharedFrameBuffer,
+        host: str = "",
+        e131_port: int = E131_PORT,
+        ddp_port: int = DDP_PORT,
+        start_universe: int = 1,
+        multicast: bool = True,
+    ) -> None:
+        """Listens for E1.31 and DDP packets and publishes the frames they carry
+
+        Args:
+            frame_buffer (SharedFrameBuffer): Frame buffer the display shows
+            host (str, optional): Address to listen on. Defaults to every address.
+            e131_port (int, optional): UDP port for E1.31, 0 to pick a free one.
+                Defaults to E131_PORT.
+            ddp_port (int, optional): UDP port for DDP, 0 to pick a free one.
+                Defaults to DDP_PORT.
+            start_universe (int, optional): E1.31 universe of the first pixels.
+                Defaults to 1.
+            multicast (bool, optional): Whether to join the E1.31 multicast group of
+                every universe as well as taking unicast. Defaults to True.
+        """
+        led_count = frame_buffer.led_count
+        self.frame_buffer = frame_buffer
+        self.start_universe = start_universe
+        self.universe_count = -(-led_count // PIXELS_PER_UNIVERSE)
+
+        # Everything a packet is read into or copied to is allocated once up front
+        self.packet = bytearray(MAX_PACKET_BYTES)
+        self.view = memoryview(self.packet)
+        self.rgb = np.zeros((led_count, CHANNELS_PER_PIXEL), dtype=np.uint8)
+        self.rgb_bytes = memoryview(self.rgb.reshape(-1))
+
+        # E1.31 frame assembly, one bit per universe of the string
+        self.complete = (1 << self.universe_count) - 1
+        self.received = 0
+        self.sync_address = 0
+        self.universe_sequences = [None] * self.universe_count
+        # DDP sequence and byte offset of the last packet taken, 0 for none
+        self.ddp_sequence = 0
+        self.ddp_offset = 0
+
+        self.e131_socket = self.__open(host, e131_port)
+        self.ddp_socket = self.__open(host, ddp_port)
+        if multicast:
+            self.__join_universes()
+        self.handlers: Dict[socket.socket, Callable[[int], None]] = {
+            self.e131_socket: self.handle_e131,
+            self.ddp_socket: self.handle_ddp,
+        }
+        self.closed = False
+        self.serving = False
+
+    @property
+    def e131_address(self):
+        return self.e131_socket.getsockname()
+
+    @property
+    def ddp_address(self):
+        return self.ddp_socket.getsockname()
+
+    def serve_forever(self):
+        """Handles packets as they arrive until closed"""
+        self.serving = True
+        try:
+            with selectors.DefaultSelector() as selector:
+                for sock in self.handlers:
+                    selector.register(sock, selectors.EVENT_READ)
+                while not self.closed:
+                    for key, _ in selector.select(SELECT_TIMEOUT_S):
+                        self.drain(key.fileobj)
+        finally:
+            self.serving = False
+            self.__close_sockets()
+
+    def drain(self, sock: socket.socket):
+        """Handles every packet waiting on a socket, so a burst costs one select
+
+        Args:
+            sock (socket.socket): One of the receiver's sockets
+        """
+        handle = self.handlers[sock]
+        while True:
+            try:
+                size = sock.recv_into(self.packet)
+            except BlockingIOError:
+                return
+            handle(size)
+
+    def close(self):
+        """Stops serve_forever within SELECT_TIMEOUT_S, which closes the sockets"""
+        self.closed = True
+        if not self.serving:
+            self.__close_sockets()
+
+    def handle_e131(self, size: int):
+        """Copies the pixels of the E1.31 packet in the receive buffer into the frame
+
+        Args:
+            size (int): Bytes in the packet
+        """
+        view = self.view
+        if size < E131_SYNC_PACKET.size:
+            return
+        _, _, identifier, _, root_vector = E131_ROOT.unpack_from(view)
+        if identifier != ACN_PACKET_IDENTIFIER:
+            return
+
+        if root_vector == VECTOR_ROOT_E131_EXTENDED:
+            self.__handle_e131_extended()
+            return
+
+        if root_vector != VECTOR_ROOT_E131_DATA or size < E131_DATA_OFFSET:
+            return
+        sync_address, sequence, options, universe = E131_FRAMING.unpack_from(
+            view, E131_FRAMING_OFFSET
+        )
+        vector, _, _, _, value_count, start_code = E131_DMP.unpack_from(
+            view, E131_DMP_OFFSET
+        )
+        index = universe - self.start_universe
+        if (
+            vector != VECTOR_DMP_SET_PROPERTY
+            or start_code != DMX_START_CODE
+            or options & OPTION_PREVIEW_DATA
+            or not 0 <= index < self.universe_count
+        ):
+            return
+        RECEIVER_PACKETS.inc(1, PROTOCOL_E131)
+
+        if options & OPTION_STREAM_TERMINATED:
+            # The next stream starts its sequence numbers over
+            self.universe_sequences[index] = None
+            return
+        if not self.__take_e131_sequence(index, sequence):
+            RECEIVER_PACKETS_DISCARDED.inc(1, PROTOCOL_E131)
+            return
+
+        bit = 1 << index
+        self.sync_address = sync_address
+        if self.received & bit and not sync_address:
+            # The next frame started before this one finished, show what arrived
+            self.__publish(PROTOCOL_E131)
+
+        self.__copy_e131_universe(index, min(value_count - 1, size - E131_DATA_OFFSET))
+        self.received |= bit
+
+        if self.received == self.complete and not sync_address:
+            self.__publish(PROTOCOL_E131)
+
+    def handle_ddp(self, size: int):
+        """Copies the pixels of the DDP packet in the receive buffer into the frame
+
+        Args:
+            size (int): Bytes in the packet
+        """
+        view = self.view
+        if size < DDP_HEADER.size:
+            return
+        flags, sequence, _, destination, offset, length = DDP_HEADER.unpack_from(view)
+        if (
+            flags & DDP_VERSION_MASK != DDP_VERSION_1
+            or flags & (DDP_FLAG_QUERY | DDP_FLAG_REPLY)
+            or destination not in (DDP_ID_DISPLAY, DDP_ID_ALL)
+        ):
+            return
+        RECEIVER_PACKETS.inc(1, PROTOCOL_DDP)
+
+        sequence &= 0x0F
+        if sequence:
+            behind = (self.ddp_sequence - sequence) % DDP_SEQUENCES
+            # The same sequence number again is the rest of the frame if it carries
+            # pixels further along, otherwise it was sent twice
+            if (
+                self.ddp_sequence
+                and behind <= DDP_REORDER_WINDOW
+                and (behind or offset <= self.ddp_offset)
+            ):
+                RECEIVER_PACKETS_DISCARDED.inc(1, PROTOCOL_DDP)
+                return
+            self.ddp_sequence = sequence
+            self.ddp_offset = offset
+
+        # Pixels are assumed to be 8 bit RGB whatever the data type says
+        header_bytes = DDP_HEADER.size
+        if flags & DDP_FLAG_TIMECODE:
+            header_bytes += DDP_TIMECODE_BYTES
+        count = min(length, size - header_bytes, len(self.rgb_bytes) - offset)
+        if count > 0:
+            self.rgb_bytes[offset:offset + count] = view[
+                header_bytes:header_bytes + count
+            ]
+
+        if flags & DDP_FLAG_PUSH:
+            self.__publish(PROTOCOL_DDP)
+
+    def __handle_e131_extended(self):
+        # Only universe synchronization is used out of the extended packets
+        (vector,) = struct.unpack_from("!I", self.view, E131_FRAMING_VECTOR_OFFSET)
+        if vector != VECTOR_E131_EXTENDED_SYNCHRONIZATION:
+            return
+        RECEIVER_PACKETS.inc(1, PROTOCOL_E131)
+        _, sync_address = E131_SYNC.unpack_from(self.view, E131_SYNC_OFFSET)
+        if sync_address == self.sync_address and self.received:
+            self.__publish(PROTOCOL_E131)
+
+    def __take_e131_sequence(self, index: int, sequence: int) -> bool:
+        # Packets a little behind the last one of their universe are late or repeated
+        last = self.universe_sequences[index]
+        if last is not None:
+            behind = ((last - sequence + 128) & 0xFF) - 128
+            if 0 <= behind < E131_REORDER_WINDOW:
+                return False
+        self.universe_sequences[index] = sequence
+        return True
+
+    def __copy_e131_universe(self, index: int, count: int):
+        offset = index * PIXELS_PER_UNIVERSE * CHANNELS_PER_PIXEL
+        # Never past the universe or the end of the string
+        count = min(
+            count,
+            PIXELS_PER_UNIVERSE * CHANNELS_PER_PIXEL,
+            len(self.rgb_bytes) - offset,
+        )
+        if count > 0:
+            self.rgb_bytes[offset:offset + count] = self.view[
+                E131_DATA_OFFSET:E131_DATA_OFFSET + count
+            ]
+
+    def __publish(self, protocol: str):
+        # Packed in place into the back buffer, the frame buffer is ours while receiving
+        back = self.frame_buffer.back
+        np.copyto(back, self.rgb[:, 0])
+        back <<= 8
+        back |= self.rgb[:, 1]
+        back <<= 8
+        back |= self.rgb[:, 2]
+        self.frame_buffer.publish()
+        self.received = 0
+        RECEIVER_FRAMES.inc(1, protocol)
+
+    def __close_sockets(self):
+        for sock in self.handlers:
+            sock.close()
+
+    @staticmethod
+    def __open(host: str, port: int) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+        sock.bind((host, port))
+        sock.setblocking(False)
+        return sock
+
+    def __join_universes(self):
+        # Every universe has its own group, 239.255 then the universe number
+        for universe in range(
+            self.start_universe, self.start_universe + self.universe_count
+        ):
+            group = socket.inet_aton(f"239.255.{universe >> 8}.{universe & 0xFF}")
+            try:
+                self.e131_socket.setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_ADD_MEMBERSHIP,
+                    group + socket.inet_aton("0.0.0.0"),
+                )
+            except OSError as error:
+                log.warning(f"Couldn't join E1.31 multicast, unicast only : {error}")
+                return
@@ -0,0 +1,102 @@
+"""Track position of the song playing, shared with every visualizer process.
+
+The position is kept as the progress at an anchor time on the monotonic clock, so
+ NTP stepping the wall clock never moves the beat. The anchor, progress, lag offset
+ and pause state live in shared memory, so syncing the clock from the server process
+ moves every running visualizer on its next frame without restarting anything.
+"""
+from multiprocessing import Array
+from typing import Callable, Optional, Tuple
+import time
+
+# Slots of the shared values
+ANCHOR_S = 0
+PROGRESS_S = 1
+LAG_S = 2
+PAUSED = 3
+
+
+class PlaybackClock:
+    def __init__(
+        self,
+        progress_ms: float = 0,
+        lag_time_ms: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Starts the clock playing from progress_ms
+
+        Args:
+            progress_ms (float, optional): Track position in milliseconds. Defaults
+                to 0.
+            lag_time_ms (float, optional): Added to the position to make up for
+                output lag. Defaults to 0.
+            clock (Callable[[], float], optional): Monotonic time in seconds.
+                Defaults to time.monotonic.
+        """
+        self.clock = clock
+        self._values = Array("d", 4)
+        self._values[ANCHOR_S] = clock()
+        self._values[PROGRESS_S] = progress_ms / 1000
+        self._values[LAG_S] = lag_time_ms / 1000
+
+    @property
+    def paused(self) -> bool:
+        return bool(self._values[PAUSED])
+
+    def progress_seconds(self) -> float:
+        """Gets the current track position
+
+        Returns:
+            float: Track position in seconds, lag included
+        """
+        with self._values.get_lock():
+            anchor_s, progress_s, lag_s, paused = self._values[:]
+
+        if not paused:
+            progress_s += self.clock() - anchor_s
+        return progress_s + lag_s
+
+    def position(self) -> Tuple[float, float, bool]:
+        """Gets the track position without the lag offset, for handing to another
+            device with its own lag
+
+        Returns:
+            Tuple[float, float, bool]: Clock time it was read at in seconds, track
+                position in seconds and whether playback is paused
+        """
+        with self._values.get_lock():
+            anchor_s, progress_s, _, paused = self._values[:]
+            now = self.clock()
+
+        if not paused:
+            progress_s += now - anchor_s
+        return now, progress_s, bool(paused)
+
+    def sync(
+        self,
+        progress_ms: Optional[float] = None,
+        lag_time_ms: Optional[float] = None,
+        paused: Optional[bool] = None,
+    ):
+        """Updates the clock in place, anything not given is left as it is
+
+        Args:
+            progress_ms (Optional[float]): Track position in milliseconds right now
+            lag_time_ms (Optional[float]): New lag offset in milliseconds
+            paused (Optional[bool]): Whether playback is paused
+        """
+        with self._values.get_lock():
+            now = self.clock()
+            if paused is not None and bool(paused) != bool(self._values[PAUSED]):
+                if paused:
+                    # Keeps the position reached so far
+                    self._values[PROGRESS_S] += now - self._values[ANCHOR_S]
+                self._values[ANCHOR_S] = now
+                self._values[PAUSED] = float(bool(paused))
+
+            if progress_ms is not None:
+                self._values[PROGRESS_S] = progress_ms / 1000
+                self._values[ANCHOR_S] = now
+
+            if lag_time_ms is not None:
+                self._values[LAG_S] = lag_time_ms / 1000
@@ -0,0 +1,78 @@
+"""Cursor that follows playback through the audio analysis.
+
+Between two lookups playback only moves forward by a few milliseconds, so the active
+ item of every category is almost always the one found last time or the one after
+ it. The cursor remembers where it was in each category and steps forward from
+ there, which is constant time per lookup on average. Seeking, going backwards or
+ jumping further than a few items falls back to a binary search.
+"""
+from typing import Dict, Optional
+
+from classes.AnalysisColumns import NO_ITEM, AnalysisColumns
+
+# Items to step through before giving up and binary searching instead
+MAX_FORWARD_STEPS = 4
+
+
+class PlaybackCursor:
+    def __init__(self, categories: Dict[str, AnalysisColumns], track_duration: float):
+        """Follows playback through every category of an audio analysis
+
+        Args:
+            categories (Dict[str, AnalysisColumns]): Analysis columns by category name
+            track_duration (float): Length of the track in seconds
+        """
+        self.categories = categories
+        self.track_duration = track_duration
+        self.positions = dict.fromkeys(categories, 0)
+        self.last_time_seconds = float("-inf")
+        self.steps = 0
+        self.seeks = 0
+
+    def active_indices(self, track_time_seconds: float) -> Optional[Dict[str, int]]:
+        """Gets the index of the active item in every category
+
+        Args:
+            track_time_seconds (float): Point in track to check
+
+        Returns:
+            Optional[Dict[str, int]]: Index of the active item by category, NO_ITEM
+                where nothing is active. None once the track is over.
+        """
+        if track_time_seconds > self.track_duration:
+            return None
+
+        backwards = track_time_seconds < self.last_time_seconds
+        self.last_time_seconds = track_time_seconds
+
+        active = {}
+        for name, columns in self.categories.items():
+            position = (
+                self.__seek(columns, track_time_seconds)
+                if backwards
+                else self.__advance(columns, self.positions[name], track_time_seconds)
+            )
+            self.positions[name] = position
+            active[name] = (
+                position
+                if position < len(columns) and columns.start[position] <= track_time_seconds
+                else NO_ITEM
+            )
+
+        return active
+
+    def __advance(
+        self, columns: AnalysisColumns, position: int, track_time_seconds: float
+    ) -> int:
+        end = columns.end
+        for _ in range(MAX_FORWARD_STEPS):
+            if position >= len(end) or end[position] >= track_time_seconds:
+                self.steps += 1
+                return position
+            position += 1
+
+        return self.__seek(columns, track_time_seconds)
+
+    def __seek(self, columns: AnalysisColumns, track_time_seconds: float) -> int:
+        self.seeks += 1
+        return int(columns.end.searchsorted(track_time_seconds))
@@ -0,0 +1,207 @@
+"""Long lived process that owns the light string and runs lighting commands.
+
+The server used to terminate the lighting process and fork a new one for every
+ change, which took hundreds of milliseconds and could cut a frame off half way
+ through being written. The worker is started once and fed commands through a queue
+ instead. Sending a command sets an interrupt event the light string checks between
+ frames, so whatever is running stops at the next frame boundary and the new command
+ starts a few milliseconds later.
+
+Commands name a LightString method rather than passing the function itself, since
+ the worker has its own copy of the light string. Commands that pile up while the
+ worker is busy are coalesced so only the newest one for each target runs, and the
+ worker applies at most one command per frame the strip can show.
+"""
+from multiprocessing import Array, Event, Process, Queue, Value
+from typing import Hashable, Optional
+import queue
+import time
+
+from classes.CommandCoalescer import CommandCoalescer
+from classes.Metrics import PATTERN_SWITCH_SECONDS
+from classes.Tracer import RING_RENDER_WORKER, TRACER
+from config import log
+
+# Kinds of command
+RUN_ONCE = "once"
+RUN_LOOPING = "looping"
+STOP = "stop"
+SHUTDOWN = "shutdown"
+
+# Every command draws on the whole strip unless sent for another target
+STRIP_TARGET = "strip"
+CONTROL_TARGET = "control"
+
+# Slots of the shared command counters
+APPLIED = 0
+MERGED = 1
+DROPPED = 2
+
+
+class RenderWorker:
+    def __init__(self, light_string) -> None:
+        """Starts the worker process
+
+        Args:
+            light_string (LightString): Light string the worker runs commands on
+        """
+        self.light_string = light_string
+        self.commands = Queue()
+        self.interrupt = Event()
+        # Id of the last command sent and of the last one the worker finished
+        self.sent = Value("q", 0)
+        self.finished = Value("q", 0)
+        self.counters = Array("q", 3)
+
+        self.process = Process(target=self.__run, daemon=True)
+        self.process.start()
+
+    def run_once(self, method: str, target: Hashable = STRIP_TARGET, **kwargs) -> int:
+        """Runs a LightString method once, then leaves the lights as they are
+
+        Args:
+            method (str): Name of the LightString method
+            target (Hashable, optional): What the command draws on. A newer command
+                for the same target replaces this one if it hasn't run yet. Defaults
+                to STRIP_TARGET.
+            kwargs: Keyword arguments for the method
+
+        Returns:
+            int: Id of the command
+        """
+        return self.__send(RUN_ONCE, method, kwargs, target)
+
+    def run_looping(
+        self, method: str, target: Hashable = STRIP_TARGET, **kwargs
+    ) -> int:
+        """Runs a LightString method over and over until another command is sent
+
+        Args:
+            method (str): Name of the LightString method
+            target (Hashable, optional): What the command draws on. Defaults to
+                STRIP_TARGET.
+            kwargs: Keyword arguments for the method
+
+        Returns:
+            int: Id of the command
+        """
+        return self.__send(RUN_LOOPING, method, kwargs, target)
+
+    def stop(self, timeout: Optional[float] = 1.0) -> bool:
+        """Stops whatever is running at the next frame and waits for the worker to let
+            go of the strip, so something else can draw on it
+
+        Args:
+            timeout (Optional[float]): Most seconds to wait. Defaults to 1.0.
+
+        Returns:
+            bool: True if the worker stopped in time
+        """
+        return self.wait(self.__send(STOP), timeout)
+
+    def wait(self, command_id: int, timeout: Optional[float] = None) -> bool:
+        """Waits until the worker has finished a command or moved past it
+
+        Args:
+            command_id (int): Id returned when the command was sent
+            timeout (Optional[float]): Most seconds to wait, waits forever if not given
+
+        Returns:
+            bool: True if the command finished in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.finished.value < command_id:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stats(self) -> dict:
+        """Counts of commands sent, applied, merged into a newer command for the same
+            target before they ran and dropped because too many targets were waiting
+
+        Returns:
+            dict: The counts
+        """
+        return {
+            "sent": self.sent.value,
+            "applied": self.counters[APPLIED],
+            "merged": self.counters[MERGED],
+            "dropped": self.counters[DROPPED],
+        }
+
+    def close(self):
+        """Shuts the worker down"""
+        self.__send(SHUTDOWN, target=CONTROL_TARGET)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def __send(
+        self,
+        kind: str,
+        method: str = None,
+        kwargs: dict = None,
+        target: Hashable = STRIP_TARGET,
+    ) -> int:
+        with self.sent.get_lock():
+            self.sent.value += 1
+            command_id = self.sent.value
+            self.commands.put(
+                (target, (command_id, kind, method, kwargs or {}, time.monotonic()))
+            )
+        self.interrupt.set()
+        return command_id
+
+    def __run(self):
+        TRACER.use_ring(RING_RENDER_WORKER)
+        self.light_string.set_interrupt(self.interrupt)
+        min_frame_s = self.light_string.timing.clamp_interval(0)
+        coalescer = CommandCoalescer()
+        received = 0
+        last_applied = float("-inf")
+
+        while True:
+            # Collects everything sent so far, blocking only when there's nothing to do
+            while received < self.sent.value or not coalescer:
+                try:
+                    target, command = self.commands.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                received = command[0]
+                coalescer.submit(target, command)
+
+            # At most one command per frame, anything sent meanwhile gets merged
+            remaining = last_applied + min_frame_s - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+                continue
+
+            _, (command_id, kind, method, kwargs, sent_at) = coalescer.take()
+            self.counters[MERGED] = coalescer.merged
+            self.counters[DROPPED] = coalescer.dropped
+            self.interrupt.clear()
+            # Anything newer cuts this command short as soon as it starts drawing
+            if coalescer or command_id < self.sent.value:
+                self.interrupt.set()
+
+            if kind == SHUTDOWN:
+                self.finished.value = command_id
+                return
+
+            if kind in (RUN_ONCE, RUN_LOOPING):
+                PATTERN_SWITCH_SECONDS.observe(time.monotonic() - sent_at)
+                self.__call(method, kwargs, looping=kind == RUN_LOOPING)
+                self.counters[APPLIED] += 1
+                last_applied = time.monotonic()
+
+            self.finished.value = command_id
+
+    def __call(self, method: str, kwargs: dict, looping: bool):
+        try:
+            target = getattr(self.light_string, method)
+            target(**kwargs)
+            while looping and not self.light_string.interrupted():
+                target(**kwargs)
+        except Exception:
+            log.exception(f"Render command {method} failed")
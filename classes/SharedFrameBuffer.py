@@ -0,0 +1,163 @@
+"""Double buffered frame shared between processes without any per pixel locking.
+
+Writers draw into the back buffer through a numpy view and publish it. Publishing
+ copies the back buffer over the front buffer inside a sequence lock: the sequence
+ counter is odd while the front buffer is being written and even once it is
+ consistent. Readers copy the front buffer in one go and retry if the sequence moved
+ while they were copying, so they always get a whole frame and never block writers.
+
+The sequence counter doubles as a generation count for change detection. Every
+ publish also sets an event, so a reader with nothing new to show can sleep on it
+ instead of polling.
+"""
+from multiprocessing import Event, Lock, shared_memory
+from typing import Optional
+import os
+import weakref
+
+import numpy as np
+
+SEQUENCE = 0
+REFRESHES = 1
+SKIPPED_REFRESHES = 2
+HEADER_SLOTS = 4
+
+
+class SharedFrameBuffer:
+    def __init__(self, led_count: int) -> None:
+        """Creates a frame buffer in shared memory. Processes forked after this share
+            it through the same object.
+
+        Args:
+            led_count (int): Number of pixels in a frame
+        """
+        self.led_count = led_count
+        header_bytes = HEADER_SLOTS * 4
+        frame_bytes = led_count * 4
+
+        shm = shared_memory.SharedMemory(
+            create=True, size=header_bytes + 2 * frame_bytes
+        )
+        # Views are stored before the memory itself so they are released first
+        self._header = np.ndarray(HEADER_SLOTS, np.uint32, shm.buf, 0)
+        self._front = np.ndarray(led_count, np.uint32, shm.buf, header_bytes)
+        self.back = np.ndarray(
+            led_count, np.uint32, shm.buf, header_bytes + frame_bytes
+        )
+        self._shm = shm
+        self._header[:] = 0
+        self._front[:] = 0
+        self.back[:] = 0
+        self._publish_lock = Lock()
+        self._changed = Event()
+        # Sequence of the last frame this process read
+        self.read_sequence = None
+
+        # Only the process that created the memory removes it
+        self._finalizer = weakref.finalize(
+            self, _unlink_if_owner, self._shm, os.getpid()
+        )
+
+    @property
+    def sequence(self) -> int:
+        """Goes up by two every time a frame is published"""
+        return int(self._header[SEQUENCE])
+
+    @property
+    def refreshes(self) -> int:
+        """Frames the reader has reported showing"""
+        return int(self._header[REFRESHES])
+
+    @property
+    def skipped_refreshes(self) -> int:
+        """Refreshes the reader has reported skipping because nothing changed"""
+        return int(self._header[SKIPPED_REFRESHES])
+
+    def publish(self):
+        """Makes whatever is in the back buffer the current frame"""
+        with self._publish_lock:
+            self._header[SEQUENCE] += 1
+            self._front[:] = self.back
+            self._header[SEQUENCE] += 1
+        self._changed.set()
+
+    def publish_frame(self, frame: np.ndarray):
+        """Replaces the whole back buffer with frame and publishes it
+
+        Args:
+            frame (np.ndarray): Packed uint32 colors, one for every pixel
+        """
+        with self._publish_lock:
+            self.back[:] = frame
+            self._header[SEQUENCE] += 1
+            self._front[:] = self.back
+            self._header[SEQUENCE] += 1
+        self._changed.set()
+
+    def read(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Copies the current frame out in one consistent piece
+
+        Args:
+            out (Optional[np.ndarray]): Array to copy the frame into. A new one is made
+                if not given.
+
+        Returns:
+            np.ndarray: The current frame
+        """
+        if out is None:
+            out = np.empty(self.led_count, dtype=np.uint32)
+
+        while True:
+            sequence = self._header[SEQUENCE]
+            if sequence & 1:
+                continue
+            out[:] = self._front
+            if self._header[SEQUENCE] == sequence:
+                self.read_sequence = int(sequence)
+                return out
+
+    def has_changed(self) -> bool:
+        """Whether a frame was published since this process last read one"""
+        return self.sequence != self.read_sequence
+
+    def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """Sleeps until a frame newer than the last one read is published
+
+        Args:
+            timeout (Optional[float]): Most seconds to wait. Waits forever if not given.
+
+        Returns:
+            bool: True if there is a new frame to read
+        """
+        self._changed.clear()
+        # Checked after clearing so a publish in between can't be missed
+        if self.has_changed():
+            return True
+        self._changed.wait(timeout)
+        return self.has_changed()
+
+    def count_refreshes(self, shown: int = 0, skipped: int = 0):
+        """Adds to the refresh counters, meant to be called by the single reader
+
+        Args:
+            shown (int, optional): Refreshes that showed a frame. Defaults to 0.
+            skipped (int, optional): Refreshes skipped because nothing changed.
+                Defaults to 0.
+        """
+        self._header[REFRESHES] += shown
+        self._header[SKIPPED_REFRESHES] += skipped
+
+    def clear(self):
+        """Publishes an all black frame"""
+        self.publish_frame(np.zeros(self.led_count, dtype=np.uint32))
+
+    def unlink(self):
+        """Removes the shared memory from the system once every process is done with
+        it. Happens on its own when the buffer is garbage collected.
+        """
+        self._finalizer()
+
+
+def _unlink_if_owner(shm: shared_memory.SharedMemory, owner_pid: int):
+    if os.getpid() == owner_pid:
+        shm.unlink()
@@ -0,0 +1,150 @@
+"""In memory stand in for a WS281x strip so rendering can run, be profiled and be
+    benchmarked on any Linux box.
+
+Every frame shown is recorded into a preallocated ring of frames. The recording lives
+ in a shared memory map, either anonymous or backed by a file, so frames shown from
+ a forked process like the DynamicDisplay refresh loop can be read back by the parent.
+ Showing a frame waits for the previous one to finish going down the wire, the same
+ way the real driver waits on its DMA transfer.
+"""
+from typing import Optional
+import mmap
+import time
+
+import numpy as np
+
+from classes.FrameScheduler import StripTiming
+from classes.StripBackend import StripBackend
+
+# Header slots stored in front of the recorded frames
+FRAMES_SHOWN = 0
+WIRE_BUSY_UNTIL_NS = 1
+HEADER_SLOTS = 4
+
+
+class SimulatedStrip(StripBackend):
+    def __init__(
+        self,
+        led_count: int,
+        strip_type: Optional[int] = None,
+        max_frames: int = 1024,
+        record_path: Optional[str] = None,
+        timing: Optional[StripTiming] = None,
+        emulate_wire_time: bool = True,
+    ) -> None:
+        """Simulated strip that records every frame shown
+
+        Args:
+            led_count (int): Number of pixels on the strip
+            strip_type (Optional[int]): Color order of the strip, only kept for
+                reference as frames are recorded in RGB. Defaults to None.
+            max_frames (int, optional): How many of the most recent frames to keep.
+                Defaults to 1024.
+            record_path (Optional[str]): File to memory map the recording to. Keeps
+                the recording in anonymous shared memory if not given.
+            timing (Optional[StripTiming]): Wire timing to emulate. Defaults to the
+                WS281x timing for led_count.
+            emulate_wire_time (bool, optional): Whether show waits for the previous
+                frame to finish sending. Defaults to True.
+        """
+        self.led_count = led_count
+        self.strip_type = strip_type
+        self.max_frames = max_frames
+        self.record_path = record_path
+        self.timing = timing or StripTiming(led_count)
+        self.emulate_wire_time = emulate_wire_time
+        self.brightness = 255
+
+        # The strip buffer itself is private to each process, just like the driver's
+        self.leds = np.zeros(led_count, dtype=np.uint32)
+
+        header_bytes = HEADER_SLOTS * 8
+        timestamp_bytes = max_frames * 8
+        frame_bytes = max_frames * led_count * 4
+        size = header_bytes + timestamp_bytes + frame_bytes
+
+        if record_path:
+            with open(record_path, "w+b") as record_file:
+                record_file.truncate(size)
+                self._map = mmap.mmap(record_file.fileno(), size)
+        else:
+            self._map = mmap.mmap(-1, size)
+
+        self._header = np.frombuffer(self._map, np.int64, HEADER_SLOTS, 0)
+        self._timestamps = np.frombuffer(
+            self._map, np.int64, max_frames, header_bytes
+        )
+        self._frames = np.frombuffer(
+            self._map, np.uint32, max_frames * led_count, header_bytes + timestamp_bytes
+        ).reshape(max_frames, led_count)
+
+    def begin(self):
+        pass
+
+    def write_frame(self, frame: np.ndarray):
+        count = min(len(frame), self.led_count)
+        self.leds[:count] = frame[:count]
+
+    def show(self):
+        """Waits for the wire to be free then records the strip buffer as sent"""
+        now = time.monotonic_ns()
+        busy_until = int(self._header[WIRE_BUSY_UNTIL_NS])
+        if self.emulate_wire_time and busy_until > now:
+            time.sleep((busy_until - now) / 1e9)
+            now = time.monotonic_ns()
+
+        slot = int(self._header[FRAMES_SHOWN]) % self.max_frames
+        self._frames[slot] = self.leds
+        self._timestamps[slot] = now
+        self._header[WIRE_BUSY_UNTIL_NS] = now + int(self.timing.wire_time_s * 1e9)
+        self._header[FRAMES_SHOWN] += 1
+
+    def numPixels(self) -> int:
+        return self.led_count
+
+    def setPixelColor(self, n: int, color: int):
+        if 0 <= n < self.led_count:
+            self.leds[n] = color
+
+    def getPixelColor(self, n: int) -> int:
+        return int(self.leds[n])
+
+    def getPixels(self) -> np.ndarray:
+        return self.leds
+
+    def getBrightness(self) -> int:
+        return self.brightness
+
+    def setBrightness(self, brightness: int):
+        self.brightness = brightness
+
+    @property
+    def frames_shown(self) -> int:
+        """Total frames shown, including ones that have dropped out of the recording"""
+        return int(self._header[FRAMES_SHOWN])
+
+    def recorded_frames(self) -> np.ndarray:
+        """Copies the frames still in the recording out, oldest first
+
+        Returns:
+            np.ndarray: Array shaped (frames, led_count) of packed colors
+        """
+        return self._frames[self.__recorded_order()].copy()
+
+    def recorded_timestamps_ns(self) -> np.ndarray:
+        """Monotonic time each recorded frame was sent, oldest first
+
+        Returns:
+            np.ndarray: Timestamps in nanoseconds
+        """
+        return self._timestamps[self.__recorded_order()].copy()
+
+    def reset_recording(self):
+        """Forgets every recorded frame"""
+        self._header[FRAMES_SHOWN] = 0
+
+    def __recorded_order(self) -> np.ndarray:
+        shown = self.frames_shown
+        if shown <= self.max_frames:
+            return np.arange(shown)
+        return (np.arange(self.max_frames) + shown) % self.max_frames
@@ -1,153 +1,186 @@
-import time
-from typing import Dict
-
-
-class SpotifyAudioAnalysis:
-    def __init__(
-        self,
-        bars,
-        beats,
-        sections,
-        segments,
-        tatums,
-        track,
-        track_progress,
-        lag_time_ms=0,
-        **kwargs,
-    ):
-        self.bars = bars
-        self.beats = beats
-        self.sections = sections
-        self.segments = segments
-        self.tatums = tatums
-        self.track_duration = track["duration"]
-        self.track_progress_ms = track_progress + lag_time_ms
-        self.created_time = time.time()
-        self.confidence_average = {
-            "beats": self.__get_average_item_confidence("beats"),
-            "tatums": self.__get_average_item_confidence("tatums"),
-        }
-
-    def __get_average_item_confidence(self, item_name):
-        confidence = []
-        for item in self.__dict__[item_name]:
-            confidence.append(item["confidence"])
-
-        return sum(confidence) / len(self.__dict__[item_name])
-
-    def get_track_progress_seconds(self) -> float:
-        """Gets the current track progress in seconds
-
-        Returns:
-            float: The current track progress in seconds
-        """
-        current_time_seconds = time.time() - self.created_time
-        new_track_time = (self.track_progress_ms / 1000) + current_time_seconds
-
-        return new_track_time
-
-    def get_active_linear_search(
-        self, progress_seconds: int = None
-    ) -> Dict[str, dict]:
-        """Gets the current active items from spotify data using a linear search
-
-        Args:
-            progress_seconds (int, optional): What point in track to check whats active.
-                Only exists for consistency in testing. Defaults to None.
-
-        Returns:
-            dict: The current active items for the given progress in the song
-        """
-        track_time_seconds = (
-            self.get_track_progress_seconds()
-            if not progress_seconds
-            else progress_seconds
-        )
-
-        if track_time_seconds > self.track_duration:
-            return None
-
-        active = {
-            "bars": self.__linear_search_active(self.bars, track_time_seconds),
-            "beats": self.__linear_search_active(
-                self.beats, track_time_seconds
-            ),
-            "sections": self.__linear_search_active(
-                self.sections, track_time_seconds
-            ),
-            "segments": self.__linear_search_active(
-                self.segments, track_time_seconds
-            ),
-            "tatums": self.__linear_search_active(
-                self.tatums, track_time_seconds
-            ),
-        }
-
-        return active
-
-    def __linear_search_active(self, category, track_time_seconds):
-        for i, item in enumerate(category):
-            start = item["start"]
-            stop = start + item["duration"]
-
-            if start <= track_time_seconds <= stop:
-                return {"index": i, **item}
-
-    def get_active_binary_search(
-        self, progress_seconds: int = None
-    ) -> Dict[str, dict]:
-        """Gets the current active items from spotify data using a binary search
-
-        Args:
-            progress_seconds (int, optional): What point in track to check whats active.
-                Only exists for consistency in testing. Defaults to None.
-
-        Returns:
-            dict: The current active items for the given progress in the song
-        """
-        track_time_seconds = (
-            self.get_track_progress_seconds()
-            if not progress_seconds
-            else progress_seconds
-        )
-
-        if track_time_seconds > self.track_duration:
-            return None
-
-        active = {
-            "bars": self._binary_search_active(self.bars, track_time_seconds),
-            "beats": self._binary_search_active(self.beats, track_time_seconds),
-            "sections": self._binary_search_active(
-                self.sections, track_time_seconds
-            ),
-            "segments": self._binary_search_active(
-                self.segments, track_time_seconds
-            ),
-            "tatums": self._binary_search_active(
-                self.tatums, track_time_seconds
-            ),
-        }
-
-        return active
-
-    def _binary_search_active(self, data_arr, track_time_seconds):
-        low = 0
-        high = len(data_arr) - 1
-        mid = 0
-
-        while low <= high:
-            mid = (high + low) // 2
-            current = data_arr[mid]
-            start = current["start"]
-            end = start + current["duration"]
-
-            if end < track_time_seconds:
-                low = mid + 1
-
-            elif start > track_time_seconds:
-                high = mid - 1
-
-            else:
-                return {"index": mid, **data_arr[mid]}
-
-        return None
+"""Spotify audio analysis of the track that is playing, and what is active in it at any
+ point of the track.
+
+Every category of the analysis is converted into AnalysisColumns when it is loaded, so
+ lookups binary search numpy columns and the original lists of dicts can be freed.
+ Categories that are already AnalysisColumns, like ones loaded from the AnalysisCache,
+ are used as they are. Track progress comes from a PlaybackClock that can be synced
+ while visualizers are running.
+"""
+from typing import Dict
+
+import numpy as np
+
+from classes.AnalysisColumns import NO_ITEM, AnalysisColumns
+from classes.PlaybackClock import PlaybackClock
+from classes.PlaybackCursor import PlaybackCursor
+from classes.Tracer import SPAN_ANALYSIS_LOOKUP, TRACER
+
+CATEGORIES = ("bars", "beats", "sections", "segments", "tatums")
+
+
+class SpotifyAudioAnalysis:
+    def __init__(
+        self,
+        bars,
+        beats,
+        sections,
+        segments,
+        tatums,
+        track,
+        track_progress,
+        lag_time_ms=0,
+        **kwargs,
+    ):
+        self.bars = self.__as_columns(bars)
+        self.beats = self.__as_columns(beats)
+        self.sections = self.__as_columns(sections)
+        self.segments = self.__as_columns(segments)
+        self.tatums = self.__as_columns(tatums)
+        self.track_duration = track["duration"]
+        self.clock = PlaybackClock(track_progress, lag_time_ms)
+        self.confidence_average = {
+            "beats": self.__get_average_item_confidence("beats"),
+            "tatums": self.__get_average_item_confidence("tatums"),
+        }
+
+    @staticmethod
+    def __as_columns(items) -> AnalysisColumns:
+        if isinstance(items, AnalysisColumns):
+            return items
+        return AnalysisColumns.from_items(items)
+
+    @property
+    def columns(self) -> Dict[str, AnalysisColumns]:
+        """Columns of every category by name"""
+        return {category: self.__dict__[category] for category in CATEGORIES}
+
+    def __get_average_item_confidence(self, item_name):
+        return float(self.__dict__[item_name].confidence.mean())
+
+    def get_track_progress_seconds(self) -> float:
+        """Gets the current track progress in seconds
+
+        Returns:
+            float: The current track progress in seconds
+        """
+        return self.clock.progress_seconds()
+
+    def get_active_linear_search(
+        self, progress_seconds: int = None
+    ) -> Dict[str, dict]:
+        """Gets the current active items from spotify data using a linear search
+
+        Args:
+            progress_seconds (int, optional): What point in track to check whats active.
+                Only exists for consistency in testing. Defaults to None.
+
+        Returns:
+            dict: The current active items for the given progress in the song
+        """
+        track_time_seconds = (
+            self.get_track_progress_seconds()
+            if not progress_seconds
+            else progress_seconds
+        )
+
+        if track_time_seconds > self.track_duration:
+            return None
+
+        active = {
+            "bars": self.__linear_search_active(self.bars, track_time_seconds),
+            "beats": self.__linear_search_active(
+                self.beats, track_time_seconds
+            ),
+            "sections": self.__linear_search_active(
+                self.sections, track_time_seconds
+            ),
+            "segments": self.__linear_search_active(
+                self.segments, track_time_seconds
+            ),
+            "tatums": self.__linear_search_active(
+                self.tatums, track_time_seconds
+            ),
+        }
+
+        return active
+
+    def __linear_search_active(self, category, track_time_seconds):
+        for i in range(len(category)):
+            start = category.start[i]
+            stop = category.end[i]
+
+            if start <= track_time_seconds <= stop:
+                return category.item(i)
+
+    def get_active_binary_search(
+        self, progress_seconds: int = None
+    ) -> Dict[str, dict]:
+        """Gets the current active items from spotify data using a binary search
+
+        Args:
+            progress_seconds (int, optional): What point in track to check whats active.
+                Only exists for consistency in testing. Defaults to None.
+
+        Returns:
+            dict: The current active items for the given progress in the song
+        """
+        track_time_seconds = (
+            self.get_track_progress_seconds()
+            if not progress_seconds
+            else progress_seconds
+        )
+
+        if track_time_seconds > self.track_duration:
+            return None
+
+        trace_start = TRACER.begin()
+        active = {
+            "bars": self._binary_search_active(self.bars, track_time_seconds),
+            "beats": self._binary_search_active(self.beats, track_time_seconds),
+            "sections": self._binary_search_active(
+                self.sections, track_time_seconds
+            ),
+            "segments": self._binary_search_active(
+                self.segments, track_time_seconds
+            ),
+            "tatums": self._binary_search_active(
+                self.tatums, track_time_seconds
+            ),
+        }
+        TRACER.end(SPAN_ANALYSIS_LOOKUP, trace_start)
+
+        return active
+
+    def _binary_search_active(self, data_arr, track_time_seconds):
+        return data_arr.item(data_arr.active_index(track_time_seconds))
+
+    def playback_cursor(self) -> PlaybackCursor:
+        """Makes a cursor that finds active items cheaply while playback moves forward
+
+        Returns:
+            PlaybackCursor: Cursor starting at the beginning of the track
+        """
+        return PlaybackCursor(self.columns, self.track_duration)
+
+    def get_active_indices(self, track_times_seconds: np.ndarray) -> Dict[str, np.ndarray]:
+        """Gets the index of the active item in every category for many points in the
+            track at once, to render ahead of playback or offline
+
+        Args:
+            track_times_seconds (np.ndarray): Points in track to check
+
+        Returns:
+            Dict[str, np.ndarray]: Index of the active item at every time for each
+                category, NO_ITEM where nothing is active or the track is over
+        """
+        times = np.asarray(track_times_seconds, dtype=np.float64)
+        past_end = times > self.track_duration
+
+        active = {}
+        for category in CATEGORIES:
+            indices = self.__dict__[category].active_indices(times)
+            indices[past_end] = NO_ITEM
+            active[category] = indices
+
+        return active
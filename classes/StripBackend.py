@@ -0,0 +1,68 @@
+"""Output backends that LightString can show frames on.
+
+Every backend looks like an rpi_ws281x PixelStrip to the rest of the code, so
+ anything that used the strip directly keeps working, and adds write_frame to copy a
+ whole frame of packed colors into the strip buffer in one call.
+"""
+from abc import ABC, abstractmethod
+import ctypes
+
+import numpy as np
+from rpi_ws281x import PixelStrip, ws
+
+
+class StripBackend(ABC):
+    """Interface every output backend implements"""
+
+    @abstractmethod
+    def begin(self):
+        """Prepares the output, must be called once before anything is shown"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_frame(self, frame: np.ndarray):
+        """Copies a whole frame into the strip buffer without showing it
+
+        Args:
+            frame (np.ndarray): Packed uint32 colors, one for every pixel
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def show(self):
+        """Sends the strip buffer out to the LEDs"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def numPixels(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def setPixelColor(self, n: int, color: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    def getPixelColor(self, n: int) -> int:
+        raise NotImplementedError
+
+
+class Ws281xStrip(PixelStrip, StripBackend):
+    """The real rpi_ws281x driver"""
+
+    def write_frame(self, frame: np.ndarray):
+        """Copies the frame straight into the driver's LED buffer with one memmove,
+            the buffer holds one uint32 color for every LED just like the frame
+
+        Args:
+            frame (np.ndarray): Packed uint32 colors, one for every pixel
+
+        Raises:
+            RuntimeError: If begin hasn't been called, the buffer is allocated by it
+        """
+        leds = ws.ws2811_channel_t_leds_get(self.getPixels().channel)
+        if leds is None:
+            raise RuntimeError("The strip has no LED buffer until begin is called")
+
+        count = min(len(frame), self.numPixels())
+        frame = np.ascontiguousarray(frame[:count], dtype=np.uint32)
+        ctypes.memmove(int(leds), frame.ctypes.data, frame.nbytes)
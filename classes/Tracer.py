@@ -0,0 +1,179 @@
+"""Low overhead span tracing for the render hot paths, exported as Chrome trace JSON.
+
+Every process that draws gets its own ring buffer of span records, allocated in shared
+ memory when this module is imported, so processes forked from the server write into
+ memory the server can read and dump. A record is three int64s: the span, its start
+ and its duration in nanoseconds on the monotonic clock, which is the same clock in
+ every process. Once a ring is full the oldest spans are overwritten.
+
+Tracing is switched on and off at runtime through a shared flag. While it is off
+ begin() returns 0 and end() returns straight away, so an untraced frame only pays
+ for reading the flag. Spans are recorded without locks, so a dump taken while
+ tracing is on can include a record that is still being written.
+
+ start = TRACER.begin()
+ ...
+ TRACER.end(SPAN_SHOW, start)
+
+Open the export in chrome://tracing or https://ui.perfetto.dev.
+"""
+from multiprocessing import RawArray, RawValue
+from typing import Callable, Dict, List
+import time
+
+# Process roles, each records into its own ring
+RING_SERVER = "server"
+RING_RENDER_WORKER = "render_worker"
+RING_DISPLAY = "display"
+RING_VISUALIZER = "visualizer"
+RINGS = (RING_SERVER, RING_RENDER_WORKER, RING_DISPLAY, RING_VISUALIZER)
+
+# Spans that can be recorded, stored by their index in SPANS
+SPANS = (
+    "render_frame",
+    "color_correct",
+    "strip_show",
+    "frame_buffer_read",
+    "analysis_lookup",
+    "composite",
+    "frame_buffer_publish",
+)
+SPAN_RENDER_FRAME = 0
+SPAN_COLOR_CORRECT = 1
+SPAN_STRIP_SHOW = 2
+SPAN_FRAME_BUFFER_READ = 3
+SPAN_ANALYSIS_LOOKUP = 4
+SPAN_COMPOSITE = 5
+SPAN_FRAME_BUFFER_PUBLISH = 6
+
+# Spans kept per ring before the oldest are overwritten
+RING_CAPACITY = 16384
+RECORD_FIELDS = 3
+
+
+class Tracer:
+    def __init__(self, capacity: int = RING_CAPACITY) -> None:
+        """Allocates a ring for every process role. Processes forked after this share
+            the rings and the enabled flag.
+
+        Args:
+            capacity (int, optional): Spans kept per ring. Defaults to RING_CAPACITY.
+        """
+        self.capacity = capacity
+        self.enabled = RawValue("b", 0)
+        self.records = [RawArray("q", capacity * RECORD_FIELDS) for _ in RINGS]
+        # Spans ever written to each ring, the next one goes at written % capacity
+        self.written = RawArray("q", len(RINGS))
+        self.ring = RINGS.index(RING_SERVER)
+
+    def enable(self):
+        """Starts recording in every process"""
+        self.enabled.value = 1
+
+    def disable(self):
+        """Stops recording in every process"""
+        self.enabled.value = 0
+
+    def clear(self):
+        """Forgets every recorded span"""
+        for ring in range(len(RINGS)):
+            self.written[ring] = 0
+
+    def use_ring(self, role: str):
+        """Makes this process record into the ring of a role
+
+        Args:
+            role (str): One of RINGS
+        """
+        self.ring = RINGS.index(role)
+
+    def in_ring(self, role: str, target: Callable) -> Callable:
+        """Wraps a process target so the process records into the ring of a role
+
+        Args:
+            role (str): One of RINGS
+            target (Callable): Function the process runs
+
+        Returns:
+            Callable: Function to pass as the process target instead
+        """
+
+        def run(*args, **kwargs):
+            self.use_ring(role)
+            return target(*args, **kwargs)
+
+        return run
+
+    def begin(self) -> int:
+        """Start of a span
+
+        Returns:
+            int: Timestamp in ns to pass to end(), 0 while tracing is off
+        """
+        return time.perf_counter_ns() if self.enabled.value else 0
+
+    def end(self, span: int, start: int):
+        """Records a span that started at start and ends now
+
+        Args:
+            span (int): One of the SPAN_ constants
+            start (int): Value begin() returned
+        """
+        if not start:
+            return
+
+        duration = time.perf_counter_ns() - start
+        ring = self.ring
+        index = self.written[ring] % self.capacity * RECORD_FIELDS
+        records = self.records[ring]
+        records[index] = span
+        records[index + 1] = start
+        records[index + 2] = duration
+        self.written[ring] += 1
+
+    def spans(self, role: str) -> List[tuple]:
+        """Spans kept in the ring of a role, oldest first
+
+        Args:
+            role (str): One of RINGS
+
+        Returns:
+            List[tuple]: Span name, start ns and duration ns of every span
+        """
+        ring = RINGS.index(role)
+        written = self.written[ring]
+        first = max(written - self.capacity, 0)
+        records = self.records[ring]
+        spans = []
+        for n in range(first, written):
+            index = n % self.capacity * RECORD_FIELDS
+            span, start, duration = records[index:index + RECORD_FIELDS]
+            spans.append((SPANS[span], start, duration))
+        return spans
+
+    def chrome_trace(self) -> Dict[str, list]:
+        """Every kept span in the Chrome trace event format, one process per role
+
+        Returns:
+            Dict[str, list]: The trace, ready to be dumped as JSON
+        """
+        events = []
+        for pid, role in enumerate(RINGS):
+            events.append(
+                {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": role}}
+            )
+            for name, start, duration in self.spans(role):
+                events.append(
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "pid": pid,
+                        "tid": 0,
+                        "ts": start / 1000,
+                        "dur": duration / 1000,
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+TRACER = Tracer()
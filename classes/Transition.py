@@ -0,0 +1,89 @@
+"""Per pixel fades from one frame to another along an easing curve.
+
+Every pixel fades from its own color to its own target, so a string showing several
+ colors doesn't snap to one of them before fading. The easing curve for a number of
+ steps is computed once and cached, and each step interpolates the whole frame in
+ one numpy expression, so a fade costs the same per frame no matter how long it is.
+ Fades are split into as many steps as the frame scheduler will actually show rather
+ than one step per millisecond.
+"""
+from functools import lru_cache
+from typing import Callable, Dict
+
+import numpy as np
+
+from classes.FrameRenderer import FrameRenderer
+
+EASING_LINEAR = "linear"
+EASING_EASE_IN_OUT = "ease_in_out"
+EASING_EXPONENTIAL = "exponential"
+
+# How far along the fade is for a fraction of its time, both from 0-1
+EASINGS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    EASING_LINEAR: lambda t: t,
+    EASING_EASE_IN_OUT: lambda t: (1 - np.cos(np.pi * t)) / 2,
+    # Exponential ease in, scaled so it starts at exactly 0 and ends at exactly 1
+    EASING_EXPONENTIAL: lambda t: np.expm1(10 * t) / np.expm1(10),
+}
+
+# Time between fade frames the strip is asked for, 100 frames per second
+FRAME_INTERVAL_S = 0.01
+
+
+@lru_cache(maxsize=32)
+def easing_curve(easing: str, steps: int) -> np.ndarray:
+    """How far along the fade each step is. The last step is always the target.
+
+    Args:
+        easing (str): One of EASINGS
+        steps (int): Number of steps in the fade
+
+    Raises:
+        ValueError: If the easing doesn't exist
+
+    Returns:
+        np.ndarray: Read only amounts from 0-1, one for every step
+    """
+    if easing not in EASINGS:
+        raise ValueError(f"Unknown easing {easing}, expected one of {list(EASINGS)}")
+
+    curve = EASINGS[easing](np.arange(1, steps + 1) / steps).astype(np.float32)
+    curve.flags.writeable = False
+    return curve
+
+
+class Transition:
+    def __init__(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        steps: int,
+        easing: str = EASING_LINEAR,
+    ) -> None:
+        """Fade from every pixel of one frame to the same pixel of another
+
+        Args:
+            start (np.ndarray): Packed colors the fade starts from
+            end (np.ndarray): Packed colors the fade ends on
+            steps (int): Number of frames in the fade
+            easing (str, optional): One of EASINGS. Defaults to EASING_LINEAR.
+        """
+        self.steps = max(int(steps), 1)
+        self.curve = easing_curve(easing, self.steps)
+        self.start = FrameRenderer.unpack_rgb(start).astype(np.float32)
+        self.delta = FrameRenderer.unpack_rgb(end).astype(np.float32) - self.start
+        self.rgb = np.empty_like(self.start)
+
+    def frame_at(self, step: int) -> np.ndarray:
+        """Builds the frame for a step of the fade
+
+        Args:
+            step (int): Step from 0 to steps - 1
+
+        Returns:
+            np.ndarray: Packed colors
+        """
+        np.multiply(self.delta, self.curve[step], out=self.rgb)
+        self.rgb += self.start
+        np.rint(self.rgb, out=self.rgb)
+        return FrameRenderer.pack_rgb(self.rgb)
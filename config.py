@@ -1,10 +1,14 @@
-from pathlib import Path
-from dotenv import dotenv_values
-from simple_logging import get_basic_logger
-
-
-CREDENTIALS_DIRECTORY = Path.cwd() / "credentials"
-secrets = dotenv_values(CREDENTIALS_DIRECTORY / ".env")
-
-# Creates a logging object to use
-log = get_basic_logger()
+from pathlib import Path
+from dotenv import dotenv_values
+from simple_logging import get_basic_logger
+
+
+CREDENTIALS_DIRECTORY = Path.cwd() / "credentials"
+secrets = dotenv_values(CREDENTIALS_DIRECTORY / ".env")
+
+# Audio analyses of played tracks are kept here so replays don't upload them again
+ANALYSIS_CACHE_DIRECTORY = Path.cwd() / "analysis_cache"
+ANALYSIS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Creates a logging object to use
+log = get_basic_logger()
@@ -1,255 +1,676 @@
-from typing import List
-
-from flask import Flask, request
-from flask import Response as FlaskResponse
-from flask_cors import CORS
-import socketio
-
-from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
-from classes.LedColor import LedColor
-from classes.LightLoop import LightLoop
-from classes.LightString import LightString, strip_mode
-from classes.DynamicDisplay import DynamicDisplay
-
-import config
-import helpers
-
-log = config.log
-
-# Create server and set allowed domain origins
-sio = socketio.Server(
-    logger=True, async_mode="eventlet", cors_allowed_origins="*"
-)
-app = Flask(__name__)
-cors = CORS(app, origins=config.secrets["CORS_ALLOWED_DOMAINS"])
-app.wsgi_app = socketio.WSGIApp(sio, app.wsgi_app)
-
-device_config = helpers.get_config_from_file()
-
-light_string = LightString(**device_config)
-light_loop = LightLoop(light_string)
-dynamic_display = DynamicDisplay(light_string=light_string)
-
-
-@app.route("/configDevice/", methods=["POST"])
-def config_string():
-    """sets all pixels on tree to black
-
-    Returns:
-        FlaskResponse: Positive HTTP Response
-    """
-    global light_string
-    global dynamic_display
-    data = request.json
-    color_mode = data.get("color_mode").lower()
-    led_count = data.get("led_count")
-
-    log.info(data)
-
-    if color_mode not in strip_mode.keys():
-        return FlaskResponse(f"Data : {color_mode} is not valid", status=406)
-
-    helpers.write_config_to_file(
-        {"led_count": int(led_count), "color_mode": color_mode}
-    )
-
-    light_string = LightString(led_count=int(led_count), color_mode=color_mode)
-    dynamic_display = DynamicDisplay(light_string=light_string)
-
-    light_loop.set_static_lights(
-        light_string.set_solid, {"color": LedColor.white}
-    )
-
-    return FlaskResponse("Updated string config", status=202)
-
-
-@sio.event
-def connect(*args):
-    """Logs a message on new client connections."""
-    log.info("New client connected.")
-
-
-@sio.event
-def set_color(_sid, color: List[int]):
-    """Sets the color to the one provided in the message
-
-    Args:
-        color (List[int]): Color to set tree
-    """
-    dynamic_display.terminate_all_running_process()
-    light_loop.set_static_lights(
-        light_string.set_solid, {"color": LedColor.rgb(color)}
-    )
-
-
-@app.route("/turnOffLights/", methods=["POST"])
-def turn_off_lights():
-    """sets all pixels on tree to black
-
-    Returns:
-        FlaskResponse: Positive HTTP Response
-    """
-    dynamic_display.terminate_all_running_process()
-    light_loop.set_static_lights(
-        light_string.set_solid, {"color": LedColor.black}
-    )
-    return FlaskResponse("Turned off lights.", status=202)
-
-
-# Function and arguments for setPattern endpoint
-pattern_fn_map = {
-    "rainbowCycle": {"fn": light_string.rainbow_cycle},
-    "slowRandomTransition": {
-        "fn": light_string.transition_to_random_color,
-        "kwargs": {"wait_after_transition_ms": 1},
-    },
-    "fastRandomTransition": {
-        "fn": light_string.transition_to_random_color,
-        "kwargs": {"transition_time_ms": 100, "wait_after_transition_ms": 1},
-    },
-}
-
-
-# Sets color to an existing mapped preset color
-@app.route("/setSolidPreset/", methods=["POST"])
-def set_solid():
-    data = request.json
-    color = data.get("color")
-    led_color = getattr(LedColor, color)
-    log.info(f"Setting color to {color}")
-    if not led_color:
-        return FlaskResponse(
-            f"No valid preset color found for {color}", status=401
-        )
-    dynamic_display.terminate_all_running_process()
-    light_loop.set_static_lights(light_string.set_solid, {"color": led_color})
-    return FlaskResponse(f"Set lights to color {color}", status=202)
-
-
-@app.route("/setCustomPattern/", methods=["POST"])
-def set_custom_pattern():
-    """sets all pixels on tree to black
-
-    Returns:
-        FlaskResponse: Positive HTTP Response
-    """
-    data = request.json
-    pattern = data.get("pattern")
-    log.info(pattern)
-    dynamic_display.terminate_all_running_process()
-    light_loop.set_static_lights(
-        light_string.set_solid_from_rgb_list, {"rgb_list": pattern}
-    )
-    return FlaskResponse("Set to custom pattern", status=202)
-
-
-@app.route("/setRgbColor/", methods=["POST"])
-def set_rgb_color():
-    data = request.json
-    color = data.get("color")
-    if not type(color) == list or len(color) != 3:
-        return FlaskResponse(
-            f"Improper data sent. Must be a 3 index list. {color}", status=401
-        )
-
-    dynamic_display.terminate_all_running_process()
-    light_loop.set_static_lights(
-        light_string.set_solid, {"color": LedColor.rgb(color)}
-    )
-    return FlaskResponse(f"Set lights to color {color}", status=202)
-
-
-# Starts an animated pattern
-@app.route("/setPattern/", methods=["POST"])
-def set_pattern():
-    data = request.json
-    pattern = data.get("pattern")
-    if not pattern or pattern not in pattern_fn_map.keys():
-        return FlaskResponse("Missing or Invalid Pattern", status=404)
-
-    dynamic_display.terminate_all_running_process()
-    pattern_fn = pattern_fn_map.get(pattern)
-    light_loop.set_looping_pattern(
-        pattern_fn.get("fn"),
-        pattern_fn.get("kwargs", {}),
-    )
-    return FlaskResponse(
-        f"Set to lighting pattern {request.json['pattern']}", status=200
-    )
-
-
-# Simple test endpoint for debugging
-@app.route("/test/", methods=["GET", "POST"])
-def test_turn_yellow():
-    dynamic_display.terminate_all_running_process()
-    light_loop.set_static_lights(light_string.random_colors)
-
-    return FlaskResponse("Test Received!!", status=202)
-
-
-# Starts lighting device running with dual beat spotify visualization
-@app.route("/spotifyVisualizeDualBeat/", methods=["POST"])
-def spotify_visualize_dual_beat():
-    data = request.json
-    track_progress = data.get("track_progress")
-    track_data = data.get("track_data")
-    lag_time_ms = data.get("lag_time_ms")
-
-    audio_analysis = SpotifyAudioAnalysis(
-        track_progress=track_progress,
-        lag_time_ms=lag_time_ms,
-        **track_data,
-    )
-
-    light_loop.terminate_running_process()
-    dynamic_display.reinitialize()
-    dynamic_display.dual_beats(audio_analysis)
-
-    return FlaskResponse("Setting visualizer to dual beat", status=202)
-
-
-# Starts lighting device running with dual beat spotify visualization
-@app.route("/spotifyVisualizeDualBeatWithTatums/", methods=["POST"])
-def spotify_visualize_dual_beat_with_tatums():
-    data = request.json
-    track_progress = data.get("track_progress")
-    track_data = data.get("track_data")
-    lag_time_ms = data.get("lag_time_ms")
-
-    audio_analysis = SpotifyAudioAnalysis(
-        track_progress=track_progress,
-        lag_time_ms=lag_time_ms,
-        **track_data,
-    )
-
-    light_loop.terminate_running_process()
-    dynamic_display.reinitialize()
-    dynamic_display.dual_beats_with_tatums(audio_analysis)
-
-    return FlaskResponse("Setting visualizer to dual beat", status=202)
-
-
-# Simple test endpoint for debugging
-@app.route("/bonjour/", methods=["GET"])
-def bonjour_to_web_server():
-    light_loop.set_static_lights(
-        light_string.set_solid_from_rgb_list,
-        {"rgb_list": [[100, 255, 0], [0, 0, 255]]},
-    )
-    return FlaskResponse("BONJOUR!", status=202)
-
-
-if __name__ == "__main__":
-    # deploy with eventlet
-    import eventlet
-    import eventlet.wsgi
-
-    eventlet.wsgi.server(
-        eventlet.wrap_ssl(
-            eventlet.listen(("", 5000)),
-            certfile="./credentials/cert.pem",
-            keyfile="./credentials/key.pem",
-            server_side=True,
-        ),
-        app,
-    )
+from typing import List, Optional
+import os
+import time
+
+from flask import Flask, g, request
+from flask import Response as FlaskResponse
+from flask_cors import CORS
+import socketio
+
+from classes.AnalysisCache import AnalysisCache
+from classes.ClockSync import (
+    ROLE_FOLLOWER,
+    ROLE_LEADER,
+    SYNC_PORT,
+    ClockFollower,
+    ClockLeader,
+)
+from classes.ControlPlane import LIGHTS_TARGET, ControlPlane
+from classes.FrameStream import FrameStreamDecoder
+from classes import Metrics
+from classes.PlaybackClock import PlaybackClock
+from classes.RenderWorker import RenderWorker
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+from classes.Tracer import TRACER
+from classes.LedColor import LedColor
+from classes.LightString import LightString, strip_mode
+from classes.DynamicDisplay import DynamicDisplay
+
+import config
+import helpers
+
+log = config.log
+
+# Create server and set allowed domain origins
+sio = socketio.Server(
+    logger=True, async_mode="eventlet", cors_allowed_origins="*"
+)
+app = Flask(__name__)
+cors = CORS(app, origins=config.secrets["CORS_ALLOWED_DOMAINS"])
+app.wsgi_app = socketio.WSGIApp(sio, app.wsgi_app)
+
+device_config = helpers.get_config_from_file()
+
+light_string = LightString(**device_config)
+dynamic_display = DynamicDisplay(light_string=light_string)
+render_worker = RenderWorker(light_string)
+render_worker.run_once("set_solid", color=LedColor.brightViolet)
+analysis_cache = AnalysisCache(
+    config.ANALYSIS_CACHE_DIRECTORY, config.ANALYSIS_CACHE_MAX_BYTES
+)
+# Analysis of the track the running visualizer follows
+playing_analysis = None
+# Keeps the running visualizer in step with other devices when set
+clock_sync = None
+frame_stream = FrameStreamDecoder(light_string.led_count)
+# Handlers only validate and submit, anything that blocks runs on the control thread.
+# Jobs read the globals when they run, so they always act on the current light string
+control_plane = ControlPlane()
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response: FlaskResponse) -> FlaskResponse:
+    control_plane.record_request(
+        request.endpoint or request.path, time.perf_counter() - g.request_start
+    )
+    return response
+
+
+def forget_visualizer():
+    """Drops the analysis of the stopped visualizer, so its clock is no longer synced
+    or sent to followers once something else is drawing
+    """
+    global playing_analysis
+    playing_analysis = None
+
+
+def show_command(method: str, looping: bool = False, **kwargs):
+    """Stops any visualizer and has the render worker run a LightString method. Runs on
+        the control thread.
+
+    Args:
+        method (str): Name of the LightString method
+        looping (bool, optional): Whether to keep running it. Defaults to False.
+        kwargs: Keyword arguments for the method
+    """
+    dynamic_display.terminate_all_running_process()
+    forget_visualizer()
+    if looping:
+        render_worker.run_looping(method, **kwargs)
+    else:
+        render_worker.run_once(method, **kwargs)
+
+
+def submit_show_command(name: str, method: str, looping: bool = False, **kwargs):
+    """Queues show_command, replacing any change to the lights that hasn't run yet
+
+    Args:
+        name (str): Kind of command, used for its latency stats
+        method (str): Name of the LightString method
+        looping (bool, optional): Whether to keep running it. Defaults to False.
+        kwargs: Keyword arguments for the method
+    """
+    control_plane.submit(
+        name, show_command, method, looping, target=LIGHTS_TARGET, **kwargs
+    )
+
+
+def configure_device(new_config: dict):
+    """Saves the device config and rebuilds the light string from it. Runs on the
+        control thread.
+
+    Args:
+        new_config (dict): Device config to merge into the current one
+    """
+    global light_string
+    global dynamic_display
+    global render_worker
+    device_config.update(new_config)
+    helpers.write_config_to_file(device_config)
+
+    dynamic_display.terminate_all_running_process()
+    forget_visualizer()
+    render_worker.close()
+    light_string = LightString(**device_config)
+    dynamic_display = DynamicDisplay(light_string=light_string)
+    render_worker = RenderWorker(light_string)
+
+    render_worker.run_once("set_solid", color=LedColor.white)
+
+
+@app.route("/configDevice/", methods=["POST"])
+def config_string():
+    """Changes the number of pixels and color order of the string. When the device
+        has several outputs the number of pixels is the sum of theirs and only the
+        color order can be changed.
+
+    Returns:
+        FlaskResponse: Positive HTTP Response
+    """
+    data = request.json
+    color_mode = str(data.get("color_mode")).lower()
+    led_count = data.get("led_count")
+
+    log.info(data)
+
+    if color_mode not in strip_mode.keys():
+        return FlaskResponse(f"Data : {color_mode} is not valid", status=406)
+
+    new_config = {"color_mode": color_mode}
+    if device_config.get("outputs"):
+        if led_count is not None:
+            return FlaskResponse(
+                f"Data : {led_count} is not valid, the led count is set by the outputs",
+                status=406,
+            )
+    else:
+        try:
+            new_config["led_count"] = int(led_count)
+        except (TypeError, ValueError):
+            return FlaskResponse(f"Data : {led_count} is not valid", status=406)
+
+    control_plane.submit("configDevice", configure_device, new_config)
+
+    return FlaskResponse("Updated string config", status=202)
+
+
+@app.route("/controlPlane/stats/", methods=["GET"])
+def control_plane_stats():
+    """Latency of requests and of the work they queued, and counts of queued jobs
+
+    Returns:
+        dict: Stats of the control plane
+    """
+    return control_plane.stats()
+
+
+@sio.event
+def connect(*args):
+    """Logs a message on new client connections."""
+    log.info("New client connected.")
+
+
+@sio.event
+def sync_playback(sid, data: dict):
+    """Moves the running visualizer to where the player is without restarting it.
+    Seeks, pauses and drift corrections show up on the next frame.
+
+    Args:
+        sid (str): Socket id of the client
+        data (dict): Any of track_progress and lag_time_ms in milliseconds and paused
+    """
+    if not playing_analysis:
+        return "No visualizer running"
+
+    playing_analysis.clock.sync(
+        progress_ms=data.get("track_progress"),
+        lag_time_ms=data.get("lag_time_ms"),
+        paused=data.get("paused"),
+    )
+    if isinstance(clock_sync, ClockLeader):
+        clock_sync.beacon()
+    return "Synced"
+
+
+@sio.event
+def set_color(_sid, color: List[int]):
+    """Sets the color to the one provided in the message
+
+    Args:
+        color (List[int]): Color to set tree
+    """
+    start = time.perf_counter()
+    submit_show_command("set_color", "set_solid", color=LedColor.rgb(color))
+    control_plane.record_request("set_color", time.perf_counter() - start)
+
+
+@sio.event
+def stream_frame(_sid, message: bytes):
+    """Shows one binary frame from a client streaming frames. The first frame stops
+        whatever else is running. See classes/FrameStream.py for the message format.
+
+    Args:
+        message (bytes): One encoded frame
+
+    Returns:
+        dict: Ack with the frame sequence, the client time it was sent with and how
+            long the device took to show it, or an error
+    """
+    received_ns = time.monotonic_ns()
+
+    if not dynamic_display.streaming:
+        control_plane.submit("stream_frame", start_frame_stream, target=LIGHTS_TARGET)
+        return {"error": "Stream is starting, frame dropped"}
+
+    try:
+        frame = frame_stream.decode(message)
+    except ValueError as error:
+        return {"error": str(error)}
+
+    dynamic_display.frame_buffer.publish_frame(frame)
+    return frame_stream.ack(message, received_ns)
+
+
+def start_frame_stream():
+    """Stops everything else drawing and leaves the display showing streamed frames.
+    Runs on the control thread.
+    """
+    global frame_stream
+    if dynamic_display.streaming:
+        return
+
+    render_worker.stop()
+    frame_stream = FrameStreamDecoder(light_string.led_count)
+    dynamic_display.start_streaming()
+    forget_visualizer()
+
+
+@app.route("/frameStream/stats/", methods=["GET"])
+def frame_stream_stats():
+    """Stats of the current or last frame stream
+
+    Returns:
+        dict: Frames, bandwidth and latency of the stream
+    """
+    return frame_stream.stats.as_dict()
+
+
+@app.route("/metrics/", methods=["GET"])
+def metrics():
+    """Render, visualizer and process metrics in Prometheus text format
+
+    Returns:
+        FlaskResponse: The metrics
+    """
+    processes = {"server": os.getpid(), "render_worker": render_worker.process.pid}
+    if dynamic_display.light_refresh_loop:
+        processes["display"] = dynamic_display.light_refresh_loop.pid
+    if "layers" in dynamic_display.group_threads:
+        processes["visualizer"] = dynamic_display.group_threads["layers"].pid
+
+    refresh_stats = dynamic_display.refresh_stats()
+    worker_stats = render_worker.stats()
+    extra = {
+        "xmas_display_refreshes_total": refresh_stats["refreshes"],
+        "xmas_display_skipped_refreshes_total": refresh_stats["skipped_refreshes"],
+        "xmas_render_commands_applied_total": worker_stats["applied"],
+        "xmas_render_commands_merged_total": worker_stats["merged"],
+        "xmas_stream_frames_total": frame_stream.stats.frames,
+        "xmas_stream_frames_dropped_total": frame_stream.stats.dropped,
+        "xmas_stream_resets_total": frame_stream.stats.resets,
+    }
+    return FlaskResponse(
+        Metrics.export(processes, extra), mimetype="text/plain; version=0.0.4"
+    )
+
+
+@app.route("/trace/", methods=["GET"])
+def get_trace():
+    """Spans recorded by every process, to open in chrome://tracing or Perfetto
+
+    Returns:
+        dict: Chrome trace JSON
+    """
+    return TRACER.chrome_trace()
+
+
+@app.route("/trace/", methods=["POST"])
+def set_tracing():
+    """Switches span recording on or off in every process without restarting them
+
+    Returns:
+        FlaskResponse: Positive HTTP Response
+    """
+    data = request.json
+    if data.get("clear"):
+        TRACER.clear()
+    if data.get("enabled"):
+        TRACER.enable()
+        return FlaskResponse("Tracing on", status=200)
+
+    TRACER.disable()
+    return FlaskResponse("Tracing off", status=200)
+
+
+def playing_clock() -> Optional[PlaybackClock]:
+    """Playback clock of the running visualizer, for ClockSync
+
+    Returns:
+        Optional[PlaybackClock]: The clock, None when no visualizer is running
+    """
+    return playing_analysis.clock if playing_analysis else None
+
+
+def set_clock_sync(role: Optional[str], leader: Optional[str], port: int):
+    """Stops any clock sync and starts it again in a new role. Runs on the control
+        thread.
+
+    Args:
+        role (Optional[str]): ROLE_LEADER, ROLE_FOLLOWER or None to stop syncing
+        leader (Optional[str]): Host of the leader to follow
+        port (int): UDP port the leader listens on
+    """
+    global clock_sync
+    if clock_sync:
+        clock_sync.close()
+        clock_sync = None
+
+    if role == ROLE_LEADER:
+        clock_sync = ClockLeader(playing_clock, port=port)
+    elif role == ROLE_FOLLOWER:
+        clock_sync = ClockFollower(playing_clock, (leader, port))
+    log.info(f"Clock sync role is now {role}")
+
+
+@app.route("/clockSync/", methods=["GET"])
+def clock_sync_stats():
+    """Role of the device and the measured skew to the other devices
+
+    Returns:
+        dict: Stats of the leader or follower, or just the role when not syncing
+    """
+    if not clock_sync:
+        return {"role": None}
+    return clock_sync.stats()
+
+
+@app.route("/clockSync/", methods=["POST"])
+def configure_clock_sync():
+    """Makes the device lead or follow the visualizer clock of other devices, or
+        stop syncing with a role of null
+
+    Returns:
+        FlaskResponse: Positive HTTP Response
+    """
+    data = request.json
+    role = data.get("role")
+    leader = data.get("leader")
+
+    if role not in (ROLE_LEADER, ROLE_FOLLOWER, None):
+        return FlaskResponse(f"Data : {role} is not valid", status=406)
+    if role == ROLE_FOLLOWER and not leader:
+        return FlaskResponse("A follower needs the leader's host", status=406)
+    try:
+        port = int(data.get("port", SYNC_PORT))
+    except (TypeError, ValueError):
+        return FlaskResponse(f"Data : {data.get('port')} is not valid", status=406)
+
+    control_plane.submit("clockSync", set_clock_sync, role, leader, port)
+    return FlaskResponse(f"Clock sync role set to {role}", status=202)
+
+
+def start_pixel_receiver(start_universe: int):
+    """Stops everything else drawing and shows frames sent by sequencers over E1.31
+    or DDP. Runs on the control thread.
+
+    Args:
+        start_universe (int): E1.31 universe of the first pixels
+    """
+    render_worker.stop()
+    dynamic_display.start_receiving(start_universe=start_universe)
+    forget_visualizer()
+
+
+@app.route("/pixelReceiver/", methods=["POST"])
+def pixel_receiver():
+    """Listens for E1.31 (sACN) on port 5568 and DDP on port 4048 and shows the
+        frames they carry until another pattern is set
+
+    Returns:
+        FlaskResponse: Positive HTTP Response
+    """
+    data = request.json or {}
+    try:
+        start_universe = int(data.get("start_universe", 1))
+    except (TypeError, ValueError):
+        return FlaskResponse(
+            f"Data : {data.get('start_universe')} is not valid", status=406
+        )
+
+    control_plane.submit(
+        "pixelReceiver", start_pixel_receiver, start_universe, target=LIGHTS_TARGET
+    )
+    return FlaskResponse("Receiving E1.31 and DDP", status=202)
+
+
+@app.route("/turnOffLights/", methods=["POST"])
+def turn_off_lights():
+    """sets all pixels on tree to black
+
+    Returns:
+        FlaskResponse: Positive HTTP Response
+    """
+    submit_show_command("turnOffLights", "set_solid", color=LedColor.black)
+    return FlaskResponse("Turned off lights.", status=202)
+
+
+# Sets color to an existing mapped preset color
+@app.route("/setSolidPreset/", methods=["POST"])
+def set_solid():
+    data = request.json
+    color = data.get("color")
+    led_color = getattr(LedColor, color)
+    log.info(f"Setting color to {color}")
+    if not led_color:
+        return FlaskResponse(
+            f"No valid preset color found for {color}", status=401
+        )
+    submit_show_command("setSolidPreset", "set_solid", color=led_color)
+    return FlaskResponse(f"Set lights to color {color}", status=202)
+
+
+@app.route("/setCustomPattern/", methods=["POST"])
+def set_custom_pattern():
+    """sets all pixels on tree to black
+
+    Returns:
+        FlaskResponse: Positive HTTP Response
+    """
+    data = request.json
+    pattern = data.get("pattern")
+    log.info(pattern)
+    submit_show_command("setCustomPattern", "set_solid_from_rgb_list", rgb_list=pattern)
+    return FlaskResponse("Set to custom pattern", status=202)
+
+
+@app.route("/setRgbColor/", methods=["POST"])
+def set_rgb_color():
+    data = request.json
+    color = data.get("color")
+    if not type(color) == list or len(color) != 3:
+        return FlaskResponse(
+            f"Improper data sent. Must be a 3 index list. {color}", status=401
+        )
+
+    submit_show_command("setRgbColor", "set_solid", color=LedColor.rgb(color))
+    return FlaskResponse(f"Set lights to color {color}", status=202)
+
+
+# Starts an animated pattern
+@app.route("/setPattern/", methods=["POST"])
+def set_pattern():
+    data = request.json
+    pattern = data.get("pattern")
+    if not pattern or pattern not in helpers.PATTERN_MAP.keys():
+        return FlaskResponse("Missing or Invalid Pattern", status=404)
+
+    pattern_fn = helpers.PATTERN_MAP.get(pattern)
+    submit_show_command(
+        "setPattern",
+        pattern_fn.get("method"),
+        looping=True,
+        **pattern_fn.get("kwargs", {}),
+    )
+    return FlaskResponse(
+        f"Set to lighting pattern {request.json['pattern']}", status=200
+    )
+
+
+# Simple test endpoint for debugging
+@app.route("/test/", methods=["GET", "POST"])
+def test_turn_yellow():
+    submit_show_command("test", "random_colors")
+
+    return FlaskResponse("Test Received!!", status=202)
+
+
+def load_audio_analysis(
+    track_id: Optional[str],
+    track_data: Optional[dict],
+    track_progress_ms: float,
+    lag_time_ms: float,
+    received_at: float,
+) -> Optional[SpotifyAudioAnalysis]:
+    """Builds the audio analysis for a visualizer request from the track_data it sent,
+        or from the cache if it only sent the track_id. Runs on the control thread.
+
+    Args:
+        track_id (Optional[str]): Spotify track id
+        track_data (Optional[dict]): Whole audio analysis sent with the request
+        track_progress_ms (float): Track position when the request arrived
+        lag_time_ms (float): Output lag to make up for
+        received_at (float): time.monotonic() when the request arrived
+
+    Returns:
+        Optional[SpotifyAudioAnalysis]: Analysis of the track, None if it wasn't sent
+            and isn't cached
+    """
+    if not track_data:
+        track_data = analysis_cache.get(track_id)
+        if not track_data:
+            return None
+
+    audio_analysis = SpotifyAudioAnalysis(
+        track_progress=track_progress_ms, lag_time_ms=lag_time_ms, **track_data
+    )
+    # The track kept playing while the request waited and the analysis was parsed
+    audio_analysis.clock.sync(
+        progress_ms=track_progress_ms + (time.monotonic() - received_at) * 1000
+    )
+    return audio_analysis
+
+
+def start_visualizer(
+    visualizer: str,
+    track_id: Optional[str],
+    track_data: Optional[dict],
+    track_progress_ms: float,
+    lag_time_ms: float,
+    received_at: float,
+    precompile: bool,
+):
+    """Loads the analysis of the track, stops whatever is drawing and starts a
+        DynamicDisplay visualizer. Runs on the control thread.
+
+    Args:
+        visualizer (str): Name of the DynamicDisplay method that starts it
+        track_id (Optional[str]): Spotify track id
+        track_data (Optional[dict]): Whole audio analysis sent with the request, it
+            is cached under track_id once the visualizer is running
+        track_progress_ms (float): Track position when the request arrived
+        lag_time_ms (float): Output lag to make up for
+        received_at (float): time.monotonic() when the request arrived
+        precompile (bool): Whether to compile the whole show before playing it
+    """
+    global playing_analysis
+    try:
+        audio_analysis = load_audio_analysis(
+            track_id, track_data, track_progress_ms, lag_time_ms, received_at
+        )
+    except (KeyError, TypeError, ValueError) as error:
+        log.error(f"Couldn't load the audio analysis of {track_id} : {error!r}")
+        return
+    if not audio_analysis:
+        log.error(f"Audio analysis of {track_id} is no longer cached")
+        return
+
+    render_worker.stop()
+    dynamic_display.reinitialize()
+    getattr(dynamic_display, visualizer)(audio_analysis, precompile=precompile)
+    playing_analysis = audio_analysis
+    if isinstance(clock_sync, ClockLeader):
+        clock_sync.beacon()
+
+    # Writing the cache to the SD card is queued behind the visualizer starting, so it
+    # never holds up the first beat
+    if track_id and track_data:
+        control_plane.submit(
+            "cache_analysis", analysis_cache.put, track_id, audio_analysis
+        )
+
+
+def submit_visualizer(name: str, visualizer: str, data: dict) -> FlaskResponse:
+    """Validates a visualizer request and queues start_visualizer. Requests can send
+        the whole analysis in track_data, which is cached when they also send a
+        track_id, or just the track_id of a track that is already cached.
+
+    Args:
+        name (str): Kind of command, used for its latency stats
+        visualizer (str): Name of the DynamicDisplay method that starts it
+        data (dict): JSON body of the request
+
+    Returns:
+        FlaskResponse: 202 once queued, 404 if only a track_id was sent and it isn't
+            cached, or 406 if the request is malformed
+    """
+    received_at = time.monotonic()
+    track_id = data.get("track_id")
+    track_data = data.get("track_data")
+
+    try:
+        track_progress_ms = float(data.get("track_progress") or 0)
+        lag_time_ms = float(data.get("lag_time_ms") or 0)
+        # Also rejects malformed track ids
+        cached = bool(track_id) and track_id in analysis_cache
+    except (TypeError, ValueError) as error:
+        return FlaskResponse(str(error), status=406)
+    if track_data is not None and not isinstance(track_data, dict):
+        return FlaskResponse("Data : track_data is not valid", status=406)
+    if not track_data and not cached:
+        return FlaskResponse("Audio analysis not cached, send track_data", status=404)
+
+    control_plane.submit(
+        name,
+        start_visualizer,
+        visualizer,
+        track_id,
+        track_data,
+        track_progress_ms,
+        lag_time_ms,
+        received_at,
+        bool(data.get("precompile")),
+        target=LIGHTS_TARGET,
+    )
+    return FlaskResponse("Setting visualizer to dual beat", status=202)
+
+
+# Starts lighting device running with dual beat spotify visualization
+@app.route("/spotifyVisualizeDualBeat/", methods=["POST"])
+def spotify_visualize_dual_beat():
+    return submit_visualizer(request.endpoint, "dual_beats", request.json)
+
+
+# Starts lighting device running with dual beat spotify visualization
+@app.route("/spotifyVisualizeDualBeatWithTatums/", methods=["POST"])
+def spotify_visualize_dual_beat_with_tatums():
+    return submit_visualizer(request.endpoint, "dual_beats_with_tatums", request.json)
+
+
+# Simple test endpoint for debugging
+@app.route("/bonjour/", methods=["GET"])
+def bonjour_to_web_server():
+    submit_show_command(
+        "bonjour", "set_solid_from_rgb_list", rgb_list=[[100, 255, 0], [0, 0, 255]]
+    )
+    return FlaskResponse("BONJOUR!", status=202)
+
+
+if __name__ == "__main__":
+    # deploy with eventlet
+    import eventlet
+    import eventlet.wsgi
+
+    eventlet.wsgi.server(
+        eventlet.wrap_ssl(
+            eventlet.listen(("", 5000)),
+            certfile="./credentials/cert.pem",
+            keyfile="./credentials/key.pem",
+            server_side=True,
+        ),
+        app,
+    )
@@ -0,0 +1,62 @@
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from classes.AnalysisCache import AnalysisCache
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+
+
+@pytest.fixture(scope="module")
+def analysis():
+    with open(Path.cwd() / "tests" / "stairwayToHeavenAnalysis.dict", "rb") as file:
+        return SpotifyAudioAnalysis(track_progress=0, **pickle.load(file))
+
+
+def test_cached_analysis_loads_memory_mapped(tmp_path, analysis):
+    cache = AnalysisCache(tmp_path, max_bytes=10 * 1024 * 1024)
+    assert "5CQ30WqJwcep0pYcV4AMNc" not in cache
+    assert cache.get("5CQ30WqJwcep0pYcV4AMNc") is None
+
+    cache.put("5CQ30WqJwcep0pYcV4AMNc", analysis)
+    cached = cache.get("5CQ30WqJwcep0pYcV4AMNc")
+    replay = SpotifyAudioAnalysis(track_progress=0, **cached)
+
+    assert isinstance(replay.segments.columns["pitches"], np.memmap)
+    assert replay.track_duration == analysis.track_duration
+    assert replay.confidence_average == analysis.confidence_average
+    for time_seconds in [0.5, 120, 300]:
+        assert replay.get_active_binary_search(time_seconds) == (
+            analysis.get_active_binary_search(time_seconds)
+        )
+
+
+def test_least_recently_used_tracks_are_evicted(tmp_path, analysis):
+    cache = AnalysisCache(tmp_path, max_bytes=10 * 1024 * 1024)
+    cache.put("first", analysis)
+    track_bytes = cache.size_bytes()
+    cache.max_bytes = 2 * track_bytes
+
+    cache.put("second", analysis)
+    os.utime(tmp_path / "first", (1, 1))
+    os.utime(tmp_path / "second", (2, 2))
+    cache.get("first")
+    cache.put("third", analysis)
+
+    assert "first" in cache
+    assert "second" not in cache
+    assert "third" in cache
+    assert cache.size_bytes() <= cache.max_bytes
+
+
+def test_bad_entries_are_rejected(tmp_path, analysis):
+    cache = AnalysisCache(tmp_path, max_bytes=10 * 1024 * 1024)
+    with pytest.raises(ValueError):
+        cache.get("../config")
+
+    cache.put("broken", analysis)
+    (tmp_path / "broken" / "beats.start.npy").unlink()
+    assert cache.get("broken") is None
+    assert "broken" not in cache
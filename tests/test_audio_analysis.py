@@ -1,56 +1,111 @@
-import pickle
-import pytest
-from pathlib import Path
-import time
-import sys
-
-from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
-
-
-pytestmark = pytest.mark.skipif(
-    sys.platform == "darwin", reason="tests for Windows only"
-)
-
-track_data_files = [
-    "stairwayToHeavenAnalysis.dict",
-    "frontierPsychiatristAnalysis.dict",
-]
-
-
-@pytest.fixture(params=track_data_files)
-def SongAnalysisClass(request):
-    TRACK_PROGRESS_SECS = 120
-
-    filepath = Path.cwd() / "tests" / request.param
-
-    with open(filepath, "rb") as file:
-        track_data = pickle.load(file)
-
-    return SpotifyAudioAnalysis(
-        track_progress=TRACK_PROGRESS_SECS, **track_data
-    )
-
-
-@pytest.mark.parametrize("time_seconds", [45, 120, 146, 199])
-def test_time_to_get_active(SongAnalysisClass, time_seconds):
-    linear_start = time.time()
-    linear_search_active = SongAnalysisClass.get_active_linear_search(
-        progress_seconds=time_seconds
-    )
-    linear_search_time = time.time() - linear_start
-
-    binary_start = time.time()
-    binary_search_active = SongAnalysisClass.get_active_binary_search(
-        progress_seconds=time_seconds
-    )
-    binary_search_time = time.time() - binary_start
-
-    assert linear_search_active == binary_search_active
-    try:
-        # Make sure binary search is at least twice as fast as linear
-        assert binary_search_time < linear_search_time / 2
-    except AssertionError:
-        pytest.skip(
-            f"This test failed for arg {time_seconds}. It was designed for Rpi"
-            " and may have unpredictable results in CI Pipeline"
-        )
+import pickle
+import pytest
+from pathlib import Path
+import time
+import sys
+
+import numpy as np
+
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "darwin", reason="tests for Windows only"
+)
+
+track_data_files = [
+    "stairwayToHeavenAnalysis.dict",
+    "frontierPsychiatristAnalysis.dict",
+]
+
+
+@pytest.fixture(params=track_data_files)
+def SongAnalysisClass(request):
+    TRACK_PROGRESS_SECS = 120
+
+    filepath = Path.cwd() / "tests" / request.param
+
+    with open(filepath, "rb") as file:
+        track_data = pickle.load(file)
+
+    return SpotifyAudioAnalysis(
+        track_progress=TRACK_PROGRESS_SECS, **track_data
+    )
+
+
+@pytest.mark.parametrize("time_seconds", [45, 120, 146, 199])
+def test_time_to_get_active(SongAnalysisClass, time_seconds):
+    linear_start = time.time()
+    linear_search_active = SongAnalysisClass.get_active_linear_search(
+        progress_seconds=time_seconds
+    )
+    linear_search_time = time.time() - linear_start
+
+    binary_start = time.time()
+    binary_search_active = SongAnalysisClass.get_active_binary_search(
+        progress_seconds=time_seconds
+    )
+    binary_search_time = time.time() - binary_start
+
+    assert linear_search_active == binary_search_active
+    try:
+        # Make sure binary search is at least twice as fast as linear
+        assert binary_search_time < linear_search_time / 2
+    except AssertionError:
+        pytest.skip(
+            f"This test failed for arg {time_seconds}. It was designed for Rpi"
+            " and may have unpredictable results in CI Pipeline"
+        )
+
+
+def test_columns_keep_every_item(SongAnalysisClass):
+    beats = SongAnalysisClass.beats
+    assert beats.item(3) == {
+        "index": 3,
+        "start": beats.start[3],
+        "duration": beats.duration[3],
+        "confidence": beats.confidence[3],
+    }
+    segment = SongAnalysisClass.segments.item(10)
+    assert len(segment["pitches"]) == len(segment["timbre"]) == 12
+    assert SongAnalysisClass.segments.nbytes < 200 * len(SongAnalysisClass.segments)
+
+
+def test_batch_lookup_matches_single_lookups(SongAnalysisClass):
+    times = np.linspace(-1, SongAnalysisClass.track_duration + 5, 997)
+    batch = SongAnalysisClass.get_active_indices(times)
+
+    for n in range(0, len(times), 7):
+        active = SongAnalysisClass.get_active_linear_search(progress_seconds=times[n])
+        for category, indices in batch.items():
+            expected = active[category]["index"] if active and active[category] else -1
+            assert indices[n] == expected
+
+
+def expected_indices(SongAnalysisClass, time_seconds):
+    linear = SongAnalysisClass.get_active_linear_search(progress_seconds=time_seconds)
+    binary = SongAnalysisClass.get_active_binary_search(progress_seconds=time_seconds)
+    assert linear == binary
+    if linear is None:
+        return None
+    return {category: item["index"] if item else -1 for category, item in linear.items()}
+
+
+def test_cursor_follows_playback(SongAnalysisClass):
+    cursor = SongAnalysisClass.playback_cursor()
+
+    for time_seconds in np.arange(0.001, 30, 0.01):
+        assert cursor.active_indices(time_seconds) == expected_indices(
+            SongAnalysisClass, time_seconds
+        )
+    assert cursor.seeks < 10
+
+
+def test_cursor_handles_seeks_and_rewinds(SongAnalysisClass):
+    cursor = SongAnalysisClass.playback_cursor()
+    times = [5.0, 240.5, 240.52, 12.3, 12.31, 11.9, 300.7, 100.0, 10000.0, 33.3]
+
+    for time_seconds in times:
+        assert cursor.active_indices(time_seconds) == expected_indices(
+            SongAnalysisClass, time_seconds
+        )
@@ -0,0 +1,162 @@
+import random
+import socket
+import threading
+import time
+
+import pytest
+
+from classes.ClockSync import ClockFollower, ClockLeader, OffsetFilter
+from classes.PlaybackClock import PlaybackClock
+
+POLL_INTERVAL_S = 0.02
+
+
+def shifted_clock(shift_s: float):
+    return lambda: time.monotonic() + shift_s
+
+
+def wait_for(condition, timeout_s: float = 5):
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(POLL_INTERVAL_S)
+
+
+class NoisyRelay:
+    def __init__(self, leader, min_delay_s: float, max_delay_s: float, seed: int = 0):
+        """Passes packets between a follower and the leader, holding each one back
+        for a random time like a busy Wi-Fi network. Followers poll its address.
+        """
+        self.leader = leader
+        self.min_delay_s = min_delay_s
+        self.max_delay_s = max_delay_s
+        self.rng = random.Random(seed)
+        self.front = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.front.bind(("127.0.0.1", 0))
+        self.back = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for sock in (self.front, self.back):
+            sock.settimeout(POLL_INTERVAL_S)
+        self.address = self.front.getsockname()
+        self.follower = None
+        self.stopped = threading.Event()
+        self.threads = [
+            threading.Thread(target=self.forward),
+            threading.Thread(target=self.reply),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def forward(self):
+        while not self.stopped.is_set():
+            try:
+                message, self.follower = self.front.recvfrom(1024)
+            except socket.timeout:
+                continue
+            self.hold_back(self.back, message, self.leader)
+
+    def reply(self):
+        while not self.stopped.is_set():
+            try:
+                message = self.back.recv(1024)
+            except socket.timeout:
+                continue
+            self.hold_back(self.front, message, self.follower)
+
+    def hold_back(self, sock, message, address):
+        delay_s = self.rng.uniform(self.min_delay_s, self.max_delay_s)
+        threading.Timer(delay_s, sock.sendto, (message, address)).start()
+
+    def close(self):
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
+        time.sleep(self.max_delay_s)
+        self.front.close()
+        self.back.close()
+
+
+def test_offset_filter_trusts_the_quickest_round_trip():
+    samples = OffsetFilter(size=4)
+    # Remote clock is 10s ahead, the first two replies were held up on the way back
+    samples.add(0.0, 10.001, 10.002, 0.043)
+    samples.add(1.0, 11.001, 11.002, 1.023)
+    samples.add(2.0, 12.001, 12.002, 2.003)
+
+    assert samples.offset_s == pytest.approx(10)
+    assert samples.delay_s == pytest.approx(0.002)
+    assert samples.jitter_s > 0.005
+
+    for second in range(3, 7):
+        samples.add(second, second + 10.001, second + 10.002, second + 0.003)
+    assert len(samples) == 4
+    assert samples.jitter_s == pytest.approx(0)
+
+
+def test_followers_play_in_step_with_the_leader():
+    leader_clock = PlaybackClock(progress_ms=30000)
+    leader = ClockLeader(lambda: leader_clock, host="127.0.0.1", port=0)
+    follower_clocks = [
+        PlaybackClock(progress_ms=0, lag_time_ms=100, clock=shifted_clock(100)),
+        PlaybackClock(progress_ms=45000, clock=shifted_clock(-50)),
+    ]
+    followers = [
+        ClockFollower(
+            lambda clock=clock: clock,
+            leader.address,
+            poll_interval_s=POLL_INTERVAL_S,
+            clock=clock.clock,
+        )
+        for clock in follower_clocks
+    ]
+    try:
+        wait_for(lambda: all(len(follower.filter) >= 4 for follower in followers))
+
+        assert followers[0].filter.offset_s == pytest.approx(-100, abs=0.005)
+        assert followers[1].filter.offset_s == pytest.approx(50, abs=0.005)
+        for follower, clock in zip(followers, follower_clocks):
+            assert follower.corrections >= 1
+            assert clock.position()[1] == pytest.approx(
+                leader_clock.position()[1], abs=0.005
+            )
+        # Lag is still each device's own
+        assert follower_clocks[0].progress_seconds() == pytest.approx(
+            leader_clock.progress_seconds() + 0.1, abs=0.005
+        )
+        wait_for(lambda: len(leader.stats()["followers"]) == 2)
+        assert all(
+            abs(stats["skew_ms"]) < 5
+            for stats in leader.stats()["followers"].values()
+        )
+
+        leader_clock.sync(paused=True)
+        leader.beacon()
+        wait_for(lambda: all(clock.paused for clock in follower_clocks))
+        assert followers[1].stats()["role"] == "follower"
+    finally:
+        for follower in followers:
+            follower.close()
+        leader.close()
+
+
+def test_followers_ignore_gaps_within_the_measurement_error():
+    leader_clock = PlaybackClock(progress_ms=30000)
+    leader = ClockLeader(lambda: leader_clock, host="127.0.0.1", port=0)
+    # Each way takes up to 40ms, so offsets can be off by far more than 2ms
+    relay = NoisyRelay(leader.address, 0, 0.04)
+    follower_clock = PlaybackClock(progress_ms=0)
+    follower = ClockFollower(
+        lambda: follower_clock, relay.address, poll_interval_s=0.08
+    )
+    try:
+        wait_for(lambda: follower.sequence >= 48, timeout_s=10)
+
+        assert follower.filter.delay_s > 0.004
+        # The first poll moves the clock to the leader's track, noise doesn't
+        assert 1 <= follower.corrections <= 4
+        assert follower_clock.position()[1] == pytest.approx(
+            leader_clock.position()[1], abs=0.03
+        )
+    finally:
+        follower.close()
+        relay.close()
+        leader.close()
@@ -1,45 +1,85 @@
-from classes.LedColor import LedColor
-
-
-def test_interpolate_rgb_val_1_0():
-    c1 = [0, 0, 0]
-    c2 = [255, 255, 255]
-
-    ACTUAL_VALUE_CORRECT = LedColor.interpolate_rgb(c1, c2, 1)
-    ACTUAL_VALUE_WRONG = LedColor.interpolate_rgb(c1, c2, 0.5)
-    assert ACTUAL_VALUE_CORRECT == c2
-    assert not ACTUAL_VALUE_WRONG == c2
-
-    ACTUAL_VALUE_ZERO = LedColor.interpolate_rgb(c1, c2, 0)
-    assert ACTUAL_VALUE_ZERO == c1
-
-
-def test_interpolate_rgb_half():
-    c1 = [0, 0, 0]
-    c2 = [255, 255, 255]
-
-    ACTUAL_VALUE_HALF = LedColor.interpolate_rgb(c1, c2, 0.5)
-    EXPECTED_VALUE_HALF = [128, 128, 128]
-
-    assert ACTUAL_VALUE_HALF == EXPECTED_VALUE_HALF
-
-
-def test_can_get_color_as_list():
-    ACTUAL_VALUE = LedColor.get_rgb_value(LedColor.lightOrange)
-    EXPECTED_RETURN_VALUE = [180, 45, 0]
-
-    assert ACTUAL_VALUE == EXPECTED_RETURN_VALUE
-
-
-def test_can_convert_list_to_color():
-    ACTUAL_VALUE = LedColor.rgb([180, 45, 0])
-    EXPECTED_RETURN_VALUE = LedColor.lightOrange
-
-    assert ACTUAL_VALUE == EXPECTED_RETURN_VALUE
-
-
-def test_can_get_random_color():
-    """Checks to make sure it can get a random color. Colors should be an int value."""
-    ACTUAL = LedColor.get_random()
-    
-    assert type(ACTUAL) == int
+import numpy as np
+
+from classes.ColorTable import ColorTable
+from classes.LedColor import LedColor
+from classes.Palette import Palette
+
+
+def test_interpolate_rgb_val_1_0():
+    c1 = [0, 0, 0]
+    c2 = [255, 255, 255]
+
+    ACTUAL_VALUE_CORRECT = LedColor.interpolate_rgb(c1, c2, 1)
+    ACTUAL_VALUE_WRONG = LedColor.interpolate_rgb(c1, c2, 0.5)
+    assert ACTUAL_VALUE_CORRECT == c2
+    assert not ACTUAL_VALUE_WRONG == c2
+
+    ACTUAL_VALUE_ZERO = LedColor.interpolate_rgb(c1, c2, 0)
+    assert ACTUAL_VALUE_ZERO == c1
+
+
+def test_interpolate_rgb_half():
+    c1 = [0, 0, 0]
+    c2 = [255, 255, 255]
+
+    ACTUAL_VALUE_HALF = LedColor.interpolate_rgb(c1, c2, 0.5)
+    EXPECTED_VALUE_HALF = [128, 128, 128]
+
+    assert ACTUAL_VALUE_HALF == EXPECTED_VALUE_HALF
+
+
+def test_can_get_color_as_list():
+    ACTUAL_VALUE = LedColor.get_rgb_value(LedColor.lightOrange)
+    EXPECTED_RETURN_VALUE = [180, 45, 0]
+
+    assert ACTUAL_VALUE == EXPECTED_RETURN_VALUE
+
+
+def test_can_convert_list_to_color():
+    ACTUAL_VALUE = LedColor.rgb([180, 45, 0])
+    EXPECTED_RETURN_VALUE = LedColor.lightOrange
+
+    assert ACTUAL_VALUE == EXPECTED_RETURN_VALUE
+
+
+def test_can_get_random_color():
+    """Checks to make sure it can get a random color. Colors should be an int value."""
+    ACTUAL = LedColor.get_random()
+    
+    assert type(ACTUAL) == int
+
+
+def test_can_get_batch_of_random_preset_colors():
+    ACTUAL = LedColor.get_random_batch(50)
+
+    assert len(ACTUAL) == 50
+    assert set(ACTUAL.tolist()) <= set(Palette.get("presets").colors.tolist())
+
+
+def test_palette_sample_is_repeatable_with_seeded_rng():
+    palette = Palette.register("test_palette", [LedColor.red, LedColor.blue])
+
+    first = palette.sample(20, np.random.default_rng(3))
+    second = palette.sample(20, np.random.default_rng(3))
+
+    assert first.tolist() == second.tolist()
+    assert Palette.get("test_palette") is palette
+
+
+def test_default_color_table_leaves_frame_untouched():
+    frame = np.array([LedColor.white, LedColor.lightOrange], dtype=np.uint32)
+
+    assert ColorTable().apply(frame) is frame
+
+
+def test_color_table_folds_brightness_and_gamma():
+    frame = np.array([LedColor.white, LedColor.lightOrange], dtype=np.uint32)
+
+    half_bright = ColorTable(brightness=127).apply(frame)
+    assert LedColor.get_rgb_value(int(half_bright[0])) == [127, 127, 127]
+    assert LedColor.get_rgb_value(int(half_bright[1])) == [90, 22, 0]
+
+    # Gamma above 1 dims mid tones but never the full on or full off values
+    gamma = ColorTable(gamma=2.2).apply(frame)
+    assert LedColor.get_rgb_value(int(gamma[0])) == [255, 255, 255]
+    assert LedColor.get_rgb_value(int(gamma[1]))[0] < 180
@@ -0,0 +1,38 @@
+from classes.CommandCoalescer import CommandCoalescer
+
+
+def test_newest_command_per_target_wins():
+    coalescer = CommandCoalescer()
+    for color in range(100):
+        coalescer.submit("strip", color)
+    coalescer.submit("star", "gold")
+
+    assert len(coalescer) == 2
+    assert coalescer.take() == ("strip", 99)
+    assert coalescer.take() == ("star", "gold")
+    assert coalescer.take() is None
+    assert coalescer.stats() == {
+        "submitted": 101,
+        "merged": 99,
+        "dropped": 0,
+        "taken": 2,
+        "pending": 0,
+    }
+
+
+def test_targets_come_out_in_order_of_their_newest_command():
+    coalescer = CommandCoalescer()
+    coalescer.submit("a", 1)
+    coalescer.submit("b", 2)
+    coalescer.submit("a", 3)
+
+    assert [coalescer.take(), coalescer.take()] == [("b", 2), ("a", 3)]
+
+
+def test_oldest_target_is_dropped_when_full():
+    coalescer = CommandCoalescer(max_pending=2)
+    for target in "abc":
+        coalescer.submit(target, target.upper())
+
+    assert coalescer.dropped == 1
+    assert [coalescer.take(), coalescer.take()] == [("b", "B"), ("c", "C")]
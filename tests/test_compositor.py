@@ -0,0 +1,113 @@
+import pickle
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from rpi_ws281x import Color
+
+from classes.AnalysisColumns import AnalysisColumns
+from classes.Compositor import BLEND_ADD, BLEND_MAX, BeatLayer, Compositor, Layer
+from classes.LedColor import LedColor
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+
+
+class SolidLayer(Layer):
+    def __init__(self, pixels, color, **kwargs):
+        super().__init__(pixels, **kwargs)
+        self.color = color
+
+    def render(self, track_time_s, active):
+        return self.color
+
+
+def beats(confidences):
+    items = [
+        {"start": n * 0.5, "duration": 0.5, "confidence": confidence}
+        for n, confidence in enumerate(confidences)
+    ]
+    return SimpleNamespace(beats=AnalysisColumns.from_items(items))
+
+
+def test_layers_draw_by_priority_and_blend():
+    compositor = Compositor(4)
+    compositor.add_layer(SolidLayer([1, 2], Color(0, 0, 200), priority=2, blend=BLEND_ADD))
+    compositor.add_layer(SolidLayer([0, 1, 2], Color(100, 0, 100), priority=1))
+    compositor.add_layer(SolidLayer([2, 3], Color(50, 50, 250), priority=3, blend=BLEND_MAX))
+
+    frame = compositor.render(0, {})
+
+    assert frame.tolist() == [
+        Color(100, 0, 100),
+        Color(100, 0, 255),
+        Color(100, 50, 255),
+        Color(50, 50, 250),
+    ]
+
+
+def test_unknown_blend_mode_is_rejected():
+    with pytest.raises(ValueError):
+        SolidLayer([0], LedColor.red, blend="multiply")
+
+
+def test_layer_without_render_is_rejected():
+    with pytest.raises(TypeError):
+        Layer([0])
+
+
+def test_beat_layer_flashes_then_fades_to_black():
+    layer = BeatLayer(
+        [0, 1], beats([1.0]), nth_item=1, colors=[LedColor.red], color_change_on="beats"
+    )
+
+    assert layer.render(0.0, {"beats": -1}) == LedColor.black
+    # The 0.5s beat starting at 0s fades over 0.25s, timed from its start
+    assert layer.render(0.001, {"beats": 0}) == LedColor.red
+    assert layer.render(0.125, {"beats": 0}) == Color(128, 0, 0)
+    assert layer.render(0.249, {"beats": 0}) == Color(3, 0, 0)
+    assert layer.render(0.25, {"beats": 0}) == LedColor.black
+
+
+def test_beat_layer_stays_locked_to_the_analysis_when_frames_are_late():
+    items = [
+        {"start": start, "duration": 1.0, "confidence": 1.0} for start in [0, 0.125, 0.25]
+    ]
+    analysis = SimpleNamespace(beats=AnalysisColumns.from_items(items))
+    layer = BeatLayer(
+        [0], analysis, nth_item=1, colors=[Color(100, 0, 0)], color_change_on="beats"
+    )
+
+    layer.render(0.0, {"beats": 0})
+    # Beat 1 was passed over by a late frame but still flashes from its own start,
+    # and every overlapping beat adds to the color
+    assert layer.render(0.375, {"beats": 2}) == Color(25 + 50 + 75, 0, 0)
+    assert len(layer.envelopes) == 3
+    assert layer.render(0.625, {"beats": 2}) == Color(25, 0, 0)
+
+
+def test_beat_layer_skips_items_and_low_confidence():
+    colors = [LedColor.red, LedColor.green]
+    analysis = beats([1.0, 1.0, 0.1, 1.0, 1.0])
+    layer = BeatLayer([0], analysis, nth_item=2, colors=colors, confidence_threshold=0.5)
+
+    assert layer.render(0.5, {"bars": 1, "beats": 1}) == LedColor.black
+    assert layer.render(1.0, {"bars": 1, "beats": 2}) == LedColor.black
+    assert layer.render(2.0, {"bars": 1, "beats": 4}) == LedColor.green
+
+
+def test_layers_render_a_whole_track_in_one_loop():
+    with open(Path.cwd() / "tests" / "stairwayToHeavenAnalysis.dict", "rb") as file:
+        analysis = SpotifyAudioAnalysis(track_progress=0, **pickle.load(file))
+
+    compositor = Compositor(9)
+    compositor.add_layer(BeatLayer(range(0, 9, 3), analysis, 1, colors=[LedColor.red]))
+    compositor.add_layer(BeatLayer(range(1, 9, 3), analysis, 2, colors=[LedColor.green]))
+    compositor.add_layer(BeatLayer(range(2, 9, 3), analysis, 1, item="tatums"))
+
+    cursor = analysis.playback_cursor()
+    lit = set()
+    for tick in range(1000):
+        track_time_s = 60 + tick * 0.005
+        frame = compositor.render(track_time_s, cursor.active_indices(track_time_s))
+        lit.update(int(pixel) for pixel in frame.nonzero()[0])
+
+    assert lit == set(range(9))
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from classes.ControlPlane import LIGHTS_TARGET, ControlPlane
+
+
+@pytest.fixture
+def control_plane():
+    plane = ControlPlane()
+    yield plane
+    plane.close()
+
+
+def test_submit_returns_before_slow_job_runs(control_plane):
+    ran = []
+    start = time.perf_counter()
+    job = control_plane.submit("slow", lambda: time.sleep(0.2) or ran.append(1))
+
+    assert time.perf_counter() - start < 0.01
+    assert not ran
+    assert control_plane.wait(job, timeout=2)
+    assert ran == [1]
+    assert control_plane.stats()["effects"]["slow"]["avg_ms"] >= 200
+
+
+def test_jobs_run_in_order_and_newest_per_target_wins(control_plane):
+    release = threading.Event()
+    ran = []
+    control_plane.submit("block", release.wait)
+    control_plane.submit("config", ran.append, "config")
+    for color in range(50):
+        control_plane.submit("color", ran.append, color, target=LIGHTS_TARGET)
+    last = control_plane.submit("note", ran.append, "note")
+    release.set()
+
+    assert control_plane.wait(last, timeout=2)
+    assert ran == ["config", 49, "note"]
+    stats = control_plane.stats()
+    assert stats["merged"] == 49
+    assert stats["finished"] == stats["submitted"] == 53
+
+
+def test_failed_job_is_counted_and_later_jobs_still_run(control_plane):
+    ran = []
+    control_plane.submit("fail", lambda: 1 / 0)
+    job = control_plane.submit("after", ran.append, 1)
+
+    assert control_plane.wait(job, timeout=2)
+    assert ran == [1]
+    assert control_plane.stats()["errors"] == 1
+
+
+def test_request_latency_is_kept_apart_from_effect_latency(control_plane):
+    control_plane.record_request("setColor", 0.002)
+    control_plane.record_request("setColor", 0.004)
+
+    stats = control_plane.stats()
+    assert stats["requests"]["setColor"] == {
+        "count": 2,
+        "avg_ms": pytest.approx(3),
+        "max_ms": pytest.approx(4),
+    }
+    assert stats["effects"] == {}
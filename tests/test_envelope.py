@@ -0,0 +1,33 @@
+import pytest
+from rpi_ws281x import Color
+
+from classes.Envelope import EnvelopeBank
+from classes.LedColor import LedColor
+from classes.Transition import EASING_EASE_IN_OUT
+
+
+def test_attack_then_decay_follow_their_curves():
+    bank = EnvelopeBank(attack_easing=EASING_EASE_IN_OUT)
+    bank.add(onset_s=1.0, attack_s=0.5, decay_s=1.0, color=Color(200, 100, 0))
+
+    assert bank.color_at(0.9) == LedColor.black
+    assert bank.color_at(1.25) == Color(100, 50, 0)
+    assert bank.color_at(1.5) == Color(200, 100, 0)
+    assert bank.color_at(2.0) == Color(100, 50, 0)
+    assert bank.color_at(2.5) == LedColor.black
+    assert len(bank) == 0
+
+
+def test_full_bank_replaces_the_envelope_ending_first():
+    bank = EnvelopeBank(capacity=2)
+    bank.add(0, 0, 10, LedColor.red)
+    bank.add(0, 0, 1, LedColor.green)
+    bank.add(0, 0, 10, LedColor.blue)
+
+    assert sorted(env.end_s for env in bank.envelopes) == [10, 10]
+    assert bank.color_at(0) == Color(255, 0, 255)
+
+
+def test_unknown_easing_is_rejected():
+    with pytest.raises(ValueError):
+        EnvelopeBank(decay_easing="bounce")
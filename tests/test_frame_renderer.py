@@ -0,0 +1,54 @@
+import pytest
+
+from classes.FrameRenderer import FrameRenderer
+from classes.LedColor import LedColor
+from classes.LightString import LightString
+
+LED_COUNTS = [1, 7, 100, 301]
+
+
+def test_wheel_matches_per_pixel_wheel():
+    positions = list(range(256))
+    expected = [LightString.wheel(pos) for pos in positions]
+
+    assert FrameRenderer.wheel(positions).tolist() == expected
+
+
+@pytest.mark.parametrize("led_count", LED_COUNTS)
+@pytest.mark.parametrize("step", [0, 1, 130, 511])
+def test_rainbow_frames_match_per_pixel_code(led_count, step):
+    expected_rainbow = [LightString.wheel((i + step) & 255) for i in range(led_count)]
+    expected_cycle = [
+        LightString.wheel((int(i * 256 / led_count) + step) & 255)
+        for i in range(led_count)
+    ]
+
+    assert FrameRenderer.rainbow(led_count, step).tolist() == expected_rainbow
+    assert FrameRenderer.rainbow_cycle(led_count, step).tolist() == expected_cycle
+
+
+def test_tile_rgb_list_repeats_colors():
+    rgb_list = [[100, 255, 0], [0, 0, 255], [180, 45, 0]]
+    frame = FrameRenderer.tile_rgb_list(8, rgb_list)
+
+    assert frame.tolist() == [LedColor.rgb(rgb_list[i % 3]) for i in range(8)]
+
+
+def test_interpolate_matches_transition_rounding():
+    c1 = [255, 10, 3]
+    c2 = [0, 200, 90]
+    time_ms = 333
+    expected = [
+        LedColor.rgb([round(c1[n] + (c2[n] - c1[n]) * (j / time_ms)) for n in range(3)])
+        for j in range(time_ms)
+    ]
+    amounts = [j / time_ms for j in range(time_ms)]
+
+    assert FrameRenderer.interpolate(c1, c2, amounts).tolist() == expected
+
+
+def test_pack_and_unpack_round_trip():
+    frame = FrameRenderer.pack_rgb([[180, 45, 0], [0, 92, 255]])
+
+    assert frame.tolist() == [LedColor.lightOrange, LedColor.teal]
+    assert FrameRenderer.unpack_rgb(frame).tolist() == [[180, 45, 0], [0, 92, 255]]
@@ -0,0 +1,93 @@
+import pytest
+
+from classes.FrameScheduler import FrameScheduler, StripTiming
+
+
+class SteppingClock:
+    """Clock that only moves forward when slept on or when a frame is rendered"""
+
+    def __init__(self, render_time_s: float = 0):
+        self.now = 100.0
+        self.render_time_s = render_time_s
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    def render(self):
+        self.now += self.render_time_s
+
+
+def run_animation(led_count, step_count, interval_s, render_time_s=0):
+    clock = SteppingClock(render_time_s)
+    scheduler = FrameScheduler(StripTiming(led_count), clock=clock, sleep=clock.sleep)
+    start = clock()
+    steps = []
+    for step in scheduler.run(step_count, interval_s):
+        steps.append(step)
+        clock.render()
+
+    return steps, clock() - start, scheduler
+
+
+def test_strip_timing_wire_time():
+    timing = StripTiming(100)
+
+    assert timing.wire_time_s == pytest.approx(0.003055)
+    assert timing.max_fps == pytest.approx(327.3, abs=0.1)
+    assert timing.clamp_interval(0.001) == timing.wire_time_s
+    assert timing.clamp_interval(0.02) == 0.02
+
+
+def test_shows_every_step_when_there_is_time():
+    steps, duration, scheduler = run_animation(50, 100, 0.02)
+
+    assert steps == list(range(100))
+    assert duration == pytest.approx(2.0)
+    assert scheduler.frames_skipped == 0
+
+
+@pytest.mark.parametrize("led_count", [50, 300, 1000])
+def test_fast_animation_lasts_as_long_as_asked(led_count):
+    # A 1000ms fade in 1ms steps used to take far longer than a second
+    steps, duration, scheduler = run_animation(led_count, 1000, 0.001)
+
+    assert duration == pytest.approx(1.0)
+    assert steps == sorted(set(steps))
+    # The final step is always shown on top of what the wire allows
+    assert len(steps) <= 1 / StripTiming(led_count).wire_time_s + 2
+    assert steps[-1] == 999
+    assert scheduler.frames_shown + scheduler.frames_skipped == steps[-1] + 1
+
+
+def test_skips_steps_when_rendering_falls_behind():
+    steps, duration, scheduler = run_animation(50, 100, 0.01, render_time_s=0.025)
+
+    assert duration == pytest.approx(1.0, abs=0.03)
+    assert steps[:3] == [0, 2, 5]
+    assert scheduler.frames_skipped > 0
+
+
+def test_steps_follow_a_shared_position():
+    interval_s = 0.005
+    clock = SteppingClock(render_time_s=0.0013)
+    scheduler = FrameScheduler(StripTiming(50), clock=clock, sleep=clock.sleep)
+    # Track position that started 1.2318s before this clock's start
+    track_start = clock() - 1.2318
+
+    steps, woken_at = [], []
+    for step in scheduler.run(
+        None, interval_s, loop=None, position=lambda: clock() - track_start
+    ):
+        steps.append(step)
+        woken_at.append(clock() - track_start)
+        clock.render()
+        if len(steps) == 20:
+            break
+
+    assert steps == list(range(246, 266))
+    # Woken exactly as each step of the position comes due, after the first one
+    assert woken_at[1:] == pytest.approx([step * interval_s for step in steps[1:]])
+    assert scheduler.frames_skipped == 0
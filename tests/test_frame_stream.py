@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from classes.FrameRenderer import FrameRenderer
+from classes.FrameStream import (
+    ENCODING_DELTA,
+    ENCODING_RAW,
+    ENCODING_RLE,
+    HEADER,
+    FrameStreamDecoder,
+    encode_frame,
+)
+
+LED_COUNT = 300
+
+
+@pytest.mark.parametrize("encoding", [ENCODING_RAW, ENCODING_DELTA, ENCODING_RLE])
+def test_frames_survive_every_encoding(encoding):
+    decoder = FrameStreamDecoder(LED_COUNT)
+    previous = FrameRenderer.blank(LED_COUNT)
+
+    for step in range(20):
+        frame = FrameRenderer.rainbow_cycle(LED_COUNT, step)
+        frame[FrameRenderer.chase_mask(LED_COUNT, step % 3)] = 0
+        message = encode_frame(frame, step, encoding, previous=previous)
+
+        assert np.array_equal(decoder.decode(message), frame)
+        previous = frame
+
+    assert decoder.stats.dropped == 0
+
+
+def test_sparse_and_flat_frames_encode_small():
+    frame = FrameRenderer.solid(LED_COUNT, 0x102030)
+    changed = frame.copy()
+    changed[[5, 99]] = 0xFFFFFF
+    raw_size = HEADER.size + LED_COUNT * 3
+
+    assert len(encode_frame(frame, 0, ENCODING_RAW)) == raw_size
+    assert len(encode_frame(frame, 0, ENCODING_RLE)) == HEADER.size + 5
+    assert len(encode_frame(changed, 1, ENCODING_DELTA, previous=frame)) == HEADER.size + 10
+
+
+def test_stats_and_ack_track_the_stream():
+    decoder = FrameStreamDecoder(4)
+    for sequence in [0, 1, 4]:
+        message = encode_frame([1, 2, 3, 4], sequence, client_time_ms=sequence * 10.0)
+        decoder.decode(message)
+        ack = decoder.ack(message, received_ns=0)
+
+    assert ack["sequence"] == 4
+    assert ack["client_time_ms"] == 40.0
+    stats = decoder.stats.as_dict()
+    assert stats["frames"] == 3
+    assert stats["dropped"] == 2
+    assert stats["bytes_per_frame"] == HEADER.size + 12
+    assert stats["compression"] == 1.0
+
+
+def test_restarted_sequences_reset_the_stream_instead_of_dropping():
+    decoder = FrameStreamDecoder(4)
+    # A reconnect counting from 0 again, then a jump far ahead
+    for sequence in [100, 101, 0, 1, 3, 50000, 50001]:
+        decoder.decode(encode_frame([1, 2, 3, 4], sequence))
+
+    stats = decoder.stats.as_dict()
+    assert stats["dropped"] == 1
+    assert stats["resets"] == 2
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        b"\x00",
+        encode_frame([1, 2, 3], 0),
+        encode_frame([1, 2, 3, 4], 0)[:-1],
+        HEADER.pack(ENCODING_DELTA, 4, 0, 0) + b"\x09\x00\x01\x02\x03",
+        HEADER.pack(ENCODING_RLE, 4, 0, 0) + b"\x03\x00\x01\x02\x03",
+        HEADER.pack(7, 4, 0, 0),
+    ],
+)
+def test_malformed_frames_are_rejected(message):
+    decoder = FrameStreamDecoder(4)
+    with pytest.raises(ValueError):
+        decoder.decode(message)
+    assert decoder.frame.tolist() == [0, 0, 0, 0]
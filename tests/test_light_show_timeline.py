@@ -0,0 +1,52 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from classes.Compositor import BeatLayer, Compositor
+from classes.LedColor import LedColor
+from classes.LightShowTimeline import LightShowTimeline
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+
+LED_COUNT = 30
+FPS = 50
+
+
+@pytest.fixture(scope="module")
+def analysis():
+    with open(Path.cwd() / "tests" / "frontierPsychiatristAnalysis.dict", "rb") as file:
+        return SpotifyAudioAnalysis(track_progress=0, **pickle.load(file))
+
+
+def make_layers(analysis):
+    return [
+        BeatLayer(range(0, LED_COUNT, 2), analysis, 1, colors=[LedColor.red, LedColor.white]),
+        BeatLayer(range(1, LED_COUNT, 2), analysis, 2, item="tatums", colors=[LedColor.green]),
+    ]
+
+
+def test_timeline_matches_live_rendering(analysis):
+    timeline = LightShowTimeline.compile(analysis, make_layers(analysis), LED_COUNT, FPS)
+
+    compositor = Compositor(LED_COUNT)
+    for layer in make_layers(analysis):
+        compositor.add_layer(layer)
+    cursor = analysis.playback_cursor()
+
+    for tick in range(0, 60 * FPS):
+        track_time_s = tick / FPS
+        live = compositor.render(track_time_s, cursor.active_indices(track_time_s))
+        assert np.array_equal(timeline.frame_at(track_time_s + 0.001), live)
+
+
+def test_timeline_is_compact_and_repeatable(analysis):
+    timeline = LightShowTimeline.compile(analysis, make_layers(analysis), LED_COUNT, FPS)
+    again = LightShowTimeline.compile(analysis, make_layers(analysis), LED_COUNT, FPS)
+
+    assert timeline.tick_count == int(analysis.track_duration * FPS) + 1
+    assert timeline.nbytes < timeline.tick_count * LED_COUNT * 4 / 4
+    assert np.array_equal(timeline.frames, again.frames)
+    assert np.array_equal(timeline.run_starts, again.run_starts)
+    assert timeline.frame_at(0).tolist() == [LedColor.black] * LED_COUNT
+    assert timeline.frame_at(analysis.track_duration + 1) is None
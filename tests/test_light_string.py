@@ -0,0 +1,188 @@
+from pathlib import Path
+import ctypes
+import pickle
+import time
+
+import numpy as np
+import pytest
+
+from classes.DynamicDisplay import DynamicDisplay
+from classes.FrameRenderer import FrameRenderer
+from classes.LedColor import LedColor
+from classes.LightString import LightString
+from classes.SimulatedStrip import SimulatedStrip
+from classes.SpotifyAudioAnalysis import SpotifyAudioAnalysis
+from classes.StripBackend import StripBackend, Ws281xStrip
+
+
+@pytest.fixture
+def light_string():
+    return LightString(led_count=30, backend="simulated")
+
+
+def test_simulated_strip_records_solid_frames(light_string):
+    light_string.set_solid(LedColor.teal)
+    light_string.set_solid_from_rgb_list([[1, 2, 3], [4, 5, 6]])
+
+    frames = light_string.strip.recorded_frames()
+    assert light_string.strip.frames_shown == 2
+    assert frames[0].tolist() == [LedColor.teal] * 30
+    assert frames[1].tolist() == [LedColor.rgb([1, 2, 3]), LedColor.rgb([4, 5, 6])] * 15
+
+
+def test_color_wipe_ends_on_new_color(light_string):
+    light_string.set_solid(LedColor.red)
+    light_string.color_wipe(LedColor.blue, wait_ms=1)
+
+    assert light_string.strip.recorded_frames()[-1].tolist() == [LedColor.blue] * 30
+
+
+def test_transition_lasts_as_long_as_asked(light_string):
+    light_string.set_solid(LedColor.black)
+    start = time.monotonic()
+    light_string.transition_to_color(LedColor.white, time_ms=200)
+
+    assert time.monotonic() - start == pytest.approx(0.2, abs=0.05)
+    last = light_string.strip.recorded_frames()[-1]
+    assert LedColor.get_rgb_value(int(last[0]))[0] > 240
+
+
+def test_recording_keeps_most_recent_frames():
+    strip = SimulatedStrip(4, max_frames=3, emulate_wire_time=False)
+    for color in range(5):
+        strip.write_frame(FrameRenderer.solid(4, color))
+        strip.show()
+
+    assert strip.frames_shown == 5
+    assert strip.recorded_frames()[:, 0].tolist() == [2, 3, 4]
+    assert np.all(np.diff(strip.recorded_timestamps_ns()) >= 0)
+
+
+def test_recording_can_be_memory_mapped(tmp_path):
+    strip = SimulatedStrip(4, record_path=tmp_path / "frames.bin")
+    strip.write_frame(FrameRenderer.solid(4, LedColor.pink))
+    strip.show()
+
+    assert (tmp_path / "frames.bin").stat().st_size > 0
+    assert strip.recorded_frames().tolist() == [[LedColor.pink] * 4]
+
+
+def test_dynamic_display_refreshes_from_another_process(light_string):
+    dynamic_display = DynamicDisplay(light_string=light_string)
+    dynamic_display.reinitialize()
+    try:
+        dynamic_display.create_group_of_every_nth(n=2, offset=0, group_name="even")
+        dynamic_display.update_group("even", LedColor.green)
+
+        expected = [LedColor.green, LedColor.black] * 15
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            frames = light_string.strip.recorded_frames()
+            if len(frames) and frames[-1].tolist() == expected:
+                break
+            time.sleep(0.01)
+
+        assert light_string.strip.recorded_frames()[-1].tolist() == expected
+    finally:
+        dynamic_display.terminate_all_running_process()
+
+
+def test_dynamic_display_stops_refreshing_when_idle(light_string):
+    dynamic_display = DynamicDisplay(light_string=light_string)
+    dynamic_display.reinitialize()
+    try:
+        dynamic_display.create_group_of_every_nth(n=3, offset=1, group_name="thirds")
+        dynamic_display.update_group("thirds", LedColor.blue)
+        time.sleep(0.3)
+
+        shown = light_string.strip.frames_shown
+        time.sleep(0.3)
+
+        assert light_string.strip.frames_shown == shown
+        stats = dynamic_display.refresh_stats()
+        assert stats["refreshes"] == shown
+        assert stats["skipped_refreshes"] > 0
+    finally:
+        dynamic_display.terminate_all_running_process()
+
+
+@pytest.mark.parametrize("precompile", [False, True])
+def test_dual_beats_runs_every_group_in_one_process(light_string, precompile):
+    with open(Path.cwd() / "tests" / "stairwayToHeavenAnalysis.dict", "rb") as file:
+        analysis = SpotifyAudioAnalysis(track_progress=60000, **pickle.load(file))
+
+    dynamic_display = DynamicDisplay(light_string=light_string)
+    dynamic_display.reinitialize()
+    try:
+        dynamic_display.dual_beats_with_tatums(analysis, precompile=precompile)
+        assert list(dynamic_display.group_threads) == ["layers"]
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and light_string.strip.frames_shown < 10:
+            time.sleep(0.01)
+
+        assert light_string.strip.frames_shown >= 10
+    finally:
+        dynamic_display.terminate_all_running_process()
+
+
+def test_streamed_frames_reach_the_strip(light_string):
+    dynamic_display = DynamicDisplay(light_string=light_string)
+    dynamic_display.start_streaming()
+    try:
+        assert dynamic_display.streaming
+        frame = FrameRenderer.rainbow(30, 7)
+        dynamic_display.frame_buffer.publish_frame(frame)
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            frames = light_string.strip.recorded_frames()
+            if len(frames) and np.array_equal(frames[-1], frame):
+                break
+            time.sleep(0.01)
+
+        assert np.array_equal(light_string.strip.recorded_frames()[-1], frame)
+    finally:
+        dynamic_display.terminate_all_running_process()
+    assert not dynamic_display.streaming
+
+
+def test_backend_missing_a_method_fails_when_created():
+    class NoShowStrip(StripBackend):
+        def begin(self):
+            pass
+
+        def write_frame(self, frame):
+            pass
+
+        def numPixels(self):
+            return 0
+
+        def setPixelColor(self, n, color):
+            pass
+
+        def getPixelColor(self, n):
+            return 0
+
+    with pytest.raises(TypeError):
+        NoShowStrip()
+
+
+def test_ws281x_frames_are_copied_into_the_led_buffer():
+    strip = Ws281xStrip(10, 18)
+    with pytest.raises(RuntimeError):
+        strip.write_frame(np.zeros(10, dtype=np.uint32))
+
+    # begin needs a Raspberry Pi, so point the channel's leds field at a buffer of
+    # our own. It comes after gpionum, invert, count and strip_type.
+    leds = ctypes.c_void_p.from_address(int(strip.getPixels().channel) + 16)
+    buffer = np.zeros(10, dtype=np.uint32)
+    leds.value = buffer.ctypes.data
+    try:
+        frame = np.arange(1, 13, dtype=np.uint32) * 0x010203
+        strip.write_frame(frame)
+
+        assert buffer.tolist() == frame[:10].tolist()
+        assert strip.getPixelColor(9) == frame[9]
+    finally:
+        leds.value = None
@@ -0,0 +1,84 @@
+from multiprocessing import Process
+import os
+
+import numpy as np
+import pytest
+
+from classes import Metrics
+from classes.FrameScheduler import FrameScheduler, StripTiming
+from classes.LightString import LightString
+from classes.Metrics import Counter, Histogram, Metric
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_metric_without_samples_is_rejected():
+    with pytest.raises(TypeError):
+        Metric("test_untyped", "Test")
+
+
+def test_histogram_exports_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+
+    assert histogram.export() == [
+        "# HELP test_seconds Test",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 2.0',
+        'test_seconds_bucket{le="1"} 3.0',
+        'test_seconds_bucket{le="+Inf"} 4.0',
+        "test_seconds_sum 2.65",
+        "test_seconds_count 4.0",
+    ]
+
+
+def test_values_written_in_forked_process_are_shared():
+    counter = Counter("test_total", "Test", "loop", ("a", "b"))
+    child = Process(target=counter.inc, args=(3, "b"))
+    child.start()
+    child.join()
+
+    assert counter.value("a") == 0
+    assert counter.value("b") == 3
+    assert 'test_total{loop="b"} 3.0' in counter.export()
+
+
+def test_scheduler_records_frames_under_its_loop():
+    clock = FakeClock()
+    scheduler = FrameScheduler(StripTiming(10), clock=clock, sleep=clock.sleep)
+    shown = Metrics.FRAMES_SHOWN.value(Metrics.LOOP_VISUALIZER)
+    dropped = Metrics.FRAMES_DROPPED.value(Metrics.LOOP_VISUALIZER)
+    late = Metrics.FRAMES_LATE.value(Metrics.LOOP_VISUALIZER)
+
+    for step in scheduler.run(200, 0.01, loop=Metrics.LOOP_VISUALIZER):
+        if step == 10:
+            clock.now += 0.05
+
+    assert Metrics.FRAMES_SHOWN.value(Metrics.LOOP_VISUALIZER) - shown == 196
+    assert Metrics.FRAMES_DROPPED.value(Metrics.LOOP_VISUALIZER) - dropped == 4
+    assert Metrics.FRAMES_LATE.value(Metrics.LOOP_VISUALIZER) - late == 1
+    assert Metrics.TARGET_FPS.value(Metrics.LOOP_VISUALIZER) == 100
+    assert Metrics.ACHIEVED_FPS.value(Metrics.LOOP_VISUALIZER) > 90
+
+
+def test_export_includes_show_time_and_process_usage():
+    light_string = LightString(led_count=30, backend="simulated")
+    shows = Metrics.STRIP_SHOW_SECONDS.count()
+    light_string.show_frame(np.zeros(30, dtype=np.uint32))
+
+    assert Metrics.STRIP_SHOW_SECONDS.count() == shows + 1
+    export = Metrics.export({"server": os.getpid(), "gone": 2**22 + 1}, {"extra_total": 7})
+    assert 'xmas_process_cpu_seconds_total{process="server"}' in export
+    assert 'xmas_process_resident_memory_bytes{process="server"}' in export
+    assert 'process="gone"' not in export
+    assert "extra_total 7.0" in export
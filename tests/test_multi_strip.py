@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+import pytest
+
+from classes.LedColor import LedColor
+from classes.LightString import LightString
+from classes.MultiStrip import MultiStrip
+from classes.SimulatedStrip import SimulatedStrip
+
+
+def test_frames_are_split_across_outputs():
+    outputs = [SimulatedStrip(4), SimulatedStrip(3), SimulatedStrip(2)]
+    strip = MultiStrip(outputs, reversed_outputs=[False, True, False])
+    frame = np.arange(1, 10, dtype=np.uint32)
+
+    strip.write_frame(frame)
+    strip.show()
+
+    assert strip.numPixels() == 9
+    assert outputs[0].recorded_frames()[-1].tolist() == [1, 2, 3, 4]
+    assert outputs[1].recorded_frames()[-1].tolist() == [7, 6, 5]
+    assert outputs[2].recorded_frames()[-1].tolist() == [8, 9]
+    assert strip.recorded_frames()[-1].tolist() == frame.tolist()
+    assert [strip.getPixelColor(n) for n in range(9)] == frame.tolist()
+
+    strip.setPixelColor(4, LedColor.red)
+    assert outputs[1].getPixelColor(2) == LedColor.red
+
+
+def test_outputs_are_shown_in_parallel():
+    led_count = 1500
+    single = SimulatedStrip(led_count * 2)
+    split = MultiStrip([SimulatedStrip(led_count), SimulatedStrip(led_count)])
+    frames = 20
+
+    def time_shows(strip):
+        strip.show()
+        start = time.monotonic()
+        for _ in range(frames):
+            strip.show()
+        return time.monotonic() - start
+
+    single_s = time_shows(single)
+    split_s = time_shows(split)
+
+    half_wire_time_s = single.timing.wire_time_s / 2
+    assert split.timing.wire_time_s == pytest.approx(half_wire_time_s, rel=0.01)
+    assert split_s < single_s * 0.75
+    assert split.frames_shown == frames + 1
+
+
+def test_light_string_with_outputs():
+    light_string = LightString(
+        backend="simulated",
+        outputs=[
+            {"led_count": 20},
+            {"led_count": 10, "color_mode": "grb", "reverse": True},
+        ],
+    )
+
+    light_string.set_solid_from_rgb_list([[1, 2, 3], [4, 5, 6]])
+
+    assert light_string.led_count == 30
+    assert light_string.timing.wire_time_s == light_string.strip.timing.wire_time_s
+    assert light_string.strip.recorded_frames()[-1].tolist() == [
+        LedColor.rgb([1, 2, 3]),
+        LedColor.rgb([4, 5, 6]),
+    ] * 15
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from classes.Compositor import Compositor, Layer
+from classes.FrameRenderer import FrameRenderer
+from classes.PixelGroup import PixelGroup
+
+
+class SolidLayer(Layer):
+    def __init__(self, pixels, color):
+        super().__init__(pixels)
+        self.color = color
+
+    def render(self, track_time_s, active):
+        return self.color
+
+
+def test_constructors_build_sorted_index_arrays():
+    assert PixelGroup.every_nth(10, 3, 1).indices.tolist() == [1, 4, 7]
+    assert PixelGroup.span(10, 2, 5).indices.tolist() == [2, 3, 4]
+    assert PixelGroup.mirrored(10, 0, 2).indices.tolist() == [0, 1, 8, 9]
+    assert PixelGroup(10, [5, 1, 5]).indices.tolist() == [1, 5]
+
+    scatter = PixelGroup.scatter(100, 10, seed=3)
+    assert len(scatter) == 10
+    assert scatter == PixelGroup.scatter(100, 10, seed=3)
+
+    with pytest.raises(ValueError):
+        PixelGroup(10, [10])
+
+
+def test_set_operations():
+    evens = PixelGroup.every_nth(6, 2)
+    front = PixelGroup.span(6, 0, 3)
+
+    assert list(evens | front) == [0, 1, 2, 4]
+    assert list(evens & front) == [0, 2]
+    assert list(evens - front) == [4]
+    assert list(evens ^ front) == [1, 4]
+    assert list(~evens) == [1, 3, 5]
+    with pytest.raises(ValueError):
+        evens | PixelGroup.span(7, 0, 3)
+
+
+def test_paint_writes_a_color_or_a_color_per_pixel():
+    frame = FrameRenderer.blank(8)
+    every_third = PixelGroup.every_nth(8, 3)
+    scattered = PixelGroup(8, [1, 2, 7])
+    assert isinstance(every_third.selector, slice)
+
+    every_third.paint(frame, 5)
+    scattered.paint(frame, np.array([1, 2, 3], dtype=np.uint32))
+
+    assert frame.tolist() == [5, 1, 2, 5, 0, 0, 5, 3]
+
+
+def test_layers_draw_on_groups():
+    compositor = Compositor(6)
+    compositor.add_layer(SolidLayer(PixelGroup.mirrored(6, 0, 1), 9))
+
+    assert compositor.render(0, {}).tolist() == [9, 0, 0, 0, 0, 9]
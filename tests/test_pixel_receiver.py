@@ -0,0 +1,162 @@
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from classes.Metrics import (
+    PROTOCOL_DDP,
+    PROTOCOL_E131,
+    RECEIVER_FRAMES,
+    RECEIVER_PACKETS_DISCARDED,
+)
+from classes.PixelReceiver import (
+    OPTION_PREVIEW_DATA,
+    OPTION_STREAM_TERMINATED,
+    PixelReceiver,
+    ddp_packets,
+    e131_packets,
+    e131_sync_packet,
+)
+from classes.SharedFrameBuffer import SharedFrameBuffer
+
+
+def random_frame(led_count: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 1 << 24, led_count, dtype=np.uint32)
+
+
+@pytest.fixture
+def receiver(request):
+    frame_buffer = SharedFrameBuffer(getattr(request, "param", 600))
+    # Only frames published from here on count as changes
+    frame_buffer.read()
+    receiver = PixelReceiver(
+        frame_buffer, host="127.0.0.1", e131_port=0, ddp_port=0, multicast=False
+    )
+    serving = threading.Thread(target=receiver.serve_forever)
+    serving.start()
+    yield receiver
+    receiver.close()
+    serving.join()
+
+
+@pytest.fixture
+def sender():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    yield sock
+    sock.close()
+
+
+def send(sender, address, packets):
+    for packet in packets:
+        sender.sendto(packet, address)
+
+
+def next_frame(receiver) -> np.ndarray:
+    assert receiver.frame_buffer.wait_for_change(timeout=5)
+    return receiver.frame_buffer.read()
+
+
+def test_e131_universes_are_assembled_into_frames(receiver, sender):
+    first, second = random_frame(600, 1), random_frame(600, 2)
+    discarded = RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_E131)
+
+    packets = e131_packets(first, sequence=10)
+    # Universes can arrive in any order and a duplicate is ignored
+    send(sender, receiver.e131_address, packets[::-1] + packets[:1])
+    assert next_frame(receiver).tolist() == first.tolist()
+
+    new_packets = e131_packets(second, sequence=11)
+    # A packet from the frame before arriving late doesn't overwrite the new one
+    late = packets[2:3]
+    send(sender, receiver.e131_address, new_packets[:2] + late + new_packets[2:])
+    assert next_frame(receiver).tolist() == second.tolist()
+    assert RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_E131) == discarded + 2
+
+
+def test_e131_preview_packets_are_not_shown(receiver, sender):
+    preview, frame = random_frame(600, 8), random_frame(600, 9)
+
+    packets = e131_packets(preview, 0, options=OPTION_PREVIEW_DATA)
+    send(sender, receiver.e131_address, packets)
+    assert not receiver.frame_buffer.wait_for_change(timeout=0.1)
+
+    send(sender, receiver.e131_address, e131_packets(frame, 1))
+    assert next_frame(receiver).tolist() == frame.tolist()
+
+
+def test_e131_sequences_start_over_after_the_stream_terminates(receiver, sender):
+    first, ignored, second = (random_frame(600, seed) for seed in (10, 11, 12))
+    discarded = RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_E131)
+
+    send(sender, receiver.e131_address, e131_packets(first, 5))
+    assert next_frame(receiver).tolist() == first.tolist()
+
+    # Packets ending a stream carry no pixels
+    packets = e131_packets(ignored, 6, options=OPTION_STREAM_TERMINATED)
+    send(sender, receiver.e131_address, packets)
+    assert not receiver.frame_buffer.wait_for_change(timeout=0.1)
+
+    # The next stream counts from 0, which would otherwise be out of order
+    send(sender, receiver.e131_address, e131_packets(second, 0))
+    assert next_frame(receiver).tolist() == second.tolist()
+    assert RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_E131) == discarded
+
+
+def test_e131_frames_wait_for_the_sync_packet(receiver, sender):
+    frame = random_frame(600, 3)
+
+    send(sender, receiver.e131_address, e131_packets(frame, 0, sync_address=7000))
+    assert not receiver.frame_buffer.wait_for_change(timeout=0.1)
+
+    send(sender, receiver.e131_address, [e131_sync_packet(0, 7000)])
+    assert next_frame(receiver).tolist() == frame.tolist()
+
+
+def test_ddp_offsets_are_assembled_into_frames(receiver, sender):
+    first, second = random_frame(600, 4), random_frame(600, 5)
+    discarded = RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_DDP)
+
+    packets = ddp_packets(first, sequence=14, max_data_bytes=480)
+    send(sender, receiver.ddp_address, packets[:1] + packets)
+    assert next_frame(receiver).tolist() == first.tolist()
+
+    new_packets = ddp_packets(second, sequence=3, max_data_bytes=480)
+    late = packets[1:2]
+    send(sender, receiver.ddp_address, new_packets[:1] + late + new_packets[1:])
+    assert next_frame(receiver).tolist() == second.tolist()
+    assert RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_DDP) == discarded + 2
+
+
+def test_ddp_frames_with_one_sequence_number_per_frame(receiver, sender):
+    first, second = random_frame(600, 6), random_frame(600, 7)
+    discarded = RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_DDP)
+
+    packets = ddp_packets(first, 9, max_data_bytes=480, number_packets=False)
+    # A packet sent twice is still dropped, the rest of the frame isn't
+    send(sender, receiver.ddp_address, packets[:2] + packets[1:])
+    assert next_frame(receiver).tolist() == first.tolist()
+
+    new_packets = ddp_packets(second, 10, max_data_bytes=480, number_packets=False)
+    late = packets[2:3]
+    send(sender, receiver.ddp_address, new_packets[:1] + late + new_packets[1:])
+    assert next_frame(receiver).tolist() == second.tolist()
+    assert RECEIVER_PACKETS_DISCARDED.value(PROTOCOL_DDP) == discarded + 2
+
+
+@pytest.mark.parametrize("receiver", [3000], indirect=True)
+def test_frames_of_thousands_of_pixels_are_assembled_in_order(receiver, sender):
+    frames = [random_frame(3000, seed) for seed in range(2)]
+    e131_frames = RECEIVER_FRAMES.value(PROTOCOL_E131)
+    ddp_frames = RECEIVER_FRAMES.value(PROTOCOL_DDP)
+    frame_count = 100
+
+    for number in range(frame_count):
+        frame = frames[number % 2]
+        send(sender, receiver.e131_address, e131_packets(frame, number))
+        assert next_frame(receiver).tolist() == frame.tolist()
+        send(sender, receiver.ddp_address, ddp_packets(frame, number % 15 + 1))
+        assert next_frame(receiver).tolist() == frame.tolist()
+
+    assert RECEIVER_FRAMES.value(PROTOCOL_E131) == e131_frames + frame_count
+    assert RECEIVER_FRAMES.value(PROTOCOL_DDP) == ddp_frames + frame_count
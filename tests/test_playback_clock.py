@@ -0,0 +1,63 @@
+from multiprocessing import Process, Queue
+
+import pytest
+
+from classes.PlaybackClock import PlaybackClock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 50.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_progress_follows_the_monotonic_clock():
+    fake = FakeClock()
+    clock = PlaybackClock(progress_ms=10000, lag_time_ms=200, clock=fake)
+
+    assert clock.progress_seconds() == pytest.approx(10.2)
+    fake.now += 1.5
+    assert clock.progress_seconds() == pytest.approx(11.7)
+
+
+def test_sync_seeks_pauses_and_resumes_in_place():
+    fake = FakeClock()
+    clock = PlaybackClock(progress_ms=0, clock=fake)
+
+    fake.now += 2
+    clock.sync(paused=True)
+    fake.now += 10
+    assert clock.paused
+    assert clock.progress_seconds() == pytest.approx(2)
+
+    clock.sync(paused=False)
+    fake.now += 1
+    assert clock.progress_seconds() == pytest.approx(3)
+
+    clock.sync(progress_ms=60000, lag_time_ms=-500)
+    fake.now += 0.25
+    assert clock.progress_seconds() == pytest.approx(59.75)
+
+
+def report_progress(clock: PlaybackClock, requests: Queue, results: Queue):
+    while requests.get():
+        results.put(clock.progress_seconds())
+
+
+def test_sync_reaches_running_processes():
+    clock = PlaybackClock(progress_ms=0)
+    requests, results = Queue(), Queue()
+    worker = Process(target=report_progress, args=[clock, requests, results])
+    worker.start()
+    try:
+        requests.put(True)
+        assert results.get(timeout=5) < 5
+
+        clock.sync(progress_ms=120000, paused=True)
+        requests.put(True)
+        assert results.get(timeout=5) == pytest.approx(120)
+    finally:
+        requests.put(False)
+        worker.join()
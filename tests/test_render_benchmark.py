@@ -0,0 +1,53 @@
+from benchmarks import render_benchmark
+
+
+def test_benchmark_reports_every_measurement():
+    results = render_benchmark.run_benchmark(
+        led_counts=[20], names=["set_solid", "rainbow", "pattern:rainbowCycle"]
+    )
+
+    assert [r["name"] for r in results["results"]] == [
+        "set_solid",
+        "rainbow",
+        "pattern:rainbowCycle",
+    ]
+    for result in results["results"]:
+        assert result["led_count"] == 20
+        assert result["frames"] >= 200
+        assert result["fps"] > 0
+        assert result["cpu_ms_per_frame"] > 0
+        assert 0 < result["p50_frame_ms"] <= result["p99_frame_ms"]
+        assert result["alloc_peak_bytes_per_frame"] > 0
+
+
+def test_benchmark_measures_the_pixel_receiver():
+    results = render_benchmark.run_benchmark(
+        led_counts=[10000], names=["receiver:e131", "receiver:ddp"]
+    )
+
+    assert [r["name"] for r in results["results"]] == ["receiver:e131", "receiver:ddp"]
+    for result in results["results"]:
+        assert result["frames"] == render_benchmark.MIN_FRAMES
+        assert result["frames_lost"] == 0
+        assert result["fps"] > 0
+        assert 0 < result["p50_frame_ms"] <= result["p99_frame_ms"]
+
+
+def test_compare_flags_regressions_only():
+    baseline = {
+        "results": [
+            {"name": "rainbow", "led_count": 50, "fps": 1000, "p99_frame_ms": 1.0},
+            {"name": "set_solid", "led_count": 50, "fps": 1000, "p99_frame_ms": 1.0},
+        ]
+    }
+    results = {
+        "results": [
+            {"name": "rainbow", "led_count": 50, "fps": 500, "p99_frame_ms": 0.5},
+            {"name": "set_solid", "led_count": 50, "fps": 1100, "p99_frame_ms": 1.1},
+        ]
+    }
+
+    regressions = render_benchmark.compare(results, baseline)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("rainbow @ 50 LEDs: fps")
@@ -0,0 +1,75 @@
+from multiprocessing import Event
+import time
+
+import pytest
+
+from classes.LedColor import LedColor
+from classes.LightString import LightString
+from classes.RenderWorker import RenderWorker
+
+
+@pytest.fixture
+def light_string():
+    return LightString(led_count=30, backend="simulated")
+
+
+@pytest.fixture
+def render_worker(light_string):
+    worker = RenderWorker(light_string)
+    yield worker
+    worker.close()
+
+
+def test_interrupt_stops_animation_at_frame_boundary(light_string):
+    interrupt = Event()
+    light_string.set_interrupt(interrupt)
+    interrupt.set()
+
+    start = time.monotonic()
+    light_string.transition_colors(LedColor.red, LedColor.blue, time_ms=1000)
+
+    assert time.monotonic() - start < 0.1
+    assert light_string.strip.frames_shown == 0
+
+
+def test_worker_runs_commands_without_restarting(render_worker, light_string):
+    pid = render_worker.process.pid
+    command = render_worker.run_once("set_solid", color=LedColor.teal)
+
+    assert render_worker.wait(command, timeout=2)
+    assert light_string.strip.recorded_frames()[-1].tolist() == [LedColor.teal] * 30
+    assert render_worker.process.pid == pid
+
+
+def test_pattern_switch_happens_at_next_frame(render_worker, light_string):
+    render_worker.run_looping("rainbow_cycle", wait_ms=20)
+    time.sleep(0.2)
+    assert light_string.strip.frames_shown > 0
+
+    start = time.monotonic()
+    command = render_worker.run_once("set_solid", color=LedColor.red)
+    assert render_worker.wait(command, timeout=2)
+
+    assert time.monotonic() - start < 0.1
+    assert light_string.strip.recorded_frames()[-1].tolist() == [LedColor.red] * 30
+
+    render_worker.run_looping("rainbow_cycle", wait_ms=20)
+    time.sleep(0.1)
+    assert render_worker.stop(timeout=0.1)
+    shown = light_string.strip.frames_shown
+    time.sleep(0.1)
+    assert light_string.strip.frames_shown == shown
+
+
+def test_burst_of_colors_only_shows_the_newest(render_worker, light_string):
+    colors = [LedColor.red, LedColor.green, LedColor.blue, LedColor.teal]
+    for i in range(200):
+        command = render_worker.run_once("set_solid", color=colors[i % 4])
+
+    assert render_worker.wait(command, timeout=2)
+    assert light_string.strip.recorded_frames()[-1].tolist() == [colors[199 % 4]] * 30
+    stats = render_worker.stats()
+    assert stats["sent"] == 200
+    assert stats["merged"] > 0
+    assert stats["applied"] + stats["merged"] == 200
+    assert light_string.strip.frames_shown < 200
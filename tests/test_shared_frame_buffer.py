@@ -0,0 +1,60 @@
+from multiprocessing import Process
+
+import numpy as np
+
+from classes.SharedFrameBuffer import SharedFrameBuffer
+
+LED_COUNT = 5000
+FRAMES = 300
+
+
+def publish_uniform_frames(frame_buffer: SharedFrameBuffer):
+    for n in range(1, FRAMES + 1):
+        frame_buffer.back[:] = n
+        frame_buffer.publish()
+
+
+def test_publish_and_read_whole_frame():
+    frame_buffer = SharedFrameBuffer(4)
+    frame_buffer.back[[0, 2]] = 7
+    assert frame_buffer.read().tolist() == [0, 0, 0, 0]
+
+    frame_buffer.publish()
+    assert frame_buffer.read().tolist() == [7, 0, 7, 0]
+    assert frame_buffer.sequence == 2
+
+    frame_buffer.clear()
+    assert frame_buffer.read().tolist() == [0, 0, 0, 0]
+    frame_buffer.unlink()
+
+
+def test_reader_never_sees_a_torn_frame():
+    frame_buffer = SharedFrameBuffer(LED_COUNT)
+    writer = Process(target=publish_uniform_frames, args=[frame_buffer])
+    writer.start()
+
+    frame = np.zeros(LED_COUNT, dtype=np.uint32)
+    last = 0
+    try:
+        while last < FRAMES:
+            frame_buffer.read(frame)
+            assert np.all(frame == frame[0])
+            assert frame[0] >= last
+            last = int(frame[0])
+    finally:
+        writer.join()
+        frame_buffer.unlink()
+
+
+def test_wait_for_change_only_wakes_on_new_frames():
+    frame_buffer = SharedFrameBuffer(4)
+    frame_buffer.read()
+    assert not frame_buffer.has_changed()
+    assert not frame_buffer.wait_for_change(timeout=0.01)
+
+    frame_buffer.back[1] = 3
+    frame_buffer.publish()
+    assert frame_buffer.wait_for_change(timeout=0)
+    frame_buffer.read()
+    assert not frame_buffer.has_changed()
+    frame_buffer.unlink()
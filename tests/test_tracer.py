@@ -0,0 +1,66 @@
+from multiprocessing import Process
+
+import numpy as np
+
+from classes.LightString import LightString
+from classes.Tracer import (
+    RING_DISPLAY,
+    RING_SERVER,
+    SPAN_STRIP_SHOW,
+    Tracer,
+    TRACER,
+)
+
+
+def test_nothing_is_recorded_while_off():
+    tracer = Tracer(capacity=4)
+
+    assert tracer.begin() == 0
+    tracer.end(SPAN_STRIP_SHOW, tracer.begin())
+    assert tracer.spans(RING_SERVER) == []
+
+
+def test_ring_keeps_the_newest_spans():
+    tracer = Tracer(capacity=4)
+    tracer.enable()
+    for start in range(1, 7):
+        tracer.end(SPAN_STRIP_SHOW, start)
+
+    spans = tracer.spans(RING_SERVER)
+    assert [start for _, start, _ in spans] == [3, 4, 5, 6]
+    assert all(name == "strip_show" for name, _, _ in spans)
+
+
+def test_forked_process_records_into_its_own_ring():
+    tracer = Tracer(capacity=4)
+    tracer.enable()
+
+    def record():
+        tracer.end(SPAN_STRIP_SHOW, tracer.begin())
+
+    child = Process(target=tracer.in_ring(RING_DISPLAY, record))
+    child.start()
+    child.join()
+
+    assert tracer.spans(RING_SERVER) == []
+    assert len(tracer.spans(RING_DISPLAY)) == 1
+    events = tracer.chrome_trace()["traceEvents"]
+    shows = [event for event in events if event["ph"] == "X"]
+    assert len(shows) == 1
+    assert shows[0]["name"] == "strip_show"
+    assert shows[0]["dur"] >= 0
+
+
+def test_light_string_records_render_stages():
+    light_string = LightString(led_count=30, backend="simulated")
+    TRACER.clear()
+    TRACER.enable()
+    try:
+        light_string.play(3, lambda step: np.full(30, step, dtype=np.uint32), wait_ms=1)
+    finally:
+        TRACER.disable()
+
+    names = [name for name, _, _ in TRACER.spans(RING_SERVER)]
+    assert names.count("render_frame") == 3
+    assert names.count("color_correct") == 3
+    assert names.count("strip_show") == 3
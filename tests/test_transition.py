@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from classes.FrameRenderer import FrameRenderer
+from classes.LedColor import LedColor
+from classes.LightString import LightString
+from classes.Transition import (
+    EASING_EASE_IN_OUT,
+    EASING_EXPONENTIAL,
+    EASINGS,
+    Transition,
+    easing_curve,
+)
+
+
+@pytest.mark.parametrize("easing", list(EASINGS))
+def test_easing_curves_rise_to_the_target(easing):
+    curve = easing_curve(easing, 50)
+
+    assert curve[-1] == 1
+    assert 0 <= curve[0] < 0.1
+    assert np.all(np.diff(curve) >= 0)
+    assert easing_curve(easing, 50) is curve
+
+
+def test_easings_shape_the_middle_of_the_fade():
+    assert easing_curve(EASING_EASE_IN_OUT, 4)[1] == pytest.approx(0.5)
+    assert easing_curve(EASING_EXPONENTIAL, 4)[1] < 0.01
+
+    with pytest.raises(ValueError):
+        easing_curve("bounce", 4)
+
+
+def test_every_pixel_fades_from_its_own_color():
+    start = FrameRenderer.pack_rgb([[200, 0, 0], [0, 100, 0], [0, 0, 50]])
+    end = FrameRenderer.solid(3, LedColor.rgb([0, 0, 250]))
+    transition = Transition(start, end, steps=2)
+
+    assert FrameRenderer.unpack_rgb(transition.frame_at(0)).tolist() == [
+        [100, 0, 125],
+        [0, 50, 125],
+        [0, 0, 150],
+    ]
+    assert transition.frame_at(1).tolist() == end.tolist()
+
+
+def test_multi_color_string_fades_without_snapping():
+    light_string = LightString(led_count=30, backend="simulated")
+    light_string.set_solid_from_rgb_list([[255, 0, 0], [0, 255, 0]])
+    light_string.transition_to_color(LedColor.black, time_ms=100)
+
+    frames = light_string.strip.recorded_frames()
+    first_fade = FrameRenderer.unpack_rgb(frames[1])
+    assert first_fade[0, 0] > 200 and first_fade[0, 1] == 0
+    assert first_fade[1, 1] > 200 and first_fade[1, 0] == 0
+    assert frames[-1].tolist() == [LedColor.black] * 30
+    # One frame per 10ms instead of one per millisecond
+    assert len(frames) <= 12